@@ -1,9 +1,20 @@
 from __future__ import print_function
 import sys
 import time
-import math
-import numpy as np
-import string
+import shutil
+import tempfile
+
+import validateEngine as ve
+import dlReader as dlr
+import testMatrix as tm
+import waits
+import provision as pv
+import liveValidate as lv
+import resultCache as rc
+import sessionManager as sm
+import swbTrace
+import connection
+import cvtMirror as cm
 
 try:
 	import simwbClient as swb
@@ -12,28 +23,20 @@ try:
 except:
     sys.exit('Import failed')
 
+swbTrace.enableFromEnv(swb, dl)	#set SIMWB_TRACE=<file.json> to trace every client call
+
 debug = 0	#change to 1 to see test progress
 
 
-# ---- DEFINE INPUT AND CONNECT TO HOST ----
+# ---- DEFINE INPUT ----
 
 PROJECT = 'Hardware-Tests'
 HOST = 'localhost'
+DL_HOST = None		#data log server of HOST (HOST if None)
 LOGIN = 'admin/nimda'
 TEST = 'analog'
 RTDB = 'analog_val'
 
-r = swb.connect(HOST)
-if r < 0: sys.exit('Connection failed: %s' %swb.strerror(r))
-
-r,p,g= swb.login(LOGIN)
-if r < 0: sys.exit('Login failed: %s' %swb.strerror(r))
-
-r = swb.projectSelect(PROJECT)
-if r < 0: 
-	r = swb.projectCreate(PROJECT)
-	if r < 0:	
-		sys.exit('Project selection failed: %s' %swb.strerror(r))
 
 
 # ---- INITIALIZE RTDB ----
@@ -82,80 +85,97 @@ def createMsg(name, pointType, msgId, protocol, src, dest):
 						  %(name, pointType, msgId, protocol, src, dest))
 	return msg
   
-def createAnalogPoints(cvtType, rawType, rawTypeNum, protocol, metaFlags):
+def analogPairs(count=2):
+	'''
+	IN/OUT point names of count analog pairs; the first two are (POINT_IN1, POINT_OUT1) and (POINT_IN2, POINT_OUT2).
 	'''
-	Calls the functions createHWAttributes and createMsg to create analog points and their NET-IO mappings in the current RTDB.
+	return [('In.point%d' %(2*k+1), 'Out.point%d' %(2*k+2)) for k in range(count)]
+
+def analogConfig(cvtType, rawType, rawTypeNum, protocol, metaFlags, ports=(1, 1000), pairs=2):
+	'''
+	Calls the functions createHWAttributes and createMsg to build the analog points and their NET-IO mappings,
+	one IN and one OUT message per pair of points (see analogPairs).
 	Inputs:
 		cvtType			point type specified in initial point creation
 		rawType			point type specified in point mapping
 		rawTypeNum		number based on raw type of point (specified in SimWB Constants)
 		protocol		either 'tcp' or 'udp'
 		metaFlags		RTDB meta flags for the item
+		ports			(IN message srcport, OUT message srcport); each side sends to the other
+		pairs			number of IN/OUT point pairs
+	Return:
+		points			dict of point name -> attributes
+		iorecs			dict of mapping record name -> mapping
+		msg				list of message lines for NET-IO.msgs.1
 	'''
-	r = swb.dbDelete(RTDB)
-
-	r = swb.dbSave(RTDB)
-	if r < 0: sys.exit('RTDB create failed: %s\n' %swb.strerror(r))
-
-	r = swb.dbLoad(RTDB)
-	if r < 0: sys.exit('RTDB load failed: %s\n' %swb.strerror(r))
-
-	[name1,atts1, maps1] = createHWAttributes('AI', cvtType, 'in1', rawTypeNum, rawType, metaFlags)
-	[name2,atts2, maps2] = createHWAttributes('AO', cvtType, 'out1', rawTypeNum, rawType, metaFlags)
-	[name3,atts3, maps3] = createHWAttributes('AI', cvtType, 'in2', rawTypeNum, rawType, metaFlags)
-	[name4,atts4, maps4] = createHWAttributes('AO', cvtType, 'out2', rawTypeNum, rawType, metaFlags)
-
-	points = {POINT_IN1:atts1, POINT_OUT1:atts2, POINT_IN2:atts3, POINT_OUT2:atts4}
-	r = swb.dbItemPut(points, save=True,)
-	if r < 0: sys.exit('Item create failed: %s' %swb.strerror(r))
-
-	iorecs = {name1:maps1, name2:maps2, name3:maps3, name4:maps4}
-	r = swb.putIOMappingRecords(iorecs)
-	if r < 0: sys.exit('IO mapping failed: %s' %swb.strerror(r))
-
-	r = swb.dbSave(RTDB)
-	if r < 0: sys.exit('RTDB save failed: %s' %swb.strerror(r))
-	
+	points = {}
+	iorecs = {}
 	msg = []
-	msg.append(createMsg('in1', 'IN', '0', protocol, '1', '1000'))
-	msg.append(createMsg('out1', 'OUT', '0', protocol, '1000', '1'))
-	msg.append(createMsg('in2', 'IN', '1', protocol, '1', '1000'))
-	msg.append(createMsg('out2', 'OUT', '1', protocol, '1000', '1'))
-	r = swb.putFileLines(msg, remoteDir='RTDB/'+RTDB, remoteFile='NET-IO.msgs.1')
-	if r < 0: sys.exit('Message transfer failed: %s' %swb.strerror(r))
+	for k, (point_in, point_out) in enumerate(analogPairs(pairs)):
+		[nameIn,attsIn,mapsIn] = createHWAttributes('AI', cvtType, 'in%d' %(k+1), rawTypeNum, rawType, metaFlags)
+		[nameOut,attsOut,mapsOut] = createHWAttributes('AO', cvtType, 'out%d' %(k+1), rawTypeNum, rawType, metaFlags)
+		points[point_in] = attsIn
+		points[point_out] = attsOut
+		iorecs[nameIn] = mapsIn
+		iorecs[nameOut] = mapsOut
+		msg.append(createMsg('in%d' %(k+1), 'IN', str(k), protocol, ports[0], ports[1]))
+		msg.append(createMsg('out%d' %(k+1), 'OUT', str(k), protocol, ports[1], ports[0]))
+	return points, iorecs, msg
+
+def createAnalogPoints(cvtType, rawType, rawTypeNum, protocol, metaFlags, rtdb=RTDB, ports=(1, 1000), pairs=2, force=False):
+	'''
+	Creates the analog points of analogConfig and their NET-IO mappings in the given RTDB.
+	Only the parts that differ from the RTDB's last provisioned configuration are uploaded (see provision.provisionRTDB).
+	Inputs:
+		rtdb			RTDB to create the points in
+		force			upload the whole configuration even if the server already has it
+		(other inputs as for analogConfig)
+	'''
+	points, iorecs, msg = analogConfig(cvtType, rawType, rawTypeNum, protocol, metaFlags, ports, pairs)
+	action = pv.provisionRTDB(rtdb, points, iorecs, msg, scope=HOST+'/'+PROJECT, force=force)
+	if debug:
+		print('RTDB %s %s' %(rtdb, action))
 
 
 # ---- INITIALIZE TEST ----
 
-def startTest(SESSION):
+def startTest(SESSION, test=TEST, rtdb=RTDB):
 	'''
-	Deletes old test (if available), then creates new test and session and starts running the session.
+	Creates a new session and starts running it; the test is only (re)created when its definition changed (see sessionManager).
 	'''
-	r = swb.testDelete(TEST)
-
-	r = swb.testCreate(TEST, RTDB, 'New test', fixedstep=1000)
-	if r < 0: sys.exit('Test create failed: %s' %swb.strerror(r))
-	
-	r = swb.sessionCreate(TEST, SESSION, 'New test session', schedType=3)
-	if r < 0: sys.exit('Session create failed: %s' %swb.strerror(r))
-	 
-	r = swb.sessionStart(TEST, SESSION) 
-	if r < 0: sys.exit('Session start failed: %s' %swb.strerror(r))
+	sm.startSession(test, SESSION, rtdb, 'New test session', schedType=3, fixedstep=STEP, scope=HOST+'/'+PROJECT)
 
 
 # ---- ADD & START GENERATOR ----
 
-def startGenerator(points, offset):
+def generatorSpecs(offset):
+	'''
+	Generators driven on the two OUT points: a sine and a triangle of amplitude 100 around offset.
+	Return:
+		specs			list of validateEngine.generatorSpec descriptions, one per OUT point
+	'''
+	return [ve.generatorSpec('sine', 1, 30, 0, offset, 100, 0, 30),
+			ve.generatorSpec('triangle', 1, 30, 0, offset, 100, 0, 30)]
+
+def generatorOffset(cvtType):
+	'''
+	Offset keeping the generator output inside the range of unsigned types (and llong, as before).
+	'''
+	if (cvtType[0]=='u') | (cvtType=='llong'):
+		return 100
+	return 0
+
+def startGenerator(points, specs):
 	'''
 	Starts signal generator(s) for specified point(s).
 	Input:
 		points			list of points that will have signal generators attached
+		specs			generator description for each point (see generatorSpecs)
 	'''	
-	gen1 = swb.addGenerator(points[0], swbC.GEN_SIGGENEND_DURATION, swbC.SIG_TYPE_SINE, 1, 30, 0, offset, 100, 0, 30)
-	if gen1 < 0: sys.exit('Signal generator failed: %s' %swb.strerror(gen1))
-
-	gen2 = swb.addGenerator(points[1], swbC.GEN_SIGGENEND_DURATION, swbC.SIG_TYPE_TRIANGLE, 1, 30, 0, offset, 100, 0, 30)
-	if gen1 < 0: sys.exit('Signal generator failed: %s' %swb.strerror(gen2))
+	for point, spec in zip(points, specs):
+		gen = swb.addGenerator(point, swbC.GEN_SIGGENEND_DURATION, getattr(swbC, 'SIG_TYPE_%s' %spec['sigType'].upper()), spec['frequency'],
+							   spec['count'], spec['phase'], spec['offset'], spec['amplitude'], spec['delay'], spec['duration'])
+		if gen < 0: sys.exit('Signal generator failed: %s' %swb.strerror(gen))
 
 	r = swb.startAllGenerators()
 	if r < 0: sys.exit('Signal generator failed: %s' %swb.strerror(r))
@@ -163,67 +183,249 @@ def startGenerator(points, offset):
 
 # ---- VALIDATE DATA (as test is running) ----
 
-def validateConstants(point_in, point_out, val):
-	r, info = swb.getItemValues(point_in)
-	outVal = info[point_in]['value']
-
-	if val!=outVal:
-		print('%s constant validation failed for %s and %s: %s and %s not equal\n' %(CVTTYPE, point_in, point_out, val, outVal))
+def validateConstants(cvtType, pairs, values, cvt):
+	'''
+	Compares several IN points against the constants written to their OUT points. The IN values come from
+	the last refresh of the CVT mirror, i.e. the frame the loopback wait ended on, so no further read is needed.
+	Input:
+		cvtType			cvt type under test (for the failure message)
+		pairs			list of ('IN' point, 'OUT' point) tuples
+		values			constants written to the OUT points, one per pair
+		cvt				cvtMirror.CVTMirror holding the IN points
+	Return:
+		passed			list of booleans, one per pair
+	'''
+	passed = []
+	for (point_in, point_out), val in zip(pairs, values):
+		outVal = cvt.get(point_in)
+		if val!=outVal:
+			print('%s constant validation failed for %s and %s: %s and %s not equal\n' %(cvtType, point_in, point_out, val, outVal))
+		passed.append(val==outVal)
+	return passed
 
 
 # ---- VALIDATE DATA (after test is complete) ----
 
-t0 = None
-def validate(point_in, point_out):
+def pairTolerance(spec, est):
 	'''
-	Compares values of points against each other after test has finished running.
+	Tolerance of the IN against OUT comparison: TOL, plus the signal change over the measured delay and its
+	jitter unless COMPENSATE shifts the delay out before the comparison.
 	Input:
-		point_in		'IN' point to gather data from
-		point_out		'OUT' point to gather data from
+		spec			generator description driving the OUT point, or None
+		est				estimateDelay result of the pair
 	'''
-	swb.sessionStop()
+	if COMPENSATE or not spec:
+		return TOL
+	shift = sum(abs(v) for v in (est['delay'], est['jitter']) if v==v)
+	return TOL + ve.signalSlope(spec)*shift
+
+
+def validate(cell, pairs, specs=None):
+	'''
+	Compares values of points against each other after the session has been stopped.
+	All points are read from the data log with one readPoints call (one scan per point), then IN and OUT
+	samples of each pair are paired by their DL timestamps and compared in one vectorized pass.
+	The IN to OUT propagation delay of each pair is estimated by cross-correlation and either removed before
+	the tolerance check (COMPENSATE) or allowed for in the tolerance (see pairTolerance).
+	If REFERENCE is set, IN and OUT are also checked against the expected generator waveform with a tolerance
+	derived from the cell's raw and cvt types and the signal change over one fixed step plus the delay
+	jitter, which catches errors common to both sides. The delay is not part of it, as the reference start
+	is fitted to every series separately.
+	If TIMING is set, the logged record numbers and timestamps of both points must show one record per
+	fixed step, without missing records, gaps or drift (see validateEngine.timingStats).
+	If CHUNK is set, the session is validated in bounded memory instead (see validateChunked).
+	Input:
+		cell			matrix cell (testMatrix.Cell) whose session is validated
+		pairs			list of ('IN' point, 'OUT' point) tuples to gather data from
+		specs			generator description driving the OUT point of each pair (see generatorSpecs), or None
+	Return:
+		results			list of compareRecords results with delay and jitter (s), one per pair;
+						with a reference check, reference holds {'in', 'out'} compareReference results,
+						with a timing check, timing holds {'in', 'out'} timingStats results
+	'''
+	if CHUNK:
+		return validateChunked(cell, pairs, CHUNK, specs)
+	return validateRecords(cell, pairs, fetchRecords(cell, pairs), specs)
+
+
+def fetchRecords(cell, pairs):
+	'''
+	Reads the logged records of every point of pairs from the data log of the cell's session.
+	Return:
+		records			dict of point name -> dlReader.RecordBuffer (see dlReader.readPoints)
+	'''
+	with dlr.lock:
+		s = dlr.getSession(DL_HOST or HOST, PROJECT, cell.test+'/'+cell.session)
+		return dlr.readPoints([p for pair in pairs for p in pair], session=s)
+
+
+def validateRecords(cell, pairs, records, specs=None):
+	'''
+	The comparisons of validate on records already read with fetchRecords.
+	'''
+	results = []
+	for point_in, point_out in pairs:
+		recsIn = records[point_in]
+		recsOut = records[point_out]
+		est = ve.estimateDelay(recsIn.t, recsIn.cvt, recsOut.t, recsOut.alt)
+		spec = specs[pairs.index((point_in, point_out))] if specs else None
+		tol = pairTolerance(spec, est)
+		result = ve.compareRecords(recsIn.t, recsIn.cvt, recsOut.t, recsOut.alt, tol, lag=est['lag'] if COMPENSATE else 0)
+		result['tol'] = tol
+		result['delay'] = est['delay']
+		result['jitter'] = est['jitter']
+		if REFERENCE and spec:
+			refTol = ve.typeTolerance(cell.rawType, cell.cvtType, spec, ve.timeTolerance(STEP/1e6, est['jitter']))
+			result['reference'] = {
+				'in':ve.compareReference(recsIn.t, recsIn.cvt, spec, refTol, cell.rawType),
+				'out':ve.compareReference(recsOut.t, recsOut.alt, spec, refTol, cell.rawType)}
+			for side, point in (('in', point_in), ('out', point_out)):
+				ref = result['reference'][side]
+				if not ref['passed']:
+					print('%s %s reference validation failed for %s (tolerance %0.2e, %d out of range): %s\n'
+						  %(cell.cvtType,cell.protocol,point,ref['tol'],ref['outOfRange'],ve.formatResult(ref)))
+			result['passed'] = result['passed'] and result['reference']['in']['passed'] and result['reference']['out']['passed']
+		if TIMING:
+			result['timing'] = {'in':ve.timingStats(recsIn.recNum, recsIn.t, STEP*1000), 'out':ve.timingStats(recsOut.recNum, recsOut.t, STEP*1000)}
+			for side, point in (('in', point_in), ('out', point_out)):
+				timing = result['timing'][side]
+				if not timing['passed']:
+					print('%s %s timing validation failed for %s (step %d us): %s\n' %(cell.cvtType,cell.protocol,point,STEP,ve.formatTiming(timing)))
+			result['passed'] = result['passed'] and result['timing']['in']['passed'] and result['timing']['out']['passed']
+		if not result['passed']:
+			print('%s %s validation failed for %s and %s (tolerance %g): %s\n' %(cell.cvtType,cell.protocol,point_in,point_out,result['tol'],ve.formatResult(result)))
+		elif debug:
+			print('%s %s test passed for %s and %s: %s\n' %(cell.cvtType,cell.protocol,point_in,point_out,ve.formatResult(result)))
+		results.append(result)
+	return results
+
+
+def validateChunked(cell, pairs, chunk, specs=None):
+	'''
+	Compares IN and OUT points of a session too long to hold in memory. The records are streamed from the
+	data log in chunks to memory-mapped files (dlReader.spoolPoints) and compared chunk by chunk
+	(validateEngine.compareChunked). The propagation delay is estimated from the first chunk of each pair.
+	The reference and timing checks need whole series and are skipped, as are error percentiles.
+	Input:
+		cell			matrix cell (testMatrix.Cell) whose session is validated
+		pairs			list of ('IN' point, 'OUT' point) tuples to gather data from
+		chunk			records read and compared at a time
+		specs			generator description driving the OUT point of each pair, or None (see pairTolerance)
+	Return:
+		results			list of compareChunked results with delay and jitter (s), one per pair
+	'''
+	directory = tempfile.mkdtemp(prefix='simwb-validate-')
+	try:
+		with dlr.lock:
+			s = dlr.getSession(DL_HOST or HOST, PROJECT, cell.test+'/'+cell.session)
+			records = dlr.spoolPoints([p for pair in pairs for p in pair], directory, chunk, session=s)
+
+		results = []
+		for point_in, point_out in pairs:
+			recsIn = records[point_in]
+			recsOut = records[point_out]
+			est = ve.estimateDelay(recsIn.t[:chunk], recsIn.cvt[:chunk], recsOut.t[:chunk], recsOut.alt[:chunk])
+			tol = pairTolerance(specs[pairs.index((point_in, point_out))] if specs else None, est)
+			result = ve.compareChunked(recsIn.t, recsIn.cvt, recsOut.t, recsOut.alt, tol, chunk, lag=est['lag'] if COMPENSATE else 0)
+			result['tol'] = tol
+			result['delay'] = est['delay']
+			result['jitter'] = est['jitter']
+			if not result['passed']:
+				print('%s %s validation failed for %s and %s (tolerance %g): %s\n' %(cell.cvtType,cell.protocol,point_in,point_out,result['tol'],ve.formatResult(result)))
+			elif debug:
+				print('%s %s test passed for %s and %s: %s\n' %(cell.cvtType,cell.protocol,point_in,point_out,ve.formatResult(result)))
+			results.append(result)
+		return results
+	finally:
+		shutil.rmtree(directory, ignore_errors=True)
+
+
+def startAnalogCell(cell):
+	'''
+	Server side of a signal generator cell: provisions it, runs the session for the capture (validating live
+	if LIVE is set) and stops it, so the next cell can start while this one's data log is still validated.
+	Input:
+		cell			matrix cell (testMatrix.Cell) to run
+	Return:
+		pending			dict with keys cell, pairs, specs and live (liveValidate result, or None) for finishAnalogCell
+	'''
+	rawVal = getattr(swbC, 'RAWTYPE_%s' %cell.rawType)
 
-	r = dl.dlConnect('localhost')
-	if r != 0: sys.exit('DL Connection failed: %s' %dl.strerror(r))
-	
-	r = dl.dlSetProject(PROJECT)
-	if r != 0: sys.exit('DL Project selection failed: %s' %dl.strerror(r))
-	
-	r = dl.dlSetSession(TEST+'/'+SESSION)
-	if r != 0: sys.exit('DL Test/session selection failed: %s' %dl.strerror(r))
-	
-	r,info = dl.dlQueryTest()
-	if r != 0: sys.exit('Test query failed: %s' %dl.strerror(r))
-
-	r,d = dl.dlGetMetaTable()
-	if r < 0: sys.exit('Meta table failed: %s' %dl.strerror(r))
-
-	cvtVals = []
-	altVals = []
-	def cb(recNum, tSec, tNSec, cvtVal, altVal, rawVal, dlF, rtF):
-		global t0
-		t = float(tSec)+float(tNSec)/1000000000.
-		if not t0: t0 = t
-		if inpoint:
-			cvtVals.append(cvtVal)
-		else:
-			altVals.append(altVal)
-	
-	inpoint = True
-	r = dl.dlGetRecords(point_in, 1100, dl.dlAllSamples, cb)
-	if r != 0: sys.exit('Get records failed: %s' %dl.strerror(r))
-
-	inpoint = False
-	r = dl.dlGetRecords(point_out, 1100, dl.dlAllSamples, cb)
-	if r != 0: sys.exit('Get records failed: %s' %dl.strerror(r))
-
-	diff = np.subtract(cvtVals,altVals)
-	for val in diff:
-		if math.fabs(val) > TOL:
-			print('%s validation failed: difference between %s and %s %0.2e exeeds tolerance %d\n' %(CVTTYPE,point_in,point_out,math.fabs(val),TOL))
-			return
 	if debug:
-		print('%s test passed for %s and %s\n' %(CVTTYPE,point_in,point_out))
+		print('Starting %s %s test...' %(cell.cvtType,cell.protocol))
+
+	createAnalogPoints(cell.cvtType,cell.rawType,rawVal,cell.protocol,cell.metaFlags,rtdb=cell.rtdb,ports=cell.ports)
+
+	startTest(cell.session, test=cell.test, rtdb=cell.rtdb)
+	if not waits.waitForItems([POINT_IN1,POINT_OUT1,POINT_IN2,POINT_OUT2], label='session start'):
+		swb.sessionStop(swbC.SCHED_USERABORT)
+		sys.exit('Session start failed: points not readable after %0.1f s' %waits.TIMEOUT)
+	
+	start = time.time()
+	specs = generatorSpecs(generatorOffset(cell.cvtType))
+	startGenerator([POINT_OUT1,POINT_OUT2], specs)
+	if not waits.waitForChange(POINT_IN1, label='generator start'):
+		print('%s %s generator did not reach %s within %0.1f s\n' %(cell.cvtType,cell.protocol,POINT_IN1,waits.TIMEOUT))
+
+	pairs = [(POINT_IN1,POINT_OUT1), (POINT_IN2,POINT_OUT2)]
+	live = None
+	if LIVE:
+		live = lv.liveValidate(pairs, TOL, CAPTURE-(time.time()-start), abort=lambda: swb.sessionStop(swbC.SCHED_USERABORT))
+	if not (live and live['aborted']):
+		waits.hold(CAPTURE, start)
+		swb.sessionStop()
+	return {'cell':cell, 'pairs':pairs, 'specs':specs, 'live':live}
+
+
+def finishAnalogCell(pending):
+	'''
+	Client side of a signal generator cell: validates the stopped session from its data log (unless live
+	validation already failed it) and deletes the session. It reads the data log over the DL connection only;
+	the session deletion queued with sessionManager.retire goes over the SimWB connection, whose calls
+	connection.serialize keeps apart from those of the next cell starting in the caller's thread.
+	Input:
+		pending			startAnalogCell result
+	Return:
+		results			list of compareRecords results, one per IN/OUT pair
+	'''
+	cell, pairs, live = pending['cell'], pending['pairs'], pending['live']
+	if live and live['aborted']:
+		for (point_in, point_out), result in zip(pairs, live['results']):
+			if not result['passed']:
+				print('%s %s live validation failed for %s and %s (tolerance %d): %s\n' %(cell.cvtType,cell.protocol,point_in,point_out,TOL,ve.formatResult(result)))
+		results = live['results']
+	else:
+		results = validate(cell, pairs, pending['specs'])
+
+	sm.retire(cell.test, cell.session)
+	dlr.invalidate(cell.test+'/'+cell.session)
+	return results
+
+
+def runAnalogCell(cell):
+	'''
+	Provisions, runs and validates one signal generator cell of the analog matrix.
+	Input:
+		cell			matrix cell (testMatrix.Cell) to run
+	Return:
+		results			list of compareRecords results, one per IN/OUT pair
+	'''
+	return finishAnalogCell(startAnalogCell(cell))
+
+
+def analogCellKey(cell, scope=None, dlHost=None):
+	'''
+	Result cache key of a signal generator cell: everything its outcome depends on (see resultCache.cellKey).
+	Input:
+		cell			matrix cell (testMatrix.Cell)
+		scope			server/project the cell runs in (HOST+'/'+PROJECT if None)
+		dlHost			data log server the cell is validated from (DL_HOST or HOST if None)
+	'''
+	rawVal = getattr(swbC, 'RAWTYPE_%s' %cell.rawType)
+	points, iorecs, msg = analogConfig(cell.cvtType,cell.rawType,rawVal,cell.protocol,cell.metaFlags,ports=cell.ports)
+	return rc.cellKey(scope or HOST+'/'+PROJECT, {'test':'analog', 'dlHost':dlHost or DL_HOST or HOST, 'cvtType':cell.cvtType, 'rawType':cell.rawType, 'protocol':cell.protocol,
+						'metaFlags':cell.metaFlags, 'rtdb':pv.configHash(points, iorecs, msg), 'generators':generatorSpecs(generatorOffset(cell.cvtType)),
+						'tol':TOL, 'capture':CAPTURE, 'reference':REFERENCE, 'compensate':COMPENSATE, 'timing':TIMING, 'step':STEP, 'chunk':CHUNK})
 
 
 # ---- EXECUTE ANALOG TEST ----
@@ -233,88 +435,134 @@ POINT_IN2 = 'In.point3'
 POINT_OUT1 = 'Out.point2'
 POINT_OUT2 = 'Out.point4'
 TOL = 3
+CAPTURE = 2		#seconds of generator data logged per cell
+REFERENCE = 1		#check IN and OUT against the synthesized generator waveform with per-type tolerances
+COMPENSATE = 0		#shift OUT samples by the measured propagation delay before the tolerance check
+TIMING = 1		#fail cells whose data log has missing records, gaps longer than the fixed step or clock drift
+STEP = 1000		#fixed step of the test (us); the data log holds one record per step
+LIVE = 1		#sample pairs while the session runs and stop a cell as soon as a violation persists
+FORCE = '--force' in sys.argv		#run every cell, even unchanged cells that passed before (see resultCache)
+CHUNK = 0		#records read and compared at a time, for sessions too long to validate in memory (0 reads whole points; skips the reference and timing checks)
+PIPELINE = 2		#stopped cells queued for validation while another is validated, i.e. up to PIPELINE+1 stopped sessions wait (0 validates each cell before the next starts)
 
 # Test using signal generators:
 cvtTypes = ['char', 'short', 'int', 'llong', 'float', 'double', 'uint', 'uchar', 'ushort'] 		#type specified in point creation
 rawTypes = ['char', 'short', 'int', 'llong', 'float', 'double', 'llong', 'short', 'int']		#type specified in mapping
 protocols = ['tcp', 'udp']
 
-print('TESTING SIGNAL GENERATOR VALUES...\n')
-global CVTTYPE
-global RAWTYPE
-global SESSION
-for RAWTYPE,CVTTYPE in zip(rawTypes,cvtTypes):
-	for PROTOCOL in protocols:
-		SESSION = 'test_%s' %CVTTYPE
-		attr = 'RAWTYPE_%s' %RAWTYPE
-		rawVal = getattr(swbC, attr)
-		
-		if RAWTYPE=='int':
-			metaFlags = '48'
-		else:
-			metaFlags = '8'
 
-		if debug:
-			print('Starting %s %s test...' %(CVTTYPE,PROTOCOL))
-
-		createAnalogPoints(CVTTYPE,RAWTYPE,rawVal,PROTOCOL,metaFlags)
-		time.sleep(1)
-
-		startTest(SESSION)
-		time.sleep(1)
-		
-		if (CVTTYPE[0]=='u') | (CVTTYPE=='llong'):
-			startGenerator([POINT_OUT1,POINT_OUT2],100)
-		else:
-			startGenerator([POINT_OUT1,POINT_OUT2],0)
-		time.sleep(2)
-
-		validate(POINT_IN1, POINT_OUT1)
-		validate(POINT_IN2, POINT_OUT2)
-		
-		swb.sessionDelete(TEST, SESSION)
+def runSignalTest():
+	'''
+	Runs the signal generator matrix (every cvtType/rawType over every protocol).
+	Return:
+		passed			True if every cell ran and passed
+	'''
+	print('TESTING SIGNAL GENERATOR VALUES...\n')
+	cells = tm.buildCells(TEST, cvtTypes, rawTypes, protocols)
+	if PIPELINE:
+		results = tm.runPipeline(cells, startAnalogCell, finishAnalogCell, PIPELINE, keyOf=analogCellKey, force=FORCE)
+	else:
+		results = tm.runMatrix(cells, runAnalogCell, keyOf=analogCellKey, force=FORCE)
+	tm.printSummary(results, 'Signal generator test')
+	tm.printLatency(results, 'Signal generator test')
 
-swb.sessionStop(swbC.SCHED_USERABORT)
+	swb.sessionStop(swbC.SCHED_USERABORT)
 
-print('Signal generator test complete\n')
+	print('Signal generator test complete\n')
+	return all(tm.cellPassed(r) for r in results)
 
 
 # Test using constants:
-index = 0
 testVals = [-128,0,127,-32768,0,32767,-2.1e9,0,2.1e9,0,9e5,9e10,-1.1e38,0,1.1e38,-1.7e308,0,1.7e308,\
 			0,1e4,4.2e9,0,128,255,0,32767,65535] #Each group of three values corresponds respectively to a CVTTYPE
 
-print('TESTING CONSTANT VALUES...\n')
-count = 1
-for RAWTYPE,CVTTYPE in zip(rawTypes,cvtTypes):
+def runConstantTest():
+	'''
+	Writes the boundary values of every type and checks that they loop back unchanged.
+	The RTDB and test are built once per type; the values are written in rounds, one value per OUT point.
+	Return:
+		passed			True if every value looped back unchanged
+	'''
+	print('TESTING CONSTANT VALUES...\n')
+	pairs = [(POINT_IN1,POINT_OUT1), (POINT_IN2,POINT_OUT2)]
+	failed = 0
+	for n,(RAWTYPE,CVTTYPE) in enumerate(zip(rawTypes,cvtTypes)):
 
-	SESSION = 'test_'+CVTTYPE
-	attr = 'RAWTYPE_%s' %RAWTYPE
-	rawVal = getattr(swbC, attr)
-	
-	if RAWTYPE=='int':
-		metaFlags = '48'
-	else:
-		metaFlags = '8'
+		SESSION = 'test_'+CVTTYPE
+		attr = 'RAWTYPE_%s' %RAWTYPE
+		rawVal = getattr(swbC, attr)
+		metaFlags = tm.metaFlagsFor(RAWTYPE)
+
+		points, iorecs, msg = analogConfig(CVTTYPE,RAWTYPE,rawVal,'tcp',metaFlags)
+		rtdbHash = pv.configHash(points, iorecs, msg)
+		vals = []
+		for val in testVals[3*n:3*n+3]:
+			key = rc.cellKey(HOST+'/'+PROJECT, {'test':'constant', 'cvtType':CVTTYPE, 'rawType':RAWTYPE, 'metaFlags':metaFlags,
+								'rtdb':rtdbHash, 'value':val})
+			if FORCE or rc.lookup(key) is None:
+				vals.append((val, key))
+			elif debug:
+				print('%s constant %s unchanged and passed before, skipped' %(CVTTYPE, val))
+		if not vals:
+			continue
 
-	while count<4:
 		createAnalogPoints(CVTTYPE,RAWTYPE,rawVal,'tcp',metaFlags)
-		time.sleep(1)
 		startTest(SESSION)
-		time.sleep(1)
-		swb.setItemValue(POINT_OUT1, testVals[index])
-		time.sleep(1)
-		validateConstants(POINT_IN1, POINT_OUT1, testVals[index])
+		if not waits.waitForItems([p for pair in pairs for p in pair], label='session start'):
+			print('%s constant session did not start within %0.1f s\n' %(CVTTYPE, waits.TIMEOUT))
+			for val, key in vals:
+				rc.record(key, False)
+			failed += len(vals)
+			swb.sessionStop(swbC.SCHED_USERABORT)
+			sm.retire(TEST, SESSION)
+			continue
+		cvt = cm.CVTMirror([point_in for point_in, point_out in pairs])
+		for i in range(0, len(vals), len(pairs)):
+			batch = vals[i:i+len(pairs)]
+			used = pairs[:len(batch)]
+			cm.writeValues([point_out for point_in, point_out in used], [val for val, key in batch])
+			# a float point rounds the value, so the wait accepts one float step; validateConstants still compares exactly
+			if not cvt.waitForValues([point_in for point_in, point_out in used], [val for val, key in batch],
+									 label='constant loopback', rel=ve.FLOAT_EPS.get(CVTTYPE, 0.0)):
+				print('%s constant loopback timed out after %0.1f s for %s\n' %(CVTTYPE, waits.TIMEOUT, [val for val, key in batch]))
+			for (val, key), ok in zip(batch, validateConstants(CVTTYPE, used, [val for val, key in batch], cvt)):
+				rc.record(key, ok)
+				if not ok: failed += 1
 		swb.sessionStop()
-		index += 1
-		count += 1
-	count = 1
-	
+		
+		if debug:
+			print('%s constant testing complete\n' %CVTTYPE)
+		sm.retire(TEST, SESSION)
+
+	print('Constant test complete\n')
+	return failed==0
+
+
+def run(host=None, login=None, project=None, dlHost=None):
+	'''
+	Runs the analog suite: the signal generator matrix, then the constant values.
+	The connection is set up on first use, so suites run by runSuites share one login.
+	Input:
+		host			SimWB host (HOST if None)
+		login			'user/password' (LOGIN if None)
+		project			project to run in (PROJECT if None)
+		dlHost			data log server (DL_HOST if None)
+	Return:
+		passed			True if both tests passed
+	'''
+	global HOST, DL_HOST, LOGIN, PROJECT
+	DL_HOST = dlHost or DL_HOST
+	HOST, LOGIN, PROJECT = host or HOST, login or LOGIN, project or PROJECT
+	connection.connect(HOST, LOGIN, PROJECT)
+
+	passed = runSignalTest()
+	passed = runConstantTest() and passed
 	if debug:
-		print('%s constant testing complete\n' %CVTTYPE)
-	swb.sessionDelete(TEST, 'test_'+CVTTYPE)
+		waits.printSummary()
 
-print('Constant test complete\n')
+	print('Analog testing complete\n')
+	return passed
 
-print('Analog testing complete\n')
 
+if __name__=='__main__':
+	run()
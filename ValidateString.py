@@ -1,9 +1,14 @@
 from __future__ import print_function
 import sys
-import time
-import math
 import string
 
+import waits
+import provision as pv
+import sessionManager as sm
+import swbTrace
+import connection
+import cvtMirror as cm
+
 try:
 	import simwbClient as swb
 	import simwbConstants as swbC
@@ -11,10 +16,12 @@ try:
 except:
     sys.exit('Import failed')
 
+swbTrace.enableFromEnv(swb, dl)	#set SIMWB_TRACE=<file.json> to trace every client call
+
 debug = 0	#change to 1 to see test progress
 
 
-# ---- DEFINE INPUT AND CONNECT TO HOST ----
+# ---- DEFINE INPUT ----
 
 PROJECT = 'Hardware-Tests'
 HOST = 'localhost'
@@ -22,17 +29,6 @@ LOGIN = 'admin/nimda'
 TEST = 'string'
 RTDB = 'string_val'
 
-r = swb.connect(HOST)
-if r < 0: sys.exit('Connection failed: %s' %swb.strerror(r))
-
-r,p,g= swb.login(LOGIN)
-if r < 0: sys.exit('Login failed: %s' %swb.strerror(r))
-
-r = swb.projectSelect(PROJECT)
-if r < 0: 
-	r = swb.projectCreate(PROJECT)
-	if r < 0:	
-		sys.exit('Project selection failed: %s' %swb.strerror(r))
 
 
 # ---- INITIALIZE RTDB ----
@@ -63,7 +59,7 @@ def createStrAtts(pointType, message, strLength, startByte):
 	return [name,atts,maps]
 
 
-def createMsg(name, pointType, msgId, protocol, src, dest):
+def createMsg(name, pointType, msgId, protocol, src, dest, msgLength=30):
 	'''
 	Helper function for createStringPoints
 	Input:
@@ -73,92 +69,82 @@ def createMsg(name, pointType, msgId, protocol, src, dest):
 		protocol		either 'tcp' or 'udp'
 		src				source port number
 		dest			destination port number
+		msgLength		message length in bytes
 	Return:
 		msg				new line of message with information to be added to file NET-IO.msgs.1
 	'''
-	msg = str.encode('name=%s,type=%s,messageid=%s,protocol=%s,messagelength=30,srcport=%s,destip=127.0.0.1,destport=%s,samplingrate=10,msgflags=0x0000\n' 
-						  %(name, pointType, msgId, protocol, src, dest))
+	msg = str.encode('name=%s,type=%s,messageid=%s,protocol=%s,messagelength=%d,srcport=%s,destip=127.0.0.1,destport=%s,samplingrate=10,msgflags=0x0000\n' 
+						  %(name, pointType, msgId, protocol, msgLength, src, dest))
 	return msg
   
-def createStringPoints(strLength, startByte, protocol):
+def stringPairs(count=5):
+	'''
+	IN/OUT point names of count string pairs; the first five are (POINT_IN1, POINT_OUT1) to (POINT_IN5, POINT_OUT5).
+	'''
+	return [('In.point%02d' %(2*k+1), 'Out.point%02d' %(2*k+2)) for k in range(count)]
+
+def createStringPoints(strLength, startByte, protocol, pairs=5, force=False):
 	'''
 	Calls the functions createStrAttributes and createMsg to create string points and their NET-IO mappings in the current RTDB.
+	The strings of all pairs share one IN and one OUT message, pair k at byte k*startByte.
+	Only the parts that differ from the RTDB's last provisioned configuration are uploaded (see provision.provisionRTDB).
 	Inputs:
 		strLength		length of string
 		startByte		byte offset of string
 		protocol		either 'tcp' or 'udp'
+		pairs			number of IN/OUT point pairs (see stringPairs)
+		force			upload the whole configuration even if the server already has it
 	'''
-	r = swb.dbDelete(RTDB)
-
-	r = swb.dbSave(RTDB)
-	if r < 0: sys.exit('RTDB create failed: %s\n' %swb.strerror(r))
-
-	r = swb.dbLoad(RTDB)
-	if r < 0: sys.exit('RTDB load failed: %s\n' %swb.strerror(r))
-
-	[name1,atts1,maps1] = createStrAtts('STRI', 'in1', strLength, '0')
-	[name2,atts2,maps2] = createStrAtts('STRI', 'in1', strLength, startByte)
-	[name3,atts3,maps3] = createStrAtts('STRI', 'in1', strLength, str(int(startByte)*2))
-	[name4,atts4,maps4] = createStrAtts('STRI', 'in1', strLength, str(int(startByte)*3))
-	[name5,atts5,maps5] = createStrAtts('STRI', 'in1', strLength, str(int(startByte)*4))
-
-	[name6,atts6,maps6] = createStrAtts('STRO', 'out1', '0', '0')	
-	[name7,atts7,maps7] = createStrAtts('STRO', 'out1', '0', startByte)
-	[name8,atts8,maps8] = createStrAtts('STRO', 'out1', '0', str(int(startByte)*2))
-	[name9,atts9,maps9] = createStrAtts('STRO', 'out1', '0', str(int(startByte)*3))
-	[name10,atts10,maps10] = createStrAtts('STRO', 'out1', '0', str(int(startByte)*4))
-
-	points = {POINT_IN1:atts1, POINT_IN2:atts2, POINT_IN3:atts3, POINT_IN4:atts4, POINT_IN5:atts5,\
-			  POINT_OUT1:atts6, POINT_OUT2:atts7, POINT_OUT3:atts8, POINT_OUT4:atts9, POINT_OUT5:atts10}
-	r = swb.dbItemPut(points, save=True,)
-	if r < 0: sys.exit('Item create failed: %s' %swb.strerror(r))
-
-	iorecs = {name1:maps1, name2:maps2, name3:maps3, name4:maps4, name5:maps5,\
-			  name6:maps6, name7:maps7, name8:maps8, name9:maps9, name10:maps10}
-	r = swb.putIOMappingRecords(iorecs)
-	if r < 0: sys.exit('IO mapping failed: %s' %swb.strerror(r))
-
-	r = swb.dbSave(RTDB)
-	if r < 0: sys.exit('RTDB save failed: %s' %swb.strerror(r))
-	
+	points = {}
+	iorecs = {}
+	for k, (point_in, point_out) in enumerate(stringPairs(pairs)):
+		[name,atts,maps] = createStrAtts('STRI', 'in1', strLength, str(int(startByte)*k))
+		points[point_in] = atts
+		iorecs[name] = maps
+	for k, (point_in, point_out) in enumerate(stringPairs(pairs)):
+		[name,atts,maps] = createStrAtts('STRO', 'out1', '0', str(int(startByte)*k))
+		points[point_out] = atts
+		iorecs[name] = maps
+
+	msgLength = max(30, int(startByte)*(pairs-1)+int(strLength))
 	msg = []
-	msg.append(createMsg('in1', 'IN', '0', protocol, '1', '1000'))
-	msg.append(createMsg('out1', 'OUT', '0', protocol, '1000', '1'))
-	r = swb.putFileLines(msg, remoteDir='RTDB/'+RTDB, remoteFile='NET-IO.msgs.1')
-	if r < 0: sys.exit('Message transfer failed: %s' %swb.strerror(r))
+	msg.append(createMsg('in1', 'IN', '0', protocol, '1', '1000', msgLength))
+	msg.append(createMsg('out1', 'OUT', '0', protocol, '1000', '1', msgLength))
+
+	action = pv.provisionRTDB(RTDB, points, iorecs, msg, scope=HOST+'/'+PROJECT, force=force)
+	if debug:
+		print('RTDB %s %s' %(RTDB, action))
 
 
 # ---- INITIALIZE TEST ----
 
 def startTest(SESSION):
 	'''
-	Deletes old test (if available), then creates new test and session and starts running the session.
+	Creates a new session without data logging and starts running it; the test is only (re)created when its
+	definition changed (see sessionManager).
 	'''
-	r = swb.testDelete(TEST)
-
-	r = swb.testCreate(TEST, RTDB, 'New test', fixedstep=1000)
-	if r < 0: sys.exit('Test create failed: %s' %swb.strerror(r))
-	
-	r = swb.sessionCreate(TEST, SESSION, 'New test session', schedType=3, noDataLogging=1)
-	if r < 0: sys.exit('Session create failed: %s' %swb.strerror(r))
-	 
-	r = swb.sessionStart(TEST, SESSION) 
-	if r < 0: sys.exit('Session start failed: %s' %swb.strerror(r))
+	sm.startSession(TEST, SESSION, RTDB, 'New test session', schedType=3, noDataLogging=1, scope=HOST+'/'+PROJECT)
 
 
 # ---- VALIDATE DATA ----
 
-def validateString(point_in, point_out, new):
+def printable(val):
+	'''
+	Strips non-printable characters (string padding) from a point value.
+	'''
+	if val is None: return None
+	return ''.join(filter(lambda x: x in string.printable, val))
+
+def validateString(cvt, point_in, point_out, new):
 	'''
 	Compares values of points against each other after test has finished running.
 	Input:
+		cvt				cvtMirror.CVTMirror holding point_in, refreshed by the loopback wait
 		point_in		'IN' point to gather data from
 		point_out		'OUT' point to gather data from
 		new				value of point_out
 	'''
-	r, info = swb.getItemValues(point_in)
-	outVal = info[point_in]['value']
-	outVal = filter(lambda x: x in string.printable, outVal)
+	outVal = printable(cvt.get(point_in))
 		
 	if new != outVal:
 		print('string validation failed for %s and %s: %s and %s not equal\n' %(point_in, point_out, new, outVal))
@@ -167,6 +153,26 @@ def validateString(point_in, point_out, new):
 	return True
 
 
+def validateStrings(pairs, values, cvt):
+	'''
+	Compares several IN points against the strings written to their OUT points, using the IN values of
+	the last refresh of the CVT mirror.
+	Input:
+		pairs			list of ('IN' point, 'OUT' point) tuples
+		values			strings written to the OUT points, one per pair
+		cvt				cvtMirror.CVTMirror holding the IN points
+	Return:
+		failed			number of pairs whose IN value differs
+	'''
+	failed = 0
+	for (point_in, point_out), new in zip(pairs, values):
+		outVal = printable(cvt.get(point_in))
+		if new != outVal:
+			print('string validation failed for %s and %s: %s and %s not equal\n' %(point_in, point_out, new, outVal))
+			failed += 1
+	return failed
+
+
 # ---- EXECUTE STRING TEST ----
 
 POINT_IN1 = 'In.point01'
@@ -182,67 +188,105 @@ POINT_OUT4 = 'Out.point08'
 POINT_OUT5 = 'Out.point10'
 
 SESSION = 'test_string'
+BATCHED = 1		#1: write all OUT points, wait for one frame and check all IN points together; 0: one point at a time
 
-print('TESTING STRING VALUES...\n')
-createStringPoints('3', '4', 'tcp')
-time.sleep(1)
-
-startTest(SESSION)
-time.sleep(2)
-
-new = ['abc','def','ghi','jkl','mno','pqr','stu']
-
-n = 0
-count = 0
-index = 0
-while(n<10):
-	swb.setItemValue(POINT_OUT1, new[index])
-	time.sleep(0.3)
-	a = validateString(POINT_IN1, POINT_OUT1, new[index])
-	if a==False: count += 1
-	if count > 5: break
-	index += 1
-	if index > 6: index = 0
-
-	swb.setItemValue(POINT_OUT2, new[index])
-	time.sleep(0.3)
-	a = validateString(POINT_IN2, POINT_OUT2, new[index])
-	if a==False: count += 1
-	if count > 5: break
-	index += 1
-	if index > 6: index = 0
-
-	swb.setItemValue(POINT_OUT3, new[index])
-	time.sleep(0.3)
-	a = validateString(POINT_IN3, POINT_OUT3, new[index])
-	if a==False: count += 1
-	if count > 5: break
-	index += 1
-	if index > 6: index = 0
-
-	swb.setItemValue(POINT_OUT4, new[index])
-	time.sleep(0.3)
-	a = validateString(POINT_IN4, POINT_OUT4, new[index])
-	if a==False: count += 1
-	if count > 5: break
-	index += 1
-	if index > 6: index = 0
-
-	swb.setItemValue(POINT_OUT5, new[index])
-	time.sleep(0.3)
-	a = validateString(POINT_IN5, POINT_OUT5, new[index])
-	if a==False: count += 1
-	if count > 5: break
-	index += 1
-	if index > 6: index = 0
+def run(host=None, login=None, project=None):
+	'''
+	Runs the string suite: writes strings to the OUT points and checks that they loop back to the IN points.
+	The connection is set up on first use, so suites run by runSuites share one login.
+	Input:
+		host			SimWB host (HOST if None)
+		login			'user/password' (LOGIN if None)
+		project			project to run in (PROJECT if None)
+	Return:
+		passed			True if every string looped back unchanged
+	'''
+	global HOST, LOGIN, PROJECT
+	HOST, LOGIN, PROJECT = host or HOST, login or LOGIN, project or PROJECT
+	connection.connect(HOST, LOGIN, PROJECT)
+
+	print('TESTING STRING VALUES...\n')
+	createStringPoints('3', '4', 'tcp')
+
+	startTest(SESSION)
+	if not waits.waitForItems([POINT_IN1,POINT_IN2,POINT_IN3,POINT_IN4,POINT_IN5,POINT_OUT1,POINT_OUT2,POINT_OUT3,POINT_OUT4,POINT_OUT5], label='session start'):
+		swb.sessionStop(swbC.SCHED_USERABORT)
+		sys.exit('Session start failed: points not readable after %0.1f s' %waits.TIMEOUT)
+
+	new = ['abc','def','ghi','jkl','mno','pqr','stu']
+
+	n = 0
+	count = 0
+	index = 0
+	pairs = [(POINT_IN1,POINT_OUT1), (POINT_IN2,POINT_OUT2), (POINT_IN3,POINT_OUT3), (POINT_IN4,POINT_OUT4), (POINT_IN5,POINT_OUT5)]
+	points_in = [point_in for point_in, point_out in pairs]
+	points_out = [point_out for point_in, point_out in pairs]
+	cvt = cm.CVTMirror(points_in)		#every wait and check below reads all IN points with one getItemValues call
+	while(BATCHED and n<10):
+		vals = [new[(index+i)%len(new)] for i in range(len(pairs))]
+		cm.writeValues(points_out, vals)
+		if not cvt.waitForValues(points_in, vals, match=lambda a, b: printable(a)==b, label='string frame'):
+			print('string loopback timed out after %0.1f s for %s\n' %(waits.TIMEOUT, vals))
+		count += validateStrings(pairs, vals, cvt)		#counts every pair the wait timed out on
+		if count > 5: break
+		index = (index+len(pairs))%len(new)
+
+		n += 1
+
+	while(not BATCHED and n<10):
+		swb.setItemValue(POINT_OUT1, new[index])
+		cvt.waitFor(lambda: printable(cvt.get(POINT_IN1))==new[index], label='string loopback')
+		a = validateString(cvt, POINT_IN1, POINT_OUT1, new[index])
+		if a==False: count += 1
+		if count > 5: break
+		index += 1
+		if index > 6: index = 0
+
+		swb.setItemValue(POINT_OUT2, new[index])
+		cvt.waitFor(lambda: printable(cvt.get(POINT_IN2))==new[index], label='string loopback')
+		a = validateString(cvt, POINT_IN2, POINT_OUT2, new[index])
+		if a==False: count += 1
+		if count > 5: break
+		index += 1
+		if index > 6: index = 0
+
+		swb.setItemValue(POINT_OUT3, new[index])
+		cvt.waitFor(lambda: printable(cvt.get(POINT_IN3))==new[index], label='string loopback')
+		a = validateString(cvt, POINT_IN3, POINT_OUT3, new[index])
+		if a==False: count += 1
+		if count > 5: break
+		index += 1
+		if index > 6: index = 0
+
+		swb.setItemValue(POINT_OUT4, new[index])
+		cvt.waitFor(lambda: printable(cvt.get(POINT_IN4))==new[index], label='string loopback')
+		a = validateString(cvt, POINT_IN4, POINT_OUT4, new[index])
+		if a==False: count += 1
+		if count > 5: break
+		index += 1
+		if index > 6: index = 0
+
+		swb.setItemValue(POINT_OUT5, new[index])
+		cvt.waitFor(lambda: printable(cvt.get(POINT_IN5))==new[index], label='string loopback')
+		a = validateString(cvt, POINT_IN5, POINT_OUT5, new[index])
+		if a==False: count += 1
+		if count > 5: break
+		index += 1
+		if index > 6: index = 0
 	
-	n += 1
+		n += 1
+
+	if count==0:
+		print('All tests passed\n')
+	else:
+		print('Validation failed: %d tests failed\n' %count)
 
-if count==0:
-	print('All tests passed\n')
-else:
-	print('Validation failed: %d tests failed\n' %count)
+	swb.sessionStop(swbC.SCHED_USERABORT)
+	print('String testing complete\n')
+	if debug:
+		waits.printSummary()
+	return count==0
 
-swb.sessionStop(swbC.SCHED_USERABORT)
-print('String testing complete\n')
 
+if __name__=='__main__':
+	run()
@@ -0,0 +1,240 @@
+from __future__ import print_function
+import sys
+import os
+import time
+import json
+import argparse
+import platform
+import tracemalloc
+from contextlib import contextmanager
+
+if __name__=='__main__' and '--standin' in sys.argv:
+	sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'standin'))
+
+import connection
+import jsonCache
+import dlReader as dlr
+import testMatrix as tm
+import waits
+import swbTrace
+import cvtMirror as cm
+import ValidateAnalog as va
+import ValidateString as vs
+
+try:
+	import simwbClient as swb
+	import simwbConstants as swbC
+	import simwbDLClient as dl
+except:
+    sys.exit('Import failed')
+
+
+CONSTANT_VALUES = [-100, 0, 100]
+STRING_VALUES = ['abc','def','ghi','jkl','mno','pqr','stu']
+
+
+# ---- PHASE RECORDING ----
+
+class Recorder(object):
+	'''
+	Collects wall time, server calls and, when memory is set, peak traced memory per benchmark phase.
+	Tracing memory slows every allocation, so runBenchmarks reports wall times from a pass without it.
+	'''
+	def __init__(self, memory=False):
+		self.memory = memory
+		self.phases = []
+
+	@contextmanager
+	def phase(self, name):
+		calls = swbTrace.counts()
+		if self.memory: tracemalloc.reset_peak()
+		start = time.time()
+		try:
+			yield
+		finally:
+			wall = time.time() - start
+			peak = tracemalloc.get_traced_memory()[1] if self.memory else None
+			delta = dict((k, v-calls.get(k, 0)) for k, v in swbTrace.counts().items() if v!=calls.get(k, 0))
+			self.phases.append({'name':name, 'wall':wall, 'calls':delta, 'callsTotal':sum(delta.values()), 'peakBytes':peak})
+
+	def result(self):
+		return {'phases':self.phases, 'wall':sum(p['wall'] for p in self.phases),
+				'callsTotal':sum(p['callsTotal'] for p in self.phases)}
+
+
+# ---- HELPERS ----
+
+def suiteCell(cfg, name):
+	'''
+	Matrix cell of the benchmarked type and protocol with its own RTDB, test and session names.
+	'''
+	return tm.Cell(0, cfg.cvtType, cfg.rawType, cfg.protocol, tm.metaFlagsFor(cfg.rawType),
+				   'bench_%s_val' %name, 'bench_%s' %name, 'bench_%s_1' %name, (1, 1000))
+
+
+# ---- SUITES ----
+
+def benchAnalog(cfg, b):
+	cell = suiteCell(cfg, 'analog')
+	pairs = va.analogPairs(cfg.points)
+	with b.phase('provision'):
+		va.createAnalogPoints(cell.cvtType, cell.rawType, getattr(swbC, 'RAWTYPE_%s' %cell.rawType), cell.protocol, cell.metaFlags,
+							  rtdb=cell.rtdb, ports=cell.ports, pairs=cfg.points, force=True)
+	with b.phase('startTest'):
+		va.startTest(cell.session, test=cell.test, rtdb=cell.rtdb)
+		waits.waitForItems([p for pair in pairs for p in pair], label='session start')
+	with b.phase('generators'):
+		start = time.time()
+		specs = va.generatorSpecs(va.generatorOffset(cell.cvtType))
+		specs = [specs[k % len(specs)] for k in range(len(pairs))]
+		va.startGenerator([point_out for point_in, point_out in pairs], specs)
+		waits.waitForChange(pairs[0][0], label='generator start')
+	with b.phase('capture'):
+		waits.hold(cfg.sessionLength, start)
+		swb.sessionStop()
+	with b.phase('dlFetch'):
+		records = va.fetchRecords(cell, pairs)
+	with b.phase('compare'):
+		results = va.validateRecords(cell, pairs, records, specs)
+	swb.sessionDelete(cell.test, cell.session)
+	dlr.invalidate(cell.test+'/'+cell.session)
+	out = b.result()
+	out['samples'] = sum(r['samples'] for r in results)
+	out['failedPairs'] = sum(1 for r in results if not r['passed'])
+	return out
+
+
+def benchString(cfg, b):
+	session = 'bench_string_1'
+	pairs = vs.stringPairs(cfg.points)
+	with b.phase('provision'):
+		vs.createStringPoints('3', '4', cfg.protocol, pairs=cfg.points, force=True)
+	with b.phase('startTest'):
+		vs.startTest(session)
+		waits.waitForItems([p for pair in pairs for p in pair], label='session start')
+	failed = 0
+	cvt = cm.CVTMirror([point_in for point_in, point_out in pairs])
+	with b.phase('writeVerify'):
+		for n in range(cfg.rounds):
+			values = [STRING_VALUES[(n+k) % len(STRING_VALUES)] for k in range(len(pairs))]
+			cm.writeValues([point_out for point_in, point_out in pairs], values)
+			cvt.waitForValues(cvt.points, values, match=lambda a, b: vs.printable(a)==b, label='string frame')
+			if vs.validateStrings(pairs, values, cvt):
+				failed += 1
+	swb.sessionStop(swbC.SCHED_USERABORT)
+	swb.sessionDelete(vs.TEST, session)
+	out = b.result()
+	out['failedRounds'] = failed
+	return out
+
+
+def benchConstant(cfg, b):
+	cell = suiteCell(cfg, 'const')
+	pairs = va.analogPairs(cfg.points)
+	with b.phase('provision'):
+		va.createAnalogPoints(cell.cvtType, cell.rawType, getattr(swbC, 'RAWTYPE_%s' %cell.rawType), cell.protocol, cell.metaFlags,
+							  rtdb=cell.rtdb, ports=cell.ports, pairs=cfg.points, force=True)
+	with b.phase('startTest'):
+		va.startTest(cell.session, test=cell.test, rtdb=cell.rtdb)
+		waits.waitForItems([p for pair in pairs for p in pair], label='session start')
+	failed = 0
+	cvt = cm.CVTMirror([point_in for point_in, point_out in pairs])
+	with b.phase('writeVerify'):
+		for val in CONSTANT_VALUES:
+			values = [val]*len(pairs)
+			cm.writeValues([point_out for point_in, point_out in pairs], values)
+			cvt.waitForValues(cvt.points, values, label='constant loopback')
+			if not all(va.validateConstants(cell.cvtType, pairs, values, cvt)):
+				failed += 1
+	swb.sessionStop(swbC.SCHED_USERABORT)
+	swb.sessionDelete(cell.test, cell.session)
+	out = b.result()
+	out['failedValues'] = failed
+	return out
+
+
+SUITES = {'analog':benchAnalog, 'string':benchString, 'constant':benchConstant}
+
+
+def runBenchmarks(cfg):
+	'''
+	Runs the selected suites and returns the machine-readable results.
+	Input:
+		cfg				argparse namespace (see main)
+	Return:
+		results			dict with config, environment and per-suite phase results
+	Each suite runs twice: a timed pass, then (unless cfg.noMemory) a pass under tracemalloc whose peak
+	traced memory per phase is merged into the timed phases. With --standin the in-process server's
+	allocations are traced too, so peakBytes then covers client and server.
+	'''
+	swbTrace.enable(swb, dl, timeline=bool(cfg.trace))
+	connection.connect(cfg.host, cfg.login, cfg.project)
+	for suite in (va, vs):
+		suite.HOST, suite.LOGIN, suite.PROJECT = cfg.host, cfg.login, cfg.project
+	results = {'config':dict(vars(cfg)), 'time':time.time(), 'python':platform.python_version(),
+			   'machine':platform.node(), 'memoryIncludesServer':bool(cfg.standin and not cfg.noMemory), 'suites':{}}
+	for name in cfg.suites.split(','):
+		results['suites'][name] = SUITES[name](cfg, Recorder())
+	if cfg.noMemory:
+		return results
+	swbTrace.disable(swb, dl)		#the trace and call counts cover the timed pass only
+	tracemalloc.start()
+	try:
+		for name in cfg.suites.split(','):
+			b = Recorder(memory=True)
+			SUITES[name](cfg, b)
+			peaks = dict((p['name'], p['peakBytes']) for p in b.phases)
+			for p in results['suites'][name]['phases']:
+				p['peakBytes'] = peaks.get(p['name'])
+	finally:
+		tracemalloc.stop()
+	return results
+
+
+def printResults(results):
+	for name, suite in sorted(results['suites'].items()):
+		print('%s: %0.3f s, %d server calls' %(name, suite['wall'], suite['callsTotal']))
+		for p in suite['phases']:
+			peak = '%10.1f kB peak' %(p['peakBytes']/1024.) if p['peakBytes'] is not None else '%10s' %'-'
+			print('  %-12s %8.3f s %6d calls %s' %(p['name'], p['wall'], p['callsTotal'], peak))
+	if results['memoryIncludesServer']:
+		print('(peak memory includes the in-process stand-in server)')
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Per-phase benchmark of the hardware validation suites, driving the suites\' own functions')
+	parser.add_argument('--host', default='localhost')
+	parser.add_argument('--login', default='admin/nimda')
+	parser.add_argument('--project', default='Hardware-Tests')
+	parser.add_argument('--suites', default='analog,string,constant', help='comma separated subset of %s' %','.join(sorted(SUITES)))
+	parser.add_argument('--points', type=int, default=4, help='IN/OUT point pairs per suite')
+	parser.add_argument('--cvt-type', dest='cvtType', default='double', help='cvt type of the analog and constant points')
+	parser.add_argument('--raw-type', dest='rawType', default='double', help='raw type of the analog and constant points')
+	parser.add_argument('--protocol', default='tcp')
+	parser.add_argument('--session-length', dest='sessionLength', type=float, default=2.0, help='seconds of generator data logged')
+	parser.add_argument('--rounds', type=int, default=10, help='write/verify rounds of the string suite')
+	parser.add_argument('--output', default=None, help='write JSON results to this file')
+	parser.add_argument('--trace', default=None, help='write a Chrome trace of every client call to this file')
+	parser.add_argument('--no-memory', dest='noMemory', action='store_true', help='skip the second pass that measures peak traced memory')
+	parser.add_argument('--standin', action='store_true', help='run against an in-process stand-in server')
+	parser.add_argument('--frame-rate', dest='frameRate', type=float, default=None, help='stand-in frames per second (default: one per fixed step of the test, as the suites validate)')
+	parser.add_argument('--latency', type=float, default=0.0, help='stand-in loopback latency in seconds')
+	cfg = parser.parse_args(argv)
+
+	if cfg.standin:
+		import standInServer
+		jsonCache.disableLocalCaches()
+		server, cfg.host, rpc = standInServer.startServer(frameRate=cfg.frameRate, latency=cfg.latency)
+
+	results = runBenchmarks(cfg)
+	printResults(results)
+	if cfg.trace:
+		swbTrace.report()
+		swbTrace.dumpChromeTrace(cfg.trace)
+	if cfg.output:
+		with open(cfg.output, 'w') as f:
+			json.dump(results, f, indent=1, sort_keys=True)
+
+
+if __name__=='__main__':
+	main()
@@ -0,0 +1,73 @@
+from __future__ import print_function
+import sys
+import threading
+
+try:
+	import simwbClient as swb
+except:
+    sys.exit('Import failed')
+
+
+_state = {'host':None, 'login':None, 'project':None}
+_lock = threading.Lock()
+clientLock = threading.RLock()		#held for every call on the client, which is one connection per process
+
+
+def serialize(*modules):
+	'''
+	Wraps the public functions of client modules so that calls from several threads (background session
+	deletion, the CVT mirror refresh, pipelined validation) reach the single connection one at a time.
+	Applied to swb when this module is imported; wrapping a module twice has no effect.
+	'''
+	def locked(fn):
+		def wrapper(*args, **kwargs):
+			with clientLock:
+				return fn(*args, **kwargs)
+		wrapper._serialized = fn
+		wrapper.__name__ = getattr(fn, '__name__', 'call')
+		return wrapper
+	for module in modules:
+		for name in dir(module):
+			fn = getattr(module, name)
+			if name.startswith('_') or name=='strerror' or not callable(fn) or isinstance(fn, type) or hasattr(fn, '_serialized'):
+				continue
+			setattr(module, name, locked(fn))
+
+
+def connect(host, login, project):
+	'''
+	Connects, logs in and selects (or creates) the project on first use; later calls only redo what changed,
+	so suites run in one process share a single authenticated connection.
+	Input:
+		host			SimWB host name
+		login			'user/password'
+		project			project to select, created if it does not exist
+	'''
+	with _lock:
+		if _state['host'] != host or _state['login'] != login:
+			_state.update(host=None, login=None, project=None)
+			r = swb.connect(host)
+			if r < 0: sys.exit('Connection failed: %s' %swb.strerror(r))
+
+			r,p,g= swb.login(login)
+			if r < 0: sys.exit('Login failed: %s' %swb.strerror(r))
+			_state.update(host=host, login=login)
+
+		if _state['project'] != project:
+			r = swb.projectSelect(project)
+			if r < 0:
+				r = swb.projectCreate(project)
+				if r < 0:
+					sys.exit('Project selection failed: %s' %swb.strerror(r))
+			_state['project'] = project
+
+
+def reset():
+	'''
+	Forgets the connection state so the next connect starts over, e.g. after the server was restarted.
+	'''
+	with _lock:
+		_state.update(host=None, login=None, project=None)
+
+
+serialize(swb)
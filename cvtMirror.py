@@ -0,0 +1,216 @@
+from __future__ import print_function
+import sys
+import time
+import threading
+import numpy as np
+
+import waits
+import connection		#serializes the background refresh with the caller's calls
+
+try:
+	import simwbClient as swb
+except:
+    sys.exit('Import failed')
+
+
+FIELDS = ('value', 'altvalue')
+EXACT = 2**53		#integers beyond this are kept as Python ints, float64 would round them
+
+
+def _column(values):
+	'''
+	Compact array of one field of all points: float64 when every value fits exactly, else an object array.
+	'''
+	if all(isinstance(v, float) or (isinstance(v, (int, np.integer)) and not isinstance(v, bool) and -EXACT <= v <= EXACT) for v in values):
+		return np.array(values, dtype=np.float64)
+	column = np.empty(len(values), dtype=object)
+	column[:] = values
+	return column
+
+
+class CVTMirror(object):
+	'''
+	Client-side copy of the current value table for a registered set of points.
+	refresh reads every registered point with one getItemValues call and stores each field in an array
+	indexed by point, so any number of checks against the same frame cost one server round trip.
+	Reads (get, values) never touch the server; waits refresh the mirror until a condition on it holds.
+	With start, a background thread refreshes the mirror every interval and waits block until the next
+	refresh instead of polling.
+	Attributes:
+		points			registered point names, in index order
+		index			dict of point name -> index
+		frame			number of successful refreshes
+		stamp			time.time() of the last successful refresh
+		changed			boolean array, True for points whose value changed in the last refresh
+	'''
+	def __init__(self, points=(), fields=FIELDS):
+		self.points = []
+		self.index = {}
+		self.fields = tuple(fields)
+		self.columns = dict((f, np.zeros(0)) for f in self.fields)
+		self.changed = np.zeros(0, dtype=bool)
+		self.frame = 0
+		self.stamp = None
+		self.errors = 0
+		self._cond = threading.Condition()
+		self._thread = None
+		self._stop = threading.Event()
+		self.register(points)
+
+	def register(self, points):
+		'''
+		Adds points to the mirror; their fields read None until the next refresh.
+		Return:
+			indices			index of every point in the mirror's arrays
+		'''
+		with self._cond:
+			for p in points:
+				if p not in self.index:
+					self.index[p] = len(self.points)
+					self.points.append(p)
+			n = len(self.points)
+			for f in self.fields:
+				old = self.columns[f]
+				if old.size < n:
+					column = np.empty(n, dtype=object)
+					column[:old.size] = old
+					self.columns[f] = column
+			if self.changed.size < n:
+				self.changed = np.concatenate([self.changed, np.zeros(n-self.changed.size, dtype=bool)])
+		return [self.index[p] for p in points]
+
+	# ---- REFRESH ----
+
+	def refresh(self):
+		'''
+		Reads all registered points with one getItemValues call.
+		Return:
+			r				getItemValues return code; on failure the mirror keeps its previous values
+		'''
+		points = list(self.points)
+		if not points: return 0
+		r, info = swb.getItemValues(points)
+		with self._cond:
+			if r < 0:
+				self.errors += 1
+			else:
+				columns = dict((f, _column([info[p][f] for p in points])) for f in self.fields)
+				old = self.columns[self.fields[0]]
+				new = columns[self.fields[0]]
+				self.changed = np.array([o is None or o!=v for o, v in zip(old, new)], dtype=bool) if old.size==new.size \
+							   else np.ones(new.size, dtype=bool)
+				self.columns = columns
+				self.frame += 1
+				self.stamp = time.time()
+			self._cond.notify_all()
+		return r
+
+	def start(self, interval):
+		'''
+		Refreshes the mirror in a background thread every interval seconds, e.g. once per frame.
+		'''
+		if self._thread is not None: return
+		self._stop.clear()
+		def loop():
+			while not self._stop.is_set():
+				self.refresh()
+				self._stop.wait(interval)
+		self._thread = threading.Thread(target=loop)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def stop(self):
+		'''
+		Ends background refreshing.
+		'''
+		if self._thread is None: return
+		self._stop.set()
+		self._thread.join()
+		self._thread = None
+
+	# ---- LOCAL READS ----
+
+	def get(self, point, field='value'):
+		'''
+		Value of a point field as of the last refresh (None if it was never read).
+		'''
+		return self.columns[field][self.index[point]]
+
+	def values(self, points=None, field='value'):
+		'''
+		Values of several points as of the last refresh, as an array in the order of points (all if None).
+		'''
+		column = self.columns[field]
+		if points is None: return column
+		return column[[self.index[p] for p in points]]
+
+	# ---- WAITS ----
+
+	def waitFor(self, condition, timeout=None, label='cvt wait'):
+		'''
+		Waits until condition() holds on the mirror. Without a background refresh, every poll is one
+		refresh; with one, the condition is checked after every refresh.
+		Input:
+			condition		function without arguments reading the mirror (get, values)
+			timeout			seconds to wait before giving up (waits.TIMEOUT if None)
+			label			name the wait is recorded under in waits.history
+		Return:
+			value			last value returned by condition (false if the wait timed out)
+		'''
+		if self._thread is None:
+			return waits.waitFor(lambda: self.refresh() >= 0 and condition(), timeout, label)
+		if timeout is None: timeout = waits.TIMEOUT
+		start = time.time()
+		deadline = start + timeout
+		with self._cond:
+			frame = self.frame
+			value = condition()
+			while not value and time.time() < deadline:
+				self._cond.wait(deadline - time.time())
+				if self.frame!=frame:
+					frame = self.frame
+					value = condition()
+		waits.history.append((label, time.time()-start, bool(value)))
+		return value
+
+	def waitForValues(self, points, values, match=None, field='value', timeout=None, label='cvt values', tol=0.0, rel=0.0):
+		'''
+		Waits until every point field matches its expected value.
+		Input:
+			points			points to check (registered)
+			values			expected values, one per point
+			match			function(current, expected) -> True if they match (waits.near with tol and rel if None)
+			field			item field to check
+			tol, rel		absolute and relative difference accepted by the default match
+		Return:
+			ok				True if all points matched before the timeout; callers should fail or report the check otherwise
+		'''
+		if match is None: match = lambda a, b: waits.near(a, b, tol, rel)
+		return bool(self.waitFor(lambda: all(match(self.get(p, field), v) for p, v in zip(points, values)), timeout, label))
+
+	def waitForChange(self, points=None, field='value', timeout=None, label='cvt change'):
+		'''
+		Waits until any of the points (all registered points if None) differs from its value at the time of the call.
+		'''
+		if points is None: points = list(self.points)
+		if self.stamp is None: self.refresh()
+		initial = list(self.values(points, field))
+		return bool(self.waitFor(lambda: any(a!=b for a, b in zip(self.values(points, field), initial)), timeout, label))
+
+
+# ---- BULK WRITE ----
+
+def writeValues(points, values):
+	'''
+	Writes values to several points, in one bulk call when the client provides setItemValues.
+	Pair with CVTMirror.waitForValues on the IN points to wait for the loopback.
+	Input:
+		points			points to write (usually 'OUT' points)
+		values			values to write, one per point
+	'''
+	if hasattr(swb, 'setItemValues'):
+		r = swb.setItemValues(dict(zip(points, values)))
+		if r < 0: sys.exit('Set item values failed: %s' %swb.strerror(r))
+		return
+	for point, value in zip(points, values):
+		swb.setItemValue(point, value)
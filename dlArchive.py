@@ -0,0 +1,178 @@
+from __future__ import print_function
+import os
+import sys
+import time
+import shutil
+import numpy as np
+
+import jsonCache
+
+
+#local archive of fetched data log records; SIMWB_DL_ARCHIVE names another directory, or disables it if empty
+ARCHIVE_DIR = jsonCache.cachePath('SIMWB_DL_ARCHIVE', '.simwb_dl_archive')
+COLUMNS = (('recNum', np.int64), ('t', np.int64), ('cvt', np.float64), ('alt', np.float64), ('raw', np.float64))
+INDEX_FILE = 'index.json'
+MAX_AGE = 30*24*3600.0		#seconds an archived run is kept
+MAX_BYTES = 2*1024**3		#oldest runs are evicted while the archive holds more than this
+
+_index = jsonCache.JSONCache(lambda: os.path.join(ARCHIVE_DIR, INDEX_FILE) if ARCHIVE_DIR else None)
+
+
+def enabled():
+	'''
+	True if fetched records are archived (ARCHIVE_DIR set and local caches not disabled, see jsonCache).
+	'''
+	return jsonCache.localPath(ARCHIVE_DIR) is not None
+
+
+# ---- INDEX ----
+
+def _drop(index, run):
+	entry = index.pop(run)
+	shutil.rmtree(os.path.join(ARCHIVE_DIR, entry['dir']), ignore_errors=True)
+
+
+def _evict(index, now, keep=None):
+	for run in [r for r, e in index.items() if now - e['time'] > MAX_AGE and r!=keep]:
+		_drop(index, run)
+	total = sum(e.get('bytes', 0) for e in index.values())
+	for run in sorted(index, key=lambda r: index[r]['time']):
+		if total <= MAX_BYTES: break
+		if run==keep: continue
+		total -= index[run].get('bytes', 0)
+		_drop(index, run)
+
+
+def runId(host, project, session, start):
+	'''
+	Archive key of one run of a session; a session re-run under the same name gets a new start and a new key.
+	'''
+	return '%s|%s|%s|%d' %(host, project, session, start)
+
+
+# ---- ARCHIVED RECORDS ----
+
+class ArchivedRecords(object):
+	'''
+	Records of one point read back from the archive. Every column is a separate fixed-dtype .npy file,
+	memory-mapped on first use, so an analysis only pages in the columns and ranges it touches.
+	Has the attributes of dlReader.RecordBuffer (recNum, t, cvt, alt, raw) as read-only arrays.
+	'''
+	def __init__(self, path, count):
+		self.path = path
+		self.n = count
+		self._columns = {}
+
+	def __len__(self):
+		return self.n
+
+	def column(self, name):
+		a = self._columns.get(name)
+		if a is None:
+			if self.n==0:
+				a = np.zeros(0, dtype=dict(COLUMNS)[name])
+			else:
+				a = np.load(os.path.join(self.path, name+'.npy'), mmap_mode='r')
+			self._columns[name] = a
+		return a
+
+	recNum = property(lambda self: self.column('recNum'))
+	t = property(lambda self: self.column('t'))
+	cvt = property(lambda self: self.column('cvt'))
+	alt = property(lambda self: self.column('alt'))
+	raw = property(lambda self: self.column('raw'))
+
+
+# ---- STORE / LOAD ----
+
+def store(host, project, session, records):
+	'''
+	Writes fetched records to the archive. Points already archived for the same run are not rewritten.
+	Runs older than MAX_AGE are then evicted, and the oldest runs while the archive exceeds MAX_BYTES.
+	Input:
+		host			DL server host name
+		project			project name
+		session			'test/session' name
+		records			dict of point name -> RecordBuffer (or anything with the same column attributes)
+	Return:
+		run				archive key of the run (see runId); None if archiving is disabled
+	'''
+	if not enabled(): return None
+	firsts = [int(buf.t[0]) for buf in records.values() if len(buf)]
+	start = min(firsts) if firsts else 0
+	run = runId(host, project, session, start)
+	runDir = os.path.join(ARCHIVE_DIR, host, project, session, str(start))
+	if not os.path.isdir(ARCHIVE_DIR): os.makedirs(ARCHIVE_DIR)
+	with _index.update() as index:
+		entry = index.setdefault(run, {'host':host, 'project':project, 'session':session, 'start':start,
+									   'dir':os.path.relpath(runDir, ARCHIVE_DIR), 'time':time.time(), 'points':{}, 'bytes':0})
+		for point, buf in records.items():
+			if point in entry['points']: continue
+			pointDir = os.path.join(runDir, point)
+			tmp = '%s.%d.tmp' %(pointDir, os.getpid())
+			if os.path.exists(tmp): shutil.rmtree(tmp)
+			os.makedirs(tmp)
+			for name, dtype in COLUMNS:
+				np.save(os.path.join(tmp, name+'.npy'), np.ascontiguousarray(getattr(buf, name), dtype=dtype))
+			if os.path.exists(pointDir): shutil.rmtree(pointDir)
+			os.rename(tmp, pointDir)
+			entry['points'][point] = len(buf)
+			entry['bytes'] = entry.get('bytes', 0) + sum(os.path.getsize(os.path.join(pointDir, name+'.npy')) for name, dtype in COLUMNS)
+		_evict(index, time.time(), keep=run)
+	return run
+
+
+def runs(host=None, project=None, session=None):
+	'''
+	Archived runs, oldest first, optionally filtered.
+	Return:
+		entries			list of dicts with keys id, host, project, session, start (ns), dir, time, points (name -> count)
+						and bytes (size on disk)
+	'''
+	if not enabled(): return []
+	entries = [dict(entry, id=run) for run, entry in _index.read().items()
+			   if (host is None or entry['host']==host) and (project is None or entry['project']==project)
+			   and (session is None or entry['session']==session)]
+	return sorted(entries, key=lambda e: e['start'])
+
+
+def latest(host, project, session):
+	'''
+	Most recent archived run of a session, or None.
+	'''
+	entries = runs(host, project, session)
+	return entries[-1] if entries else None
+
+
+def load(run, points=None):
+	'''
+	Opens the archived records of a run without a server connection.
+	Input:
+		run				archive key (see runId) or an entry from runs
+		points			point names to open (all archived points if None)
+	Return:
+		records			dict of point name -> ArchivedRecords
+	'''
+	run = run['id'] if isinstance(run, dict) else run
+	entry = _index.read().get(run)
+	if entry is None: sys.exit('Archive run not found: %s' %run)
+	runDir = os.path.join(ARCHIVE_DIR, entry['dir'])
+	if points is None: points = sorted(entry['points'])
+	missing = [p for p in points if p not in entry['points']]
+	if missing: sys.exit('Archive run %s has no records of %s' %(run, ', '.join(missing)))
+	return dict((p, ArchivedRecords(os.path.join(runDir, p), entry['points'][p])) for p in points)
+
+
+def remove(run):
+	'''
+	Deletes a run from the archive.
+	'''
+	run = run['id'] if isinstance(run, dict) else run
+	with _index.update() as index:
+		if run in index: _drop(index, run)
+
+
+if __name__=='__main__':
+	for e in runs(*sys.argv[1:4]):
+		print('%s  %-24s %-20s %-32s %s' %(time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(e['start']/1e9)), e['host'], e['project'],
+			  e['session'], ', '.join('%s (%d)' %(p, n) for p, n in sorted(e['points'].items()))))
@@ -0,0 +1,344 @@
+from __future__ import print_function
+import sys
+import os
+import threading
+import numpy as np
+
+import dlArchive
+
+try:
+	import queue
+except ImportError:
+	import Queue as queue
+
+try:
+	import simwbDLClient as dl
+except:
+    sys.exit('Import failed')
+
+
+MAX_RECORDS = 2**31-1		#record count passed to dlGetRecords when the fetch is not capped
+
+
+# ---- RECORD BUFFER ----
+
+class RecordBuffer(object):
+	'''
+	Growable NumPy storage for data log records of one point.
+	The append method has the dlGetRecords callback signature, so a buffer can be handed to the DL client directly.
+	Attributes (views of the filled part of the buffer):
+		recNum			record numbers (int64)
+		t				timestamps in nanoseconds (int64)
+		cvt				cvt values (float64)
+		alt				alt values (float64)
+		raw				raw values (float64)
+	'''
+	def __init__(self, capacity=4096):
+		self.n = 0
+		self._recNum = np.empty(capacity, dtype=np.int64)
+		self._t = np.empty(capacity, dtype=np.int64)
+		self._cvt = np.empty(capacity, dtype=np.float64)
+		self._alt = np.empty(capacity, dtype=np.float64)
+		self._raw = np.empty(capacity, dtype=np.float64)
+
+	def __len__(self):
+		return self.n
+
+	def _grow(self):
+		capacity = max(2*self._t.size, 1)
+		for attr in ('_recNum', '_t', '_cvt', '_alt', '_raw'):
+			old = getattr(self, attr)
+			new = np.empty(capacity, dtype=old.dtype)
+			new[:self.n] = old[:self.n]
+			setattr(self, attr, new)
+
+	def append(self, recNum, tSec, tNSec, cvtVal, altVal, rawVal, dlF=0, rtF=0):
+		if self.n==self._t.size:
+			self._grow()
+		i = self.n
+		self._recNum[i] = recNum
+		self._t[i] = int(tSec)*1000000000 + int(tNSec)
+		self._cvt[i] = cvtVal
+		self._alt[i] = altVal
+		self._raw[i] = rawVal
+		self.n = i+1
+
+	def full(self):
+		return self.n==self._t.size
+
+	def clear(self):
+		self.n = 0
+
+	recNum = property(lambda self: self._recNum[:self.n])
+	t = property(lambda self: self._t[:self.n])
+	cvt = property(lambda self: self._cvt[:self.n])
+	alt = property(lambda self: self._alt[:self.n])
+	raw = property(lambda self: self._raw[:self.n])
+
+
+# ---- DATA LOG SESSION ----
+
+class DLSession(object):
+	'''
+	Data log selection for one (host, project, test/session) key.
+	Holds the dlQueryTest info and the meta table so repeated reads of the same session skip the handshake,
+	and the records already read by readPoints (point name -> RecordBuffer).
+	'''
+	def __init__(self, host, project, session):
+		self.key = (host, project, session)
+		self.host = host
+		self.project = project
+		self.session = session
+		self.info = None
+		self.meta = None
+		self.records = {}
+
+
+lock = threading.RLock()		#hold while selecting a session and reading from it when several threads share the DL client
+_active = {'host':None, 'project':None, 'session':None}
+_sessions = {}
+_scans = []		#fetch threads of iterRecords generators closed early, still draining their scan
+
+
+def _awaitScans():
+	# the DL client runs one scan at a time: let scans abandoned by closed iterRecords generators end first
+	while _scans:
+		_scans.pop().join()
+
+
+def getSession(host, project, session):
+	'''
+	Returns the cached DL session for the key, connecting and selecting only what changed since the last call.
+	Input:
+		host			DL server host name
+		project			project name
+		session			'test/session' name
+	Return:
+		s				DLSession with info and meta table loaded
+	'''
+	_awaitScans()
+	key = (host, project, session)
+	s = _sessions.get(key)
+	if s is None:
+		s = _sessions[key] = DLSession(host, project, session)
+
+	if _active['host'] != host:
+		_active.update(host=None, project=None, session=None)
+		r = dl.dlConnect(host)
+		if r != 0: sys.exit('DL Connection failed: %s' %dl.strerror(r))
+		_active['host'] = host
+
+	if _active['project'] != project:
+		_active.update(project=None, session=None)
+		r = dl.dlSetProject(project)
+		if r != 0: sys.exit('DL Project selection failed: %s' %dl.strerror(r))
+		_active['project'] = project
+
+	if _active['session'] != key:
+		# the DL client keeps one selection, so switching sessions reloads the meta table
+		s.info = s.meta = None
+		r = dl.dlSetSession(session)
+		if r != 0: sys.exit('DL Test/session selection failed: %s' %dl.strerror(r))
+		_active['session'] = key
+
+	if s.meta is None:
+		r,s.info = dl.dlQueryTest()
+		if r != 0: sys.exit('Test query failed: %s' %dl.strerror(r))
+
+		r,s.meta = dl.dlGetMetaTable()
+		if r < 0: sys.exit('Meta table failed: %s' %dl.strerror(r))
+	return s
+
+
+def invalidate(session=None):
+	'''
+	Drops cached DL session state, e.g. after a session has been deleted or re-run under the same name.
+	Input:
+		session			'test/session' name to drop (all sessions if None)
+	'''
+	for key in list(_sessions):
+		if session is None or key[2]==session:
+			del _sessions[key]
+			if _active['session']==key:
+				_active['session'] = None
+
+
+# ---- READ DATA LOG ----
+
+def readRecords(point, maxRecords=MAX_RECORDS, capacity=4096):
+	'''
+	Reads all logged records of a point from the currently selected DL session into a RecordBuffer.
+	Input:
+		point			point name to read
+		maxRecords		largest number of records to fetch (not capped by default)
+		capacity		initial buffer size, grown as needed
+	Return:
+		buf				RecordBuffer holding the point's records
+	'''
+	_awaitScans()
+	buf = RecordBuffer(capacity)
+	r = dl.dlGetRecords(point, maxRecords, dl.dlAllSamples, buf.append)
+	if r != 0: sys.exit('Get records failed: %s' %dl.strerror(r))
+	return buf
+
+
+
+def readPoints(points, maxRecords=MAX_RECORDS, session=None):
+	'''
+	Reads the records of several points and returns them per point.
+	This is not a single scan: the dlGetRecords callback carries no point identifier, so every distinct
+	point is fetched with a scan of its own, one after another over the DL client's single connection,
+	and the data log I/O grows linearly with the number of points. Duplicates are fetched once. With a
+	DLSession the results are kept on it, so repeated reads of the same points (e.g. a re-validation)
+	do not touch the server. Records fetched for a DLSession are also written to the local archive
+	(see dlArchive) for offline re-analysis.
+	Input:
+		points			list of point names (duplicates are read once)
+		maxRecords		largest number of records to fetch per point (not capped by default)
+		session			DLSession from getSession to cache the results on (optional)
+	Return:
+		records			dict of point name -> RecordBuffer
+	'''
+	cache = session.records if session is not None else {}
+	missing = []
+	seen = set(cache)
+	for p in points:
+		if p not in seen:
+			seen.add(p)
+			missing.append(p)
+	if missing and session is not None and _active['session'] != session.key:
+		getSession(*session.key)
+	for point in missing:
+		cache[point] = readRecords(point, maxRecords)
+	if missing and session is not None and dlArchive.enabled():
+		dlArchive.store(session.host, session.project, session.session, cache)
+	return dict((p, cache[p]) for p in points)
+
+def iterRecords(point, chunkSize=65536, maxRecords=MAX_RECORDS, depth=2):
+	'''
+	Generator over the logged records of a point in fixed-size chunks, for sessions too long to hold in memory.
+	The DL fetch runs in a worker thread; at most depth full chunks are queued ahead of the consumer.
+	Closing the generator early returns at once: the worker drains the rest of the scan without keeping
+	records, and the next DL read of this module waits for it.
+	Input:
+		point			point name to read
+		chunkSize		number of records per chunk (the last chunk may be shorter)
+		maxRecords		largest number of records to fetch (not capped by default)
+		depth			number of chunks buffered ahead of the consumer
+	Yield:
+		buf				RecordBuffer holding the next chunk of records
+	'''
+	_awaitScans()
+	chunks = queue.Queue(maxsize=depth)
+	stop = threading.Event()
+	state = {'buf':RecordBuffer(chunkSize), 'r':0}
+
+	def put(item):
+		while not stop.is_set():
+			try:
+				chunks.put(item, timeout=0.1)
+				return
+			except queue.Full:
+				pass
+
+	def cb(recNum, tSec, tNSec, cvtVal, altVal, rawVal, dlF, rtF):
+		if stop.is_set(): return
+		buf = state['buf']
+		buf.append(recNum, tSec, tNSec, cvtVal, altVal, rawVal)
+		if buf.full():
+			put(buf)
+			state['buf'] = RecordBuffer(chunkSize)
+
+	def fetch():
+		try:
+			state['r'] = dl.dlGetRecords(point, maxRecords, dl.dlAllSamples, cb)
+		finally:
+			if len(state['buf']): put(state['buf'])
+			put(None)
+
+	worker = threading.Thread(target=fetch)
+	worker.daemon = True
+	worker.start()
+	finished = False
+	try:
+		while True:
+			buf = chunks.get()
+			if buf is None: break
+			yield buf
+		finished = True
+	finally:
+		stop.set()
+		if finished:
+			worker.join()
+		else:
+			_scans.append(worker)
+	if state['r'] != 0: sys.exit('Get records failed: %s' %dl.strerror(state['r']))
+
+
+# ---- SPOOLED RECORDS ----
+
+class SpooledRecords(object):
+	'''
+	Records of one point streamed from the data log to one raw file per column and memory-mapped for
+	reading, so a point of any length is held in bounded memory. Has the attributes of RecordBuffer
+	(recNum, t, cvt, alt, raw) as read-only arrays.
+	'''
+	def __init__(self, path):
+		self.path = path
+		self.n = 0
+		self._columns = {}
+		if not os.path.isdir(path): os.makedirs(path)
+
+	def __len__(self):
+		return self.n
+
+	def extend(self, buf):
+		'''
+		Appends the records of a RecordBuffer (e.g. one chunk from iterRecords).
+		'''
+		for name, dtype in dlArchive.COLUMNS:
+			with open(os.path.join(self.path, name), 'ab') as f:
+				np.ascontiguousarray(getattr(buf, name), dtype=dtype).tofile(f)
+		self.n += len(buf)
+		self._columns.clear()
+
+	def column(self, name):
+		a = self._columns.get(name)
+		if a is None:
+			dtype = dict(dlArchive.COLUMNS)[name]
+			a = np.memmap(os.path.join(self.path, name), dtype=dtype, mode='r', shape=(self.n,)) if self.n else np.zeros(0, dtype=dtype)
+			self._columns[name] = a
+		return a
+
+	recNum = property(lambda self: self.column('recNum'))
+	t = property(lambda self: self.column('t'))
+	cvt = property(lambda self: self.column('cvt'))
+	alt = property(lambda self: self.column('alt'))
+	raw = property(lambda self: self.column('raw'))
+
+
+def spoolPoints(points, directory, chunkSize=65536, maxRecords=MAX_RECORDS, session=None):
+	'''
+	Streams the records of several points chunk by chunk (see iterRecords) to memory-mapped column files,
+	one scan per point, so no more than a few chunks are held in memory at a time. With a DLSession the
+	spooled records are also written to the local archive (see dlArchive), as readPoints does.
+	Input:
+		points			list of point names (duplicates are read once)
+		directory		directory the column files are written to, one subdirectory per point
+		chunkSize		records per chunk
+		maxRecords		largest number of records to fetch per point (not capped by default)
+		session			DLSession from getSession to select first and to archive the records under (optional)
+	Return:
+		records			dict of point name -> SpooledRecords
+	'''
+	if session is not None and _active['session'] != session.key:
+		getSession(*session.key)
+	records = {}
+	for point in points:
+		if point in records: continue
+		spooled = records[point] = SpooledRecords(os.path.join(directory, point))
+		for buf in iterRecords(point, chunkSize, maxRecords):
+			spooled.extend(buf)
+	if records and session is not None and dlArchive.enabled():
+		dlArchive.store(session.host, session.project, session.session, records)
+	return records
@@ -0,0 +1,131 @@
+from __future__ import print_function
+import os
+import json
+import threading
+from contextlib import contextmanager
+
+try:
+	import fcntl
+except ImportError:
+	fcntl = None		#no file locking; concurrent processes may then lose each other's changes
+
+
+#environment variables naming the local caches: the RTDB, test and result caches and the data log archive
+CACHE_VARS = ('SIMWB_RTDB_CACHE', 'SIMWB_TEST_CACHE', 'SIMWB_RESULT_CACHE', 'SIMWB_DL_ARCHIVE')
+
+_disabled = False		#set by disableLocalCaches
+
+
+# ---- POLICY ----
+
+def cachePath(var, name):
+	'''
+	Location of a local cache: the environment variable var overrides it, and an empty value turns the
+	cache off (memory only); by default it is name in the home directory.
+	Input:
+		var				one of CACHE_VARS
+		name			file or directory name in the home directory
+	Return:
+		path			path of the cache, or None
+	'''
+	return os.environ.get(var, os.path.join(os.path.expanduser('~'), name)) or None
+
+
+def disableLocalCaches():
+	'''
+	Keeps every local cache in memory only, in this process and in the processes it starts, e.g. for a
+	run against a throwaway stand-in server whose state must not be remembered for the real servers.
+	'''
+	global _disabled
+	_disabled = True
+	for var in CACHE_VARS:
+		os.environ[var] = ''
+
+
+def localPath(path):
+	'''
+	The path of a cache as it may be used now: None once disableLocalCaches was called.
+	'''
+	return None if _disabled else path
+
+
+class JSONCache(object):
+	'''
+	Dict kept in a JSON file, shared by the RTDB, test, result and data log archive caches.
+	The file is re-read whenever another process changed it, and every change is made under an exclusive
+	lock on the file and merged into its current content, so concurrent runs keep each other's entries.
+	Without a file the dict is kept in memory only.
+	Input:
+		pathOf			function returning the file (None for memory only); called on every access, so the
+						owning module's CACHE_FILE may be changed at runtime (see also disableLocalCaches)
+	'''
+	def __init__(self, pathOf):
+		self.pathOf = pathOf
+		self._lock = threading.RLock()
+		self._memory = {}
+		self._data = {}
+		self._loaded = None		#(path, mtime, size) the file was last read at
+
+	def _read(self, path):
+		try:
+			st = os.stat(path)
+		except OSError:
+			self._data, self._loaded = {}, None
+			return self._data
+		if self._loaded != (path, st.st_mtime, st.st_size):
+			try:
+				with open(path) as f:
+					self._data = json.load(f)
+			except (IOError, ValueError):
+				self._data = {}
+			self._loaded = (path, st.st_mtime, st.st_size)
+		return self._data
+
+	def read(self):
+		'''
+		Current content. The dict must not be changed; use update for that.
+		'''
+		with self._lock:
+			path = localPath(self.pathOf())
+			return self._read(path) if path else self._memory
+
+	@contextmanager
+	def update(self):
+		'''
+		Context giving the current content for changes, written back when the block ends without an exception.
+		'''
+		with self._lock:
+			path = localPath(self.pathOf())
+			if not path:
+				yield self._memory
+				return
+			with open(path + '.lock', 'a') as lock:
+				if fcntl: fcntl.flock(lock, fcntl.LOCK_EX)
+				try:
+					self._loaded = None
+					data = self._read(path)
+					yield data
+					tmp = '%s.%d.tmp' %(path, os.getpid())
+					with open(tmp, 'w') as f:
+						json.dump(data, f, sort_keys=True)
+					os.rename(tmp, path)
+					self._loaded = None
+				finally:
+					if fcntl: fcntl.flock(lock, fcntl.LOCK_UN)
+
+	def forget(self, scope=None, name=None):
+		'''
+		Drops entries keyed 'scope|name' (see scopedKey) that match scope and name; None matches everything.
+		'''
+		with self.update() as data:
+			for key in list(data):
+				s, n = key.split('|', 1)
+				if (scope is None or s==scope) and (name is None or n==name):
+					del data[key]
+
+
+def scopedKey(scope, name):
+	'''
+	Key of an RTDB or test in a cache: its server/project scope and name.
+	'''
+	return '%s|%s' %(scope, name)
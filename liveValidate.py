@@ -0,0 +1,141 @@
+from __future__ import print_function
+import sys
+import time
+from collections import deque
+
+try:
+	import simwbClient as swb
+except:
+    sys.exit('Import failed')
+
+
+INTERVAL = 0.01		#seconds between samples of all pairs
+PERSIST = 5			#consecutive out-of-tolerance samples that fail a pair
+WINDOW = 5			#recent OUT samples an IN sample may match; covers the NET-IO loopback latency
+BATCH = 16			#pairs read per getItemValues call; batches are read one after another over the single connection
+
+
+# ---- RUNNING STATISTICS ----
+
+class PairStats(object):
+	'''
+	Running error statistics of one IN/OUT pair sampled while the session runs.
+	An IN sample is compared against the range of the last WINDOW OUT samples, so the loopback
+	delay between writing OUT and reading it back on IN does not count as an error.
+	'''
+	def __init__(self, pointIn, pointOut, tol, window=WINDOW):
+		self.pointIn = pointIn
+		self.pointOut = pointOut
+		self.tol = tol
+		self.recent = deque(maxlen=window)
+		self.samples = 0
+		self.total = 0.0
+		self.max = 0.0
+		self.violations = 0
+		self.consecutive = 0
+		self.worstIndex = -1
+		self.worstTime = 0.0
+
+	def update(self, inVal, outVal, t):
+		'''
+		Adds one sample (IN cvt value, OUT alt value at time t) and returns its error.
+		'''
+		self.recent.append(outVal)
+		lo, hi = min(self.recent), max(self.recent)
+		err = lo-inVal if inVal < lo else inVal-hi if inVal > hi else 0.0
+		if err > self.max:
+			self.max = err
+			self.worstIndex = self.samples
+			self.worstTime = t
+		self.samples += 1
+		self.total += err
+		if err > self.tol:
+			self.violations += 1
+			self.consecutive += 1
+		else:
+			self.consecutive = 0
+		return err
+
+	def result(self, persist=PERSIST):
+		'''
+		Statistics in the form of validateEngine.compareRecords results (without percentiles).
+		'''
+		return {'samples':self.samples, 'unmatchedIn':0, 'unmatchedOut':0, 'max':self.max,
+				'mean':self.total/self.samples if self.samples else 0.0, 'percentiles':{},
+				'violations':self.violations, 'worstIndex':self.worstIndex, 'worstTime':self.worstTime,
+				'passed':self.samples > 0 and self.consecutive < persist, 'live':True}
+
+
+# ---- SAMPLER ----
+
+def _read(group):
+	points = [p for s in group for p in (s.pointIn, s.pointOut)]
+	return swb.getItemValues(points)
+
+
+def sample(stats, duration, interval=INTERVAL, persist=PERSIST, batch=BATCH, abort=None):
+	'''
+	Samples all pairs at a fixed rate until duration has passed or a violation persists.
+	Input:
+		stats			list of PairStats to update
+		duration		seconds to sample
+		interval		seconds between samples
+		persist			consecutive violating samples that fail a pair and end sampling
+		batch			pairs per getItemValues call
+		abort			function called once when a pair fails (e.g. to stop the session)
+	Return:
+		info			dict with keys failed (PairStats that failed), ticks, late (ticks that overran interval) and readErrors
+	'''
+	groups = [stats[i:i+batch] for i in range(0, len(stats), batch)]
+	info = {'failed':[], 'ticks':0, 'late':0, 'readErrors':0}
+	start = time.time()
+	tick = start
+	while tick - start < duration:
+		replies = [_read(g) for g in groups]
+		t = time.time() - start
+		for group, (r, values) in zip(groups, replies):
+			if r < 0:
+				info['readErrors'] += 1
+				continue
+			for s in group:
+				s.update(values[s.pointIn]['value'], values[s.pointOut]['altvalue'], t)
+		info['ticks'] += 1
+		info['failed'] = [s for s in stats if s.consecutive >= persist]
+		if info['failed']:
+			if abort is not None: abort()
+			break
+		tick += interval
+		wait = tick - time.time()
+		if wait < 0:
+			info['late'] += 1
+			tick = time.time()
+		time.sleep(max(0.0, wait))
+	return info
+
+
+def liveValidate(pairs, tol, duration, interval=INTERVAL, persist=PERSIST, window=WINDOW, batch=BATCH, abort=None):
+	'''
+	Validates IN/OUT pairs while the session runs by sampling the current values of all pairs at a fixed rate.
+	Ends early, calling abort, as soon as one pair stays out of tolerance for persist samples in a row,
+	so a broken type or protocol fails within a few sample intervals instead of after the full capture.
+	Input:
+		pairs			list of ('IN' point, 'OUT' point) tuples
+		tol				largest allowed difference between IN value and OUT alt value
+		duration		seconds to sample
+		interval		seconds between samples
+		persist			consecutive violating samples that fail a pair
+		window			recent OUT samples an IN sample may match
+		batch			pairs per getItemValues call
+		abort			function called once when a pair fails
+	Return:
+		live			dict with keys results (one compareRecords-style result per pair), aborted,
+						failed (list of failed pairs), ticks, late, readErrors and time (s)
+	'''
+	stats = [PairStats(i, o, tol, window) for i, o in pairs]
+	start = time.time()
+	info = sample(stats, duration, interval, persist, batch, abort)
+	info['results'] = [s.result(persist) for s in stats]
+	info['aborted'] = bool(info['failed'])
+	info['failed'] = [(s.pointIn, s.pointOut) for s in info['failed']]
+	info['time'] = time.time() - start
+	return info
@@ -0,0 +1,148 @@
+from __future__ import print_function
+import sys
+import itertools
+
+import provision as pv
+
+try:
+	import simwbConstants as swbC
+except:
+    sys.exit('Import failed')
+
+
+RAW_SIZES = {'char':1, 'uchar':1, 'short':2, 'ushort':2, 'int':4, 'uint':4, 'llong':8, 'ullong':8, 'float':4, 'double':8}
+MSG_PAD = 10		#bytes added to the payload length, as in the hand-written layouts (8-byte value -> messagelength=18)
+
+
+# ---- SINGLE RECORDS ----
+
+def createMsg(name, pointType, msgId, protocol, src, dest, msgLength=18, samplingRate=10):
+	'''
+	Returns one NET-IO.msgs.1 line.
+	Input:
+		name			name of message
+		pointType		either 'IN' or 'OUT'
+		msgId			ID number associated with message
+		protocol		either 'tcp' or 'udp'
+		src				source port number
+		dest			destination port number
+		msgLength		message length in bytes
+		samplingRate	message sampling rate
+	'''
+	return str.encode('name=%s,type=%s,messageid=%s,protocol=%s,messagelength=%s,srcport=%s,destip=127.0.0.1,destport=%s,samplingrate=%s,msgflags=0x0000\n'
+					  %(name, pointType, msgId, protocol, msgLength, src, dest, samplingRate))
+
+
+def createAtts(direction, cvtType, rawType, message, startByte, strLength=0, metaFlags=None):
+	'''
+	Attributes and mapping record of one NET-IO point.
+	Input:
+		direction		either 'IN' or 'OUT'
+		cvtType			point type specified in initial point creation ('string' for string points)
+		rawType			point type specified in point mapping
+		message			message assigned to point
+		startByte		byte offset of the value in the message
+		strLength		length of string points
+		metaFlags		RTDB meta flags for the item (default as in ValidateAnalog: '48' for int raw types, else '8')
+	Return:
+		name			mapping record name
+		atts			attributes used during point initialization
+		maps			point mapping used to create the mapping record
+	'''
+	rawTypeNum = getattr(swbC, 'RAWTYPE_%s' %rawType)
+	board = 'Min' if direction=='IN' else 'Mout'
+	name = 'NET-IO_1_%s_S%ds0n64_Rt%d_%s__ctrl0_%s' %(board, startByte, rawTypeNum, direction, message)
+	if cvtType=='string':
+		atts = {'pointtype':'STRI' if direction=='IN' else 'STRO', 'cvttype':'string', 'mappingrecords':name}
+	else:
+		if metaFlags is None:
+			metaFlags = '48' if rawType=='int' else '8'
+		atts = {'pointtype':'AI' if direction=='IN' else 'AO', 'cvttype':cvtType, 'mappingrecords':name, 'metaflags':'0x%s'%metaFlags}
+	maps = {'boardid':'NET-IO', 'boardnum':'1', 'type':direction, 'startbyte':str(startByte), 'startbit':'0', 'numbits':'64',
+			'rawtype':rawType, 'stringlength':str(strLength), 'ioflags':'0x0000', 'controltype':'0', 'message':message}
+	return [name, atts, maps]
+
+
+# ---- BULK LAYOUT ----
+
+def layoutOffsets(sizes, scheme='packed'):
+	'''
+	Byte offsets of consecutive values in one message.
+	Input:
+		sizes			value sizes in bytes
+		scheme			'packed' (back to back), 'aligned' (each value aligned to its size) or an int stride
+	Return:
+		offsets			list of start bytes
+		length			payload length in bytes
+	'''
+	offsets = []
+	pos = 0
+	for i, size in enumerate(sizes):
+		if scheme=='packed':
+			start = pos
+		elif scheme=='aligned':
+			start = (pos + size - 1)//size*size
+		else:
+			start = i*int(scheme)
+		offsets.append(start)
+		pos = start + size
+	return offsets, pos
+
+
+def generatePoints(count, types=(('double', 'double'),), pointsPerMsg=1, offsets='packed', protocol='tcp',
+				   ports=(1, 1000), strLength=3, samplingRate=10, msgLength=None):
+	'''
+	Generates a loopback layout of count IN/OUT point pairs.
+	Pair i is named In.point<2i+1>/Out.point<2i+2>, takes its type from types (cycled) and is mapped into
+	message pair in<k>/out<k> with k = i//pointsPerMsg.
+	Input:
+		count			number of IN/OUT point pairs
+		types			list of (cvtType, rawType) assigned to the pairs in turn
+		pointsPerMsg	number of pairs sharing one message
+		offsets			byte offset scheme within a message (see layoutOffsets)
+		protocol		either 'tcp' or 'udp'
+		ports			(IN message srcport, OUT message srcport); each side sends to the other
+		strLength		length of string points
+		samplingRate	message sampling rate
+		msgLength		fixed message length (default: payload length + MSG_PAD)
+	Return:
+		layout			dict with points and iorecs (dicts for dbItemPut/putIOMappingRecords),
+						msgs (NET-IO.msgs.1 lines) and pairs (list of (IN point, OUT point, cvtType))
+	'''
+	layout = {'points':{}, 'iorecs':{}, 'msgs':[], 'pairs':[]}
+	typeCycle = itertools.cycle(types)
+	for k, first in enumerate(range(0, count, pointsPerMsg)):
+		group = [next(typeCycle) for i in range(first, min(first+pointsPerMsg, count))]
+		sizes = [strLength if rawType=='string' else RAW_SIZES[rawType] for cvtType, rawType in group]
+		starts, payload = layoutOffsets(sizes, offsets)
+		for j, (cvtType, rawType) in enumerate(group):
+			i = first+j
+			pointIn = 'In.point%d' %(2*i+1)
+			pointOut = 'Out.point%d' %(2*i+2)
+			for point, direction, message in ((pointIn, 'IN', 'in%d' %(k+1)), (pointOut, 'OUT', 'out%d' %(k+1))):
+				# as in ValidateString.py, only the IN side of a string pair carries the string length
+				[name, atts, maps] = createAtts(direction, cvtType, rawType, message, starts[j], strLength if rawType=='string' and direction=='IN' else 0)
+				layout['points'][point] = atts
+				layout['iorecs'][name] = maps
+			layout['pairs'].append((pointIn, pointOut, cvtType))
+		length = msgLength or payload + MSG_PAD
+		layout['msgs'].append(createMsg('in%d' %(k+1), 'IN', k, protocol, ports[0], ports[1], length, samplingRate))
+		layout['msgs'].append(createMsg('out%d' %(k+1), 'OUT', k, protocol, ports[1], ports[0], length, samplingRate))
+	return layout
+
+
+def createBulkPoints(rtdb, count, scope='', force=False, **kwargs):
+	'''
+	Generates a layout with generatePoints and provisions it in one dbItemPut/putIOMappingRecords batch.
+	Input:
+		rtdb			RTDB to create the points in
+		count			number of IN/OUT point pairs
+		scope			server/project the RTDB belongs to (see provision.provisionRTDB)
+		force			rebuild the RTDB even if it already matches
+		kwargs			layout options passed to generatePoints
+	Return:
+		layout			generated layout (see generatePoints)
+	'''
+	layout = generatePoints(count, **kwargs)
+	pv.provisionRTDB(rtdb, layout['points'], layout['iorecs'], layout['msgs'], scope=scope, force=force)
+	return layout
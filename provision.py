@@ -0,0 +1,168 @@
+from __future__ import print_function
+import sys
+import json
+import hashlib
+
+import jsonCache
+
+try:
+	import simwbClient as swb
+except:
+    sys.exit('Import failed')
+
+
+#configurations last provisioned to each RTDB, used for incremental updates; SIMWB_RTDB_CACHE overrides the location, an empty value keeps it in memory only
+CACHE_FILE = jsonCache.cachePath('SIMWB_RTDB_CACHE', '.simwb_rtdb_cache.json')
+MSG_FILE = 'NET-IO.msgs.1'
+STAMP_FILE = 'provision.stamp'		#file in the RTDB directory holding the hash of the configuration last uploaded to it
+
+_cache = jsonCache.JSONCache(lambda: CACHE_FILE)
+
+
+# ---- CACHE ----
+
+def forget(scope=None, rtdb=None):
+	'''
+	Drops cached RTDB state so the next provisionRTDB rebuilds, e.g. after the RTDB was edited on the server.
+	Input:
+		scope			server/project scope to drop (all if None)
+		rtdb			RTDB to drop within the scope (all if None)
+	'''
+	_cache.forget(scope, rtdb)
+
+
+def configHash(points, iorecs, msgs):
+	'''
+	Content hash of an RTDB configuration.
+	Input:
+		points			dict of point name -> attributes (as passed to dbItemPut)
+		iorecs			dict of mapping record name -> mapping (as passed to putIOMappingRecords)
+		msgs			list of message lines (bytes, as passed to putFileLines)
+	Return:
+		digest			hex digest, equal for equal configurations
+	'''
+	config = [points, iorecs, [m.decode() for m in msgs]]
+	return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+# ---- SERVER STAMP ----
+
+def serverStamp(rtdb):
+	'''
+	Configuration the RTDB on the server was last provisioned with, read back from its STAMP_FILE.
+	Return:
+		stamp			'<configHash> <msgFile>', or None if the RTDB has no stamp or the client cannot read files
+	'''
+	if not hasattr(swb, 'getFileLines'): return None
+	r, lines = swb.getFileLines(remoteDir='RTDB/'+rtdb, remoteFile=STAMP_FILE)
+	if r < 0 or not lines: return None
+	line = lines[0].decode() if isinstance(lines[0], bytes) else lines[0]
+	return line.strip() or None
+
+
+def _putStamp(rtdb, stamp):
+	r = swb.putFileLines([str.encode('%s\n' %stamp)], remoteDir='RTDB/'+rtdb, remoteFile=STAMP_FILE)
+	if r < 0: sys.exit('Stamp transfer failed: %s' %swb.strerror(r))
+
+
+# ---- PROVISION ----
+
+def _rebuild(rtdb, points, iorecs, msgs, msgFile):
+	r = swb.dbDelete(rtdb)
+
+	r = swb.dbSave(rtdb)
+	if r < 0: sys.exit('RTDB create failed: %s\n' %swb.strerror(r))
+
+	r = swb.dbLoad(rtdb)
+	if r < 0: sys.exit('RTDB load failed: %s\n' %swb.strerror(r))
+
+	r = swb.dbItemPut(points, save=True,)
+	if r < 0: sys.exit('Item create failed: %s' %swb.strerror(r))
+
+	r = swb.putIOMappingRecords(iorecs)
+	if r < 0: sys.exit('IO mapping failed: %s' %swb.strerror(r))
+
+	r = swb.dbSave(rtdb)
+	if r < 0: sys.exit('RTDB save failed: %s' %swb.strerror(r))
+
+	r = swb.putFileLines(msgs, remoteDir='RTDB/'+rtdb, remoteFile=msgFile)
+	if r < 0: sys.exit('Message transfer failed: %s' %swb.strerror(r))
+
+
+def _update(rtdb, points, iorecs, msgs, msgFile, old):
+	changedPoints = dict((n, a) for n, a in points.items() if old['points'].get(n)!=a)
+	changedMaps = dict((n, m) for n, m in iorecs.items() if old['iorecs'].get(n)!=m)
+
+	if changedPoints or changedMaps:
+		r = swb.dbLoad(rtdb)
+		if r < 0: sys.exit('RTDB load failed: %s\n' %swb.strerror(r))
+
+		if changedPoints:
+			r = swb.dbItemPut(changedPoints, save=True,)
+			if r < 0: sys.exit('Item create failed: %s' %swb.strerror(r))
+
+		if changedMaps:
+			r = swb.putIOMappingRecords(changedMaps)
+			if r < 0: sys.exit('IO mapping failed: %s' %swb.strerror(r))
+
+		r = swb.dbSave(rtdb)
+		if r < 0: sys.exit('RTDB save failed: %s' %swb.strerror(r))
+
+	if [m.decode() for m in msgs] != old['msgs']:
+		r = swb.putFileLines(msgs, remoteDir='RTDB/'+rtdb, remoteFile=msgFile)
+		if r < 0: sys.exit('Message transfer failed: %s' %swb.strerror(r))
+
+
+def provisionRTDB(rtdb, points, iorecs, msgs, scope='', msgFile=MSG_FILE, force=False):
+	'''
+	Brings an RTDB to the given configuration with as few server calls as possible.
+	Every upload ends by writing the configuration's content hash to STAMP_FILE in the RTDB directory, and the
+	upload is skipped when the stamp read back from the server matches, so a reset RTDB or another server with an
+	RTDB of the same name is always provisioned. The configuration last applied is also kept client-side (see
+	CACHE_FILE): when the server still holds it, only changed points, mappings or message lines are uploaded,
+	otherwise, and when points or mappings are removed, the RTDB is rebuilt.
+	Edits made on the server by hand do not change the stamp; use force (or forget) after such edits.
+	Input:
+		rtdb			RTDB name
+		points			dict of point name -> attributes (as passed to dbItemPut)
+		iorecs			dict of mapping record name -> mapping (as passed to putIOMappingRecords)
+		msgs			list of message lines (bytes) for msgFile
+		scope			server/project the RTDB belongs to, e.g. HOST+'/'+PROJECT
+		msgFile			message file in the RTDB directory
+		force			rebuild even if the server stamp matches
+	Return:
+		action			'unchanged', 'updated' or 'created'
+	'''
+	key = jsonCache.scopedKey(scope, rtdb)
+	digest = configHash(points, iorecs, msgs)
+	stamp = '%s %s' %(digest, msgFile)
+	config = json.loads(json.dumps({'hash':digest, 'points':points, 'iorecs':iorecs,
+									'msgs':[m.decode() for m in msgs], 'msgFile':msgFile}))
+	server = serverStamp(rtdb)
+	old = _cache.read().get(key)
+	if not force and server==stamp:
+		if old!=config:
+			with _cache.update() as cache:
+				cache[key] = config
+		return 'unchanged'
+
+	# drop the cached entry and the stamp first so a failed upload never leaves a stale match behind
+	if old:
+		with _cache.update() as cache:
+			cache.pop(key, None)
+		if server!='%s %s' %(old['hash'], old['msgFile']):
+			old = None		#the server does not hold the cached configuration, so it cannot be updated incrementally
+	if server:
+		_putStamp(rtdb, '')
+
+	if force or not old or old['msgFile']!=msgFile or set(old['points'])-set(points) or set(old['iorecs'])-set(iorecs):
+		_rebuild(rtdb, points, iorecs, msgs, msgFile)
+		action = 'created'
+	else:
+		_update(rtdb, points, iorecs, msgs, msgFile, old)
+		action = 'updated'
+	_putStamp(rtdb, stamp)
+
+	with _cache.update() as cache:
+		cache[key] = config
+	return action
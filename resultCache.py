@@ -0,0 +1,74 @@
+from __future__ import print_function
+import json
+import time
+import hashlib
+
+import jsonCache
+
+
+#passing results of matrix cells; SIMWB_RESULT_CACHE overrides the location, an empty value keeps it in memory only
+CACHE_FILE = jsonCache.cachePath('SIMWB_RESULT_CACHE', '.simwb_result_cache.json')
+MAX_AGE = 30*24*3600.0		#seconds a passing result is trusted
+MAX_ENTRIES = 2000			#oldest results are evicted beyond this count
+
+_cache = jsonCache.JSONCache(lambda: CACHE_FILE)
+
+
+# ---- CACHE ----
+
+def _evict(cache, now):
+	for key in [k for k, e in cache.items() if now - e['time'] > MAX_AGE]:
+		del cache[key]
+	if len(cache) > MAX_ENTRIES:
+		for key in sorted(cache, key=lambda k: cache[k]['time'])[:len(cache)-MAX_ENTRIES]:
+			del cache[key]
+
+
+def cellKey(scope, config):
+	'''
+	Cache key of a cell configuration.
+	Input:
+		scope			server/project the cell runs on, e.g. HOST+'/'+PROJECT
+		config			JSON-serializable description of everything the cell's outcome depends on
+						(types, metaFlags, protocol, message layout, generator parameters, tolerances)
+	Return:
+		key				hex digest, equal for equal scope and configuration
+	'''
+	return hashlib.sha1(json.dumps([scope, config], sort_keys=True).encode()).hexdigest()
+
+
+def lookup(key):
+	'''
+	Cached result of a cell that passed within MAX_AGE, or None if the cell has to run.
+	Return:
+		entry			dict with keys time (s since the epoch) and result, or None
+	'''
+	entry = _cache.read().get(key)
+	if entry is None or not entry['passed'] or time.time() - entry['time'] > MAX_AGE:
+		return None
+	return entry
+
+
+def record(key, passed, result=None):
+	'''
+	Stores the outcome of a cell run. Failing cells are recorded too, so they are never skipped.
+	Input:
+		key				cache key (see cellKey)
+		passed			True if the cell passed
+		result			JSON-serializable result to hand back on later hits
+	'''
+	now = time.time()
+	with _cache.update() as cache:
+		cache[key] = json.loads(json.dumps({'time':now, 'passed':bool(passed), 'result':result}))
+		_evict(cache, now)
+
+
+def forget(key=None):
+	'''
+	Drops one cached result (all if key is None), e.g. after a change the configuration does not capture.
+	'''
+	with _cache.update() as cache:
+		if key is None:
+			cache.clear()
+		else:
+			cache.pop(key, None)
@@ -0,0 +1,95 @@
+from __future__ import print_function
+import sys
+import os
+import time
+import argparse
+import importlib
+import traceback
+
+if __name__=='__main__' and '--standin' in sys.argv:
+	sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'standin'))
+
+import connection
+import jsonCache
+
+
+SUITES = {'analog':'ValidateAnalog', 'string':'ValidateString', 'demo':'runTest_BACKUP'}
+
+
+def runSuite(name, host, login, project, dlHost=None, force=False):
+	'''
+	Imports a suite module and runs it, capturing failures so the remaining suites still run.
+	The data log server and force flag are set on the module (DL_HOST, FORCE) where the suite has them,
+	so they also apply to a suite that was imported before.
+	Input:
+		name			suite name (key of SUITES)
+		host			SimWB host
+		login			'user/password'
+		project			project the suite runs in
+		dlHost			data log server of host (host if None)
+		force			run every matrix cell even if it passed before unchanged
+	Return:
+		result			dict with keys suite, passed, error (message or None) and time (s)
+	'''
+	start = time.time()
+	out = {'suite':name, 'passed':False, 'error':None, 'time':0.0}
+	try:
+		module = importlib.import_module(SUITES[name])
+		if hasattr(module, 'FORCE'): module.FORCE = force
+		if hasattr(module, 'DL_HOST'): module.DL_HOST = dlHost or host
+		out['passed'] = bool(module.run(host, login, project))
+	except SystemExit as e:
+		out['error'] = str(e)
+	except Exception:
+		out['error'] = traceback.format_exc()
+	out['time'] = time.time() - start
+	return out
+
+
+def runSuites(names, host, login, project, dlHost=None, force=False):
+	'''
+	Runs several suites in one process over one connection and project selection.
+	Suites also share the provisioning, test and result caches held by their helper modules.
+	Input:
+		names			suite names (keys of SUITES), run in the given order
+		host			SimWB host
+		login			'user/password'
+		project			project all suites run in
+		dlHost			data log server of host (host if None)
+		force			run every matrix cell even if it passed before unchanged
+	Return:
+		results			list of runSuite results
+	'''
+	connection.connect(host, login, project)
+	return [runSuite(name, host, login, project, dlHost, force) for name in names]
+
+
+def printSummary(results):
+	for r in results:
+		status = 'passed' if r['passed'] else 'FAILED'
+		print('%-8s %s in %0.1f s%s' %(r['suite'], status, r['time'], ': '+r['error'] if r['error'] else ''))
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Runs validation suites in one process over one SimWB connection')
+	parser.add_argument('--host', default='localhost')
+	parser.add_argument('--login', default='admin/nimda')
+	parser.add_argument('--project', default='Hardware-Tests')
+	parser.add_argument('--dl-host', dest='dlHost', default=None, help='data log server (the SimWB host if not given)')
+	parser.add_argument('--suites', default='analog,string', help='comma separated subset of %s' %','.join(sorted(SUITES)))
+	parser.add_argument('--force', action='store_true', help='run every cell, even unchanged cells that passed before')
+	parser.add_argument('--standin', action='store_true', help='run against an in-process stand-in server')
+	cfg = parser.parse_args(argv)
+
+	if cfg.standin:
+		import standInServer
+		jsonCache.disableLocalCaches()
+		server, cfg.host, rpc = standInServer.startServer()
+
+	results = runSuites(cfg.suites.split(','), cfg.host, cfg.login, cfg.project, cfg.dlHost, cfg.force)
+	printSummary(results)
+	sys.exit(0 if all(r['passed'] for r in results) else 1)
+
+
+if __name__=='__main__':
+	main()
@@ -1,9 +1,12 @@
 import sys
 import time
 import datetime
-import os.path
-import math
-import numpy as np
+
+import validateEngine as ve
+import dlReader as dlr
+import waits
+import swbTrace
+import connection
 
 try:
 	import simwbClient as swb
@@ -12,11 +15,14 @@ try:
 except:
     sys.exit('Import failed')
 
+swbTrace.enableFromEnv(swb, dl)	#set SIMWB_TRACE=<file.json> to trace every client call
+
 
 # ---- DEFINE INPUT ----
 
 PROJECT = 'Rebecca'
 HOST = 'localhost'
+DL_HOST = 'swb64x16'		#data log server of HOST
 LOGIN = 'admin/nimda'
 TEST = 'val_demo'
 SESSION = 'demo1'
@@ -27,35 +33,24 @@ POINT_IN2 = 'In.point3'
 POINT_OUT1 = 'Out.point2'
 POINT_OUT2 = 'Out.point4'
 TOL = 2.3
+CAPTURE = 5		#seconds of generator data logged
 
 TIMESTAMP = datetime.datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d_%H:%M:%S')
 
 
 # ---- INITIALIZE & START TEST ----
 
-r = swb.connect(HOST)
-if r < 0: sys.exit('Connection failed: %s' %swb.strerror(r))
-
-r,p,g= swb.login(LOGIN)
-if r < 0: sys.exit('Login failed: %s' %swb.strerror(r))
-
-r = swb.projectSelect(PROJECT)
-if r < 0: 
-	r = swb.projectCreate(PROJECT)
-	if r < 0:	
-		sys.exit('Project selection failed: %s' %swb.strerror(r))
-
-r = swb.dbDelete(RTDB)
-if r > 0:
-    print('RTDB delete: success\n')
-else:
-    print('RTDB did not delete: %s\n' %swb.strerror(r))
-
-r = swb.dbSave(RTDB)
-if r < 0: sys.exit('RTDB create failed: %s' %swb.strerror(r))
+# Initialize RTDB
 
+def createRTDB():
+	r = swb.dbDelete(RTDB)
+	if r > 0:
+	    print('RTDB delete: success\n')
+	else:
+	    print('RTDB did not delete: %s\n' %swb.strerror(r))
 
-# Initialize RTDB
+	r = swb.dbSave(RTDB)
+	if r < 0: sys.exit('RTDB create failed: %s' %swb.strerror(r))
 
 def createAtts(pointType, cvtType, message):
 # pointType: either 'AI' or 'AO'
@@ -78,6 +73,7 @@ def createMsg(name, pointType, msgId, protocol, src, dest):
 
 msg = []
 def createPoints(cvtType, protocol):
+	del msg[:]
 	[name1,atts1, maps1] = createAtts('AI', cvtType, 'in1')
 	[name2,atts2, maps2] = createAtts('AO', cvtType, 'out1')
 	[name3,atts3, maps3] = createAtts('AI', cvtType, 'in2')
@@ -101,9 +97,6 @@ def createPoints(cvtType, protocol):
 	r = swb.dbSave(RTDB)
 	if r < 0: sys.exit('RTDB save failed: %s' %swb.strerror(r))
 
-createPoints('double','tcp')
-print('RTDB intialized')
-time.sleep(1)
 
 
 # Initialize test
@@ -130,9 +123,6 @@ def startTest():
 	r = swb.sessionStart(TEST, SESSION) 
 	if r < 0: sys.exit('Session start failed: %s' %swb.strerror(r))
 	
-startTest()
-print('Test start successful\n')
-time.sleep(1)
 
 
 # ---- ADD & START GENERATOR ----
@@ -148,9 +138,6 @@ def startGenerator(points):
 	r = swb.startAllGenerators()
 	if r < 0: sys.exit('Signal generator failed: %s' %swb.strerror(r))
 
-startGenerator([POINT_OUT1,POINT_OUT2])
-print('Signal generator started\n')
-time.sleep(5)
 
 
 # ---- VALIDATE DATA (as test is running) ----
@@ -174,63 +161,69 @@ print('Max difference: '+str(max(l))+'\n')
 '''
 # ---- VALIDATE DATA (after test is complete) ----
 
-t0 = None
-r = swb.sessionStop()
-def validate(point_in, point_out):
-
-	r = dl.dlConnect('swb64x16')
-	if r != 0: sys.exit('Connection failed: %s' %dl.strerror(r))
-	
-	r = dl.dlSetProject(PROJECT)
-	if r != 0: sys.exit('Project selection failed: %s' %dl.strerror(r))
-	
-	r = dl.dlSetSession(TEST+'/'+SESSION)
-	if r != 0: sys.exit('Test/session selection failed: %s' %dl.strerror(r))
-	
-	r,info = dl.dlQueryTest()
-	if r != 0: sys.exit('Test query failed: %s' %dl.strerror(r))
-
-	r,d = dl.dlGetMetaTable()
-	if r < 0: sys.exit('Meta table failed: %s' %dl.strerror(r))
-
-	cvtVals = []
-	altVals = []
-	def cb(recNum, tSec, tNSec, cvtVal, altVal, rawVal, dlF, rtF):
-		global t0
-		t = float(tSec)+float(tNSec)/1000000000.
-		if not t0: t0 = t
-		if inpoint:
-			cvtVals.append(cvtVal)
-		else:
-			altVals.append(altVal)
-	
-	inpoint = True
-	r = dl.dlGetRecords(point_in, 1100, dl.dlAllSamples, cb)		#using index number here does not work
-	if r != 0: sys.exit('Get records failed: %s' %dl.strerror(r))
+def validate(pairs):
 
-	inpoint = False
-	r = dl.dlGetRecords(point_out, 1100, dl.dlAllSamples, cb)
-	if r != 0: sys.exit('Get records failed: %s' %dl.strerror(r))
+	s = dlr.getSession(DL_HOST, PROJECT, TEST+'/'+SESSION)
+	records = dlr.readPoints([p for pair in pairs for p in pair], session=s)		#using index number here does not work
 
 	print('')
 
-	diff = np.subtract(cvtVals,altVals)	# can be changed to not include numpy, but this is easier
-
-	for val in diff:
-		if math.fabs(val) > TOL:
-			sys.exit('Validation of %s and %s failed: difference %0.5r exeeds tolerance %r\n' %(point_in,point_out,math.fabs(val),TOL))
-
-validate(POINT_IN1, POINT_OUT1)
-validate(POINT_IN2, POINT_OUT2)
+	for point_in, point_out in pairs:
+		recsIn = records[point_in]
+		recsOut = records[point_out]
+		result = ve.compareRecords(recsIn.t, recsIn.cvt, recsOut.t, recsOut.alt, TOL)
+		if not result['passed']:
+			sys.exit('Validation of %s and %s failed (tolerance %r): %s\n' %(point_in,point_out,TOL,ve.formatResult(result)))
+
+
+# ---- RUN ----
+
+def run(host=None, login=None, project=None, dlHost=None):
+	'''
+	Runs the demo: two double pairs driven by signal generators, validated from the data log.
+	The connection is set up on first use, so suites run by runSuites share one login.
+	Input:
+		host			SimWB host (HOST if None)
+		login			'user/password' (LOGIN if None)
+		project			project to run in (PROJECT if None)
+		dlHost			data log server (DL_HOST if None)
+	Return:
+		passed			True if all differences were within tolerance (a failure exits)
+	'''
+	global HOST, DL_HOST, LOGIN, PROJECT
+	DL_HOST = dlHost or DL_HOST
+	HOST, LOGIN, PROJECT = host or HOST, login or LOGIN, project or PROJECT
+	connection.connect(HOST, LOGIN, PROJECT)
+
+	createRTDB()
+	createPoints('double','tcp')
+	print('RTDB intialized')
+
+	startTest()
+	if not waits.waitForItems([POINT_IN1,POINT_OUT1,POINT_IN2,POINT_OUT2], label='session start'):
+		swb.sessionStop(swbC.SCHED_USERABORT)
+		sys.exit('Session start failed: points not readable after %0.1f s' %waits.TIMEOUT)
+	print('Test start successful\n')
+
+	start = time.time()
+	startGenerator([POINT_OUT1,POINT_OUT2])
+	if not waits.waitForChange(POINT_IN1, label='generator start'):
+		print('Signal generator did not reach %s within %0.1f s\n' %(POINT_IN1, waits.TIMEOUT))
+	else:
+		print('Signal generator started\n')
+	waits.hold(CAPTURE, start)
 
+	r = swb.sessionStop()
+	validate([(POINT_IN1,POINT_OUT1), (POINT_IN2,POINT_OUT2)])
 
-# ---- STOP TEST ----
+	r = swb.sessionStop(swbC.SCHED_USERABORT)
 
-r = swb.sessionStop(swbC.SCHED_USERABORT)
+	print('Test complete: all differences within tolerance\n')
+	return True
 
 
-print('Test complete: all differences within tolerance\n')
+if __name__=='__main__':
+	run()
 
 
 # test data types (all), number of messages, variable message length, protocol
-
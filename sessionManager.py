@@ -0,0 +1,151 @@
+from __future__ import print_function
+import sys
+import atexit
+import threading
+
+import jsonCache
+import connection		#serializes the calls of the deletion thread with those of the caller's thread
+
+try:
+	import queue
+except ImportError:
+	import Queue as queue
+
+try:
+	import simwbClient as swb
+except:
+    sys.exit('Import failed')
+
+
+#tests known to exist on the server with their definition; SIMWB_TEST_CACHE overrides the location, an empty value keeps it in memory only
+CACHE_FILE = jsonCache.cachePath('SIMWB_TEST_CACHE', '.simwb_test_cache.json')
+
+_cache = jsonCache.JSONCache(lambda: CACHE_FILE)
+_lock = threading.Lock()
+_pending = queue.Queue()		#(test, session) waiting for sessionDelete
+_retiring = set()				#(test, session) queued or being deleted
+_done = threading.Condition(_lock)
+_worker = None
+
+
+# ---- CACHE ----
+
+def forget(scope=None, test=None):
+	'''
+	Drops known test definitions so the next startSession recreates them, e.g. after tests were deleted on the server.
+	Input:
+		scope			server/project scope to drop (all if None)
+		test			test to drop within the scope (all if None)
+	'''
+	_cache.forget(scope, test)
+
+
+# ---- TESTS ----
+
+def ensureTest(test, rtdb, desc='New test', fixedstep=1000, scope='', force=False):
+	'''
+	Makes sure the test exists with the given definition, creating it only if it is unknown or was defined differently.
+	The test reads its RTDB when a session starts, so RTDB content changes do not require a new test.
+	Input:
+		test			test name
+		rtdb			RTDB the test runs on
+		desc			test description
+		fixedstep		fixed step of the test
+		scope			server/project the test belongs to, e.g. HOST+'/'+PROJECT
+		force			delete and recreate the test even if it is known
+	Return:
+		action			'unchanged' or 'created'
+	'''
+	key = jsonCache.scopedKey(scope, test)
+	definition = {'rtdb':rtdb, 'desc':desc, 'fixedstep':fixedstep}
+	if not force and _cache.read().get(key)==definition:
+		return 'unchanged'
+	with _cache.update() as cache:
+		cache.pop(key, None)
+
+	flush(test)
+	r = swb.testDelete(test)
+
+	r = swb.testCreate(test, rtdb, desc, fixedstep=fixedstep)
+	if r < 0: sys.exit('Test create failed: %s' %swb.strerror(r))
+
+	with _cache.update() as cache:
+		cache[key] = definition
+	return 'created'
+
+
+# ---- SESSIONS ----
+
+def startSession(test, session, rtdb, desc='New test session', schedType=3, noDataLogging=0, testDesc='New test', fixedstep=1000, scope=''):
+	'''
+	Creates and starts a session under a test that is kept alive between sessions (see ensureTest).
+	If the session cannot be created, a leftover session of the same name is deleted and the test is
+	recreated before giving up, so a test removed on the server behind the cache's back is repaired.
+	Input:
+		test			test name
+		session			session name
+		rtdb			RTDB the test runs on
+		desc			session description
+		schedType		scheduler type of the session
+		noDataLogging	1 to run the session without data logging
+		testDesc		test description
+		fixedstep		fixed step of the test
+		scope			server/project the test belongs to, e.g. HOST+'/'+PROJECT
+	'''
+	ensureTest(test, rtdb, testDesc, fixedstep, scope)
+	flush(test, session)
+
+	r = swb.sessionCreate(test, session, desc, schedType=schedType, noDataLogging=noDataLogging)
+	if r < 0:
+		swb.sessionDelete(test, session)
+		r = swb.sessionCreate(test, session, desc, schedType=schedType, noDataLogging=noDataLogging)
+	if r < 0:
+		ensureTest(test, rtdb, testDesc, fixedstep, scope, force=True)
+		r = swb.sessionCreate(test, session, desc, schedType=schedType, noDataLogging=noDataLogging)
+	if r < 0: sys.exit('Session create failed: %s' %swb.strerror(r))
+
+	r = swb.sessionStart(test, session)
+	if r < 0: sys.exit('Session start failed: %s' %swb.strerror(r))
+
+
+def _clean():
+	while True:
+		test, session = _pending.get()
+		try:
+			swb.sessionDelete(test, session)
+		except Exception:
+			pass		#a failed cleanup must not stop later ones; startSession deletes leftovers itself
+		finally:
+			with _lock:
+				_retiring.discard((test, session))
+				_done.notify_all()
+
+
+def retire(test, session):
+	'''
+	Deletes a finished session in the background. Its data log must have been read already.
+	The deletion shares the client connection with the caller's thread; connection.serialize keeps their calls apart.
+	Input:
+		test			test name
+		session			session name
+	'''
+	global _worker
+	with _lock:
+		_retiring.add((test, session))
+		if _worker is None:
+			_worker = threading.Thread(target=_clean)
+			_worker.daemon = True
+			_worker.start()
+	_pending.put((test, session))
+
+
+def flush(test=None, session=None):
+	'''
+	Waits until queued session deletions are done: all of them, those of one test, or one session.
+	'''
+	with _lock:
+		while any((test is None or t==test) and (session is None or s==session) for t, s in _retiring):
+			_done.wait()
+
+
+atexit.register(flush)
@@ -0,0 +1,326 @@
+from __future__ import print_function
+import sys
+import os
+import time
+import json
+import socket
+import argparse
+import subprocess
+import traceback
+import collections
+import multiprocessing
+
+try:
+	import queue
+except ImportError:
+	import Queue as queue
+
+if __name__=='__main__' and '--standin' in sys.argv:
+	sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'standin'))
+
+import jsonCache
+import testMatrix as tm
+import resultCache as rc
+import runSuites
+
+
+STANDIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'standin', 'standInServer.py')
+POLL = 1.0		#seconds between checks for workers that died with a task in flight
+
+
+# ---- INVENTORY ----
+
+def loadInventory(hosts=None, path=None, login='admin/nimda', project='Hardware-Tests'):
+	'''
+	Host inventory from a comma separated list and/or a JSON file holding a list of host names or entries.
+	Input:
+		hosts			'host1,host2:9501,...'
+		path			JSON file, e.g. [{"host":"swb1", "dl":"swb1-dl"}, "swb2"]
+		login			'user/password' of entries that do not give one
+		project			project of entries that do not give one
+	Return:
+		inventory		list of dicts with keys host, dl (data log server), login and project
+	'''
+	entries = [h for h in (hosts or '').split(',') if h]
+	if path:
+		with open(path) as f:
+			entries += json.load(f)
+	inventory = []
+	for e in entries:
+		e = {'host':e} if not isinstance(e, dict) else dict(e)
+		e.setdefault('dl', e['host'])
+		e.setdefault('login', login)
+		e.setdefault('project', project)
+		inventory.append(e)
+	if not inventory: sys.exit('Host inventory is empty')
+	return inventory
+
+
+# ---- WORKER ----
+
+def _runTask(entry, task, force):
+	kind, item = task
+	if kind=='suite':
+		return runSuites.runSuite(item, entry['host'], entry['login'], entry['project'], entry['dl'], force)
+	import ValidateAnalog as va
+	va.HOST, va.LOGIN, va.PROJECT, va.DL_HOST = entry['host'], entry['login'], entry['project'], entry['dl']
+	out = tm.runCell(va.runAnalogCell, item)
+	out['key'] = va.analogCellKey(item)
+	return out
+
+
+def worker(entry, tasks, results, force=False):
+	'''
+	Runs tasks on one host until it receives None. The connection, login, project selection and the
+	DL connection are set up once and reused by every task the host takes.
+	Input:
+		entry			inventory entry of the host
+		tasks			queue of this host's (index, ('cell', Cell) or ('suite', name)) tasks, one at a time
+		results			queue the worker reports ('ready', host), ('done', host, index, result)
+						and ('down', host, error) to
+		force			run every cell, even unchanged cells that passed before
+	'''
+	import connection
+	host = entry['host']
+	try:
+		connection.connect(host, entry['login'], entry['project'])
+	except SystemExit as e:
+		results.put(('down', host, str(e)))
+		return
+	results.put(('ready', host))
+	while True:
+		task = tasks.get()
+		if task is None: break
+		index, work = task
+		try:
+			out = _runTask(entry, work, force)
+		except SystemExit as e:
+			out = {'error':str(e)}
+		except Exception:
+			out = {'error':traceback.format_exc()}
+		results.put(('done', host, index, out))
+
+
+# ---- SCHEDULER ----
+
+def runSharded(inventory, work, force=False, target=worker):
+	'''
+	Spreads work items over the hosts of an inventory, one worker process per host.
+	Placement is load-aware: a host is handed the next item as soon as it reports it is free, so a slow
+	or busy host ends up with fewer items and no host idles while work is left. Every item goes to a
+	host's own queue and is recorded as assigned here before it is sent, so the task of a host that
+	dies or cannot connect is always known and handed to the remaining hosts.
+	Input:
+		inventory		list of host entries (see loadInventory)
+		work			list of ('cell', Cell) or ('suite', name) items
+		force			run every cell, even unchanged cells that passed before
+		target			worker function of the host processes (default worker)
+	Return:
+		results			list of (host, result) in work order; host is None if no host could run the item
+		hosts			dict of host -> dict with keys tasks, busy (s) and error (None, or why the host went down)
+	'''
+	ctx = multiprocessing.get_context('spawn')
+	reports = ctx.Queue()
+	queues = {}
+	procs = {}
+	for entry in inventory:
+		queues[entry['host']] = ctx.Queue()
+		p = ctx.Process(target=target, args=(entry, queues[entry['host']], reports, force))
+		p.daemon = True
+		p.start()
+		procs[entry['host']] = p
+
+	hosts = dict((e['host'], {'tasks':0, 'busy':0.0, 'error':None}) for e in inventory)
+	results = [None]*len(work)
+	pending = collections.deque(range(len(work)))
+	idle = []
+	assigned = {}		#host -> index of the task sent to it
+	dead = set()
+
+	def handle(msg):
+		host = msg[1]
+		if msg[0]=='done':
+			index, out = msg[2:]
+			assigned.pop(host, None)
+			if results[index] is None:
+				results[index] = (host, out)
+				hosts[host]['tasks'] += 1
+				hosts[host]['busy'] += out.get('time', 0.0)
+		elif msg[0]=='down':
+			hosts[host]['error'] = msg[2]
+			dead.add(host)
+		if msg[0] in ('ready', 'done') and host not in dead:
+			idle.append(host)
+
+	while any(r is None for r in results):
+		while pending and idle:
+			index = pending.popleft()
+			if results[index] is not None: continue		#a late report of a dead host ran it after all
+			host = idle.pop(0)
+			assigned[host] = index
+			queues[host].put((index, work[index]))
+		try:
+			handle(reports.get(timeout=POLL))
+			continue
+		except queue.Empty:
+			pass
+		for host, p in procs.items():
+			if p.is_alive() or host in dead: continue
+			dead.add(host)
+			hosts[host]['error'] = hosts[host]['error'] or 'worker exited with code %s' %p.exitcode
+			if host in idle: idle.remove(host)
+			index = assigned.pop(host, None)
+			if index is not None and results[index] is None: pending.appendleft(index)
+		if len(dead)==len(procs):
+			while True:
+				try:
+					handle(reports.get_nowait())
+				except queue.Empty:
+					break
+			for index, r in enumerate(results):
+				if r is None: results[index] = (None, {'error':'no host left to run it'})
+
+	for host, p in procs.items():
+		if p.is_alive(): queues[host].put(None)
+	for p in procs.values():
+		p.join()
+	while True:		#a host may report it could not connect after the others finished the work
+		try:
+			handle(reports.get_nowait())
+		except queue.Empty:
+			break
+	return results, hosts
+
+
+# ---- MATRIX CELLS ----
+
+def cachedCell(inventory, cell):
+	'''
+	Cached result of a signal generator cell that passed before on any host of the inventory, or None.
+	'''
+	import ValidateAnalog as va
+	for entry in inventory:
+		hit = rc.lookup(va.analogCellKey(cell, entry['host']+'/'+entry['project'], entry['dl']))
+		if hit is not None:
+			return entry['host'], {'cell':cell, 'result':hit['result'], 'error':None, 'time':0.0, 'cached':True}
+	return None
+
+
+def runCells(inventory, force=False):
+	'''
+	Runs the signal generator matrix of ValidateAnalog with its cells spread over the inventory.
+	Cells that passed unchanged on any host are skipped, and every outcome is recorded here, so the result
+	cache is written by one process only.
+	Return:
+		results			list of (host, runCell result) in cell order
+		hosts			per-host statistics (see runSharded)
+	'''
+	import ValidateAnalog as va
+	cells = tm.buildCells(va.TEST, va.cvtTypes, va.rawTypes, va.protocols)
+	results = [None if force else cachedCell(inventory, cell) for cell in cells]
+	todo = [i for i, r in enumerate(results) if r is None]
+	ran, hosts = runSharded(inventory, [('cell', cells[i]) for i in todo], force)
+	for i, (host, out) in zip(todo, ran):
+		out.setdefault('cell', cells[i])
+		out.setdefault('result', None)
+		out.setdefault('time', 0.0)
+		out.setdefault('cached', False)
+		key = out.pop('key', None)
+		if key is not None:
+			passed = tm.cellPassed(out)
+			rc.record(key, passed, out['result'] if passed else None)
+		results[i] = (host, out)
+	return results, hosts
+
+
+def runSuiteShards(inventory, names, force=False):
+	'''
+	Runs whole suites, each on whichever host of the inventory is free first.
+	Return:
+		results			list of (host, runSuites.runSuite result) in the given order
+		hosts			per-host statistics (see runSharded)
+	'''
+	results, hosts = runSharded(inventory, [('suite', name) for name in names], force)
+	for name, (host, out) in zip(names, results):
+		out.setdefault('suite', name)
+		out.setdefault('passed', False)
+		out.setdefault('time', 0.0)
+	return results, hosts
+
+
+def printHosts(hosts, wall):
+	print('%-28s %6s %9s %6s' %('host', 'tasks', 'busy s', 'load'))
+	for host, h in sorted(hosts.items()):
+		print('%-28s %6d %9.1f %5.0f%%%s' %(host, h['tasks'], h['busy'], 100*h['busy']/wall if wall else 0.0,
+											 '  DOWN: '+h['error'] if h['error'] else ''))
+	print('%d hosts, %0.1f s wall time, %0.1f s of work\n' %(len(hosts), wall, sum(h['busy'] for h in hosts.values())))
+
+
+# ---- LOCAL STAND-INS ----
+
+def startStandIns(count):
+	'''
+	Starts count stand-in servers as separate processes on free local ports.
+	Return:
+		hosts			list of 'localhost:<port>'
+		procs			server processes; terminate them when done
+	'''
+	hosts, procs = [], []
+	for i in range(count):
+		s = socket.socket()
+		s.bind(('localhost', 0))
+		port = s.getsockname()[1]
+		s.close()
+		procs.append(subprocess.Popen([sys.executable, STANDIN, '--port', str(port)], stdout=subprocess.DEVNULL))
+		hosts.append('localhost:%d' %port)
+	for host in hosts:
+		deadline = time.time() + 10
+		while True:
+			try:
+				socket.create_connection(('localhost', int(host.split(':')[1])), timeout=1).close()
+				break
+			except socket.error:
+				if time.time() > deadline: sys.exit('Stand-in %s did not start' %host)
+				time.sleep(0.05)
+	return hosts, procs
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Runs matrix cells or whole suites spread over several SimWB hosts')
+	parser.add_argument('--hosts', default='', help='comma separated SimWB hosts')
+	parser.add_argument('--inventory', default=None, help='JSON list of hosts or {"host", "dl", "login", "project"} entries')
+	parser.add_argument('--login', default='admin/nimda')
+	parser.add_argument('--project', default='Hardware-Tests')
+	parser.add_argument('--suites', default=None, help='comma separated suites to spread (default: the cells of the analog signal matrix)')
+	parser.add_argument('--force', action='store_true', help='run every cell, even unchanged cells that passed before')
+	parser.add_argument('--standin', type=int, default=0, metavar='N', help='start N local stand-in servers and use them as the hosts')
+	cfg = parser.parse_args(argv)
+
+	servers = []
+	if cfg.standin:
+		jsonCache.disableLocalCaches()
+		hosts, servers = startStandIns(cfg.standin)
+		cfg.hosts = ','.join([h for h in cfg.hosts.split(',') if h] + hosts)
+
+	try:
+		inventory = loadInventory(cfg.hosts, cfg.inventory, cfg.login, cfg.project)
+		start = time.time()
+		if cfg.suites:
+			results, hosts = runSuiteShards(inventory, cfg.suites.split(','), cfg.force)
+			runSuites.printSummary([out for host, out in results])
+			passed = all(out['passed'] for host, out in results)
+		else:
+			results, hosts = runCells(inventory, cfg.force)
+			outs = [out for host, out in results]
+			tm.printSummary(outs, 'Signal generator test')
+			tm.printLatency(outs, 'Signal generator test')
+			passed = all(tm.cellPassed(out) for out in outs)
+		printHosts(hosts, time.time()-start)
+	finally:
+		for p in servers:
+			p.terminate()
+	sys.exit(0 if passed else 1)
+
+
+if __name__=='__main__':
+	main()
@@ -0,0 +1,94 @@
+'''
+simwbClient calls used by the validation scripts, served by the SimWB stand-in (standInServer.py).
+Put this directory on PYTHONPATH to run the scripts without a SimWB host.
+'''
+import standInWire
+from standInServer import strerror, ERR_NOTLOGGEDIN
+
+_conn = {'connection':None, 'token':None}
+
+
+def _call(name, *args):
+	c = _conn['connection']
+	if c is None: return ERR_NOTLOGGEDIN
+	return c.call(name, _conn['token'], *args)
+
+
+def connect(host):
+	try:
+		c = standInWire.Connection(host)
+		token = c.call('connect')
+	except Exception:
+		return ERR_NOTLOGGEDIN
+	_conn['connection'] = c
+	_conn['token'] = token
+	return 0
+
+def login(login):
+	if _conn['connection'] is None: return ERR_NOTLOGGEDIN, 0, 0
+	return tuple(_call('login', login))
+
+def projectSelect(name):
+	return _call('projectSelect', name)
+
+def projectCreate(name):
+	return _call('projectCreate', name)
+
+def dbDelete(rtdb):
+	return _call('dbDelete', rtdb)
+
+def dbSave(rtdb):
+	return _call('dbSave', rtdb)
+
+def dbLoad(rtdb):
+	return _call('dbLoad', rtdb)
+
+def dbItemPut(points, save=True):
+	return _call('dbItemPut', points, bool(save))
+
+def putIOMappingRecords(iorecs):
+	return _call('putIOMappingRecords', iorecs)
+
+def putFileLines(lines, remoteDir='', remoteFile=''):
+	return _call('putFileLines', list(lines), remoteDir, remoteFile)
+
+def getFileLines(remoteDir='', remoteFile=''):
+	if _conn['connection'] is None: return ERR_NOTLOGGEDIN, []
+	r, lines = _call('getFileLines', remoteDir, remoteFile)
+	return r, lines
+
+def testDelete(test):
+	return _call('testDelete', test)
+
+def testCreate(test, rtdb, desc='', fixedstep=1000):
+	return _call('testCreate', test, rtdb, desc, fixedstep)
+
+def sessionCreate(test, session, desc='', schedType=0, noDataLogging=0):
+	return _call('sessionCreate', test, session, desc, schedType, noDataLogging)
+
+def sessionStart(test, session):
+	return _call('sessionStart', test, session)
+
+def sessionStop(reason=0):
+	return _call('sessionStop', reason)
+
+def sessionDelete(test, session):
+	return _call('sessionDelete', test, session)
+
+def getItemValues(points):
+	if not isinstance(points, (list, tuple)): points = [points]
+	if _conn['connection'] is None: return ERR_NOTLOGGEDIN, {}
+	r, info = _call('getItemValues', list(points))
+	return r, info
+
+def setItemValue(point, value):
+	return _call('setItemValues', {point:value})
+
+def setItemValues(values):
+	return _call('setItemValues', values)
+
+def addGenerator(point, endType, sigType, frequency, count, phase, offset, amplitude, delay, duration):
+	return _call('addGenerator', point, endType, sigType, frequency, count, phase, offset, amplitude, delay, duration)
+
+def startAllGenerators():
+	return _call('startAllGenerators')
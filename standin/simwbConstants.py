@@ -0,0 +1,28 @@
+'''
+Constants of the SimWB stand-in (see standInServer.py). Raw type numbers follow the mapping record names used by
+the validation scripts (Rt8 for string, Rt10 for double).
+'''
+
+RAWTYPE_char = 1
+RAWTYPE_uchar = 2
+RAWTYPE_short = 3
+RAWTYPE_ushort = 4
+RAWTYPE_int = 5
+RAWTYPE_uint = 6
+RAWTYPE_llong = 7
+RAWTYPE_string = 8
+RAWTYPE_float = 9
+RAWTYPE_double = 10
+RAWTYPE_ullong = 11
+
+SIG_TYPE_SINE = 1
+SIG_TYPE_TRIANGLE = 2
+SIG_TYPE_SQUARE = 3
+SIG_TYPE_RAMP = 4
+
+GEN_SIGGENEND_DURATION = 1
+GEN_SIGGENEND_CYCLES = 2
+GEN_SIGGENEND_NEVER = 3
+
+SCHED_NORMAL = 0
+SCHED_USERABORT = 1
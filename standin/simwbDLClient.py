@@ -0,0 +1,65 @@
+'''
+simwbDLClient calls used by the validation scripts, served by the SimWB stand-in (standInServer.py).
+'''
+from array import array
+
+import standInWire
+from standInServer import strerror, ERR_NOTLOGGEDIN, ERR_NOPROJECT, ERR_NOSESSION
+
+dlAllSamples = 0
+PAGE = 65536		#records transferred per server call
+
+_dl = {'connection':None, 'project':None, 'session':None}
+
+
+def _column(data, typecode):
+	a = array(typecode)
+	a.frombytes(data)
+	return a
+
+
+def dlConnect(host):
+	try:
+		c = standInWire.Connection(host)
+		c.call('connect')
+	except Exception:
+		return ERR_NOTLOGGEDIN
+	_dl.update(connection=c, project=None, session=None)
+	return 0
+
+def dlSetProject(project):
+	if _dl['connection'] is None: return ERR_NOTLOGGEDIN
+	_dl.update(project=project, session=None)
+	return 0
+
+def dlSetSession(session):
+	if _dl['project'] is None: return ERR_NOPROJECT
+	_dl['session'] = session
+	return 0
+
+def dlQueryTest():
+	if _dl['session'] is None: return ERR_NOSESSION, {}
+	r, info = _dl['connection'].call('dlQueryTest', _dl['project'], _dl['session'])
+	return r, info
+
+def dlGetMetaTable():
+	if _dl['session'] is None: return ERR_NOSESSION, {}
+	r, table = _dl['connection'].call('dlGetMetaTable', _dl['project'], _dl['session'])
+	return r, table
+
+def dlGetRecords(point, count, mode, cb):
+	'''
+	Calls cb(recNum, tSec, tNSec, cvtVal, altVal, rawVal, dlF, rtF) for up to count logged records of point.
+	'''
+	if _dl['session'] is None: return ERR_NOSESSION
+	start = 0
+	while start < count:
+		r, recs = _dl['connection'].call('dlRecords', _dl['project'], _dl['session'], point, start, min(PAGE, count-start))
+		if r != 0: return r
+		cols = [_column(recs[k], 'q') for k in ('recNum', 'tSec', 'tNSec')] + \
+			   [_column(recs[k], 'd') for k in ('cvt', 'alt', 'raw')]
+		for recNum, tSec, tNSec, cvt, alt, raw in zip(*cols):
+			cb(recNum, tSec, tNSec, cvt, alt, raw, 0, 0)
+		if recs['count'] < min(PAGE, count-start): break
+		start = recs['next']
+	return 0
@@ -0,0 +1,706 @@
+'''
+Offline SimWB stand-in for the validation scripts.
+
+Start a server and put this directory on PYTHONPATH so that simwbClient, simwbConstants and simwbDLClient
+resolve to the stand-in modules next to this file:
+
+	python standin/standInServer.py --port 9500 --latency 0.002
+	PYTHONPATH=standin python ValidateAnalog.py
+
+Host names without a port use SIMWB_STANDIN_PORT (default 9500). startServer runs a server inside the
+calling process, e.g. for benchmarks.
+'''
+from __future__ import print_function
+import sys
+import os
+import math
+import time
+import random
+import struct
+import threading
+import argparse
+import numpy as np
+
+try:
+	from xmlrpc.server import SimpleXMLRPCServer
+	from socketserver import ThreadingMixIn
+except ImportError:
+	from SimpleXMLRPCServer import SimpleXMLRPCServer
+	from SocketServer import ThreadingMixIn
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import standInWire
+import simwbConstants as swbC
+
+
+# ---- ERRORS ----
+
+ERR_NOTLOGGEDIN = -1
+ERR_NOPROJECT = -2
+ERR_NORTDB = -3
+ERR_NOTEST = -4
+ERR_NOSESSION = -5
+ERR_NOITEM = -6
+ERR_RUNNING = -7
+ERR_NOTRUNNING = -8
+ERR_BADARG = -9
+ERR_NORECORDS = -10
+ERR_NOFILE = -11
+
+ERRORS = {ERR_NOTLOGGEDIN:'not logged in', ERR_NOPROJECT:'no such project', ERR_NORTDB:'no such RTDB',
+		  ERR_NOTEST:'no such test', ERR_NOSESSION:'no such session', ERR_NOITEM:'no such item',
+		  ERR_RUNNING:'a session is running', ERR_NOTRUNNING:'no session is running', ERR_BADARG:'bad argument',
+		  ERR_NORECORDS:'no records logged for item', ERR_NOFILE:'no such file'}
+
+def strerror(r):
+	return ERRORS.get(r, 'error %d' %r)
+
+
+# ---- FRAMES ----
+
+DEFAULT_STEP = 1000		#frame period (us) of tests created without a fixed step
+MAX_LAG = 0.05			#seconds a frame thread may fall behind and still catch up; beyond, frames are skipped
+
+
+# ---- RAW TYPE CONVERSION ----
+
+FORMATS = {'char':'b', 'uchar':'B', 'short':'h', 'ushort':'H', 'int':'i', 'uint':'I',
+		   'llong':'q', 'ullong':'Q', 'float':'f', 'double':'d'}
+STRUCTS = dict((t, struct.Struct('<'+f)) for t, f in FORMATS.items())
+
+def convert(valType, v):
+	'''
+	Converts a value the way a C cast to valType would (integers truncate and wrap, float rounds to single precision).
+	'''
+	if valType=='string':
+		return v if isinstance(v, str) else str(v)
+	fmt = FORMATS.get(valType, 'd')
+	if isinstance(v, str):
+		try: v = float(v)
+		except ValueError: v = 0.0
+	if fmt=='d':
+		return float(v)
+	if fmt=='f':
+		v = float(v)
+		if math.isinf(v) or math.isnan(v) or abs(v) <= 3.4028234663852886e38:
+			return STRUCTS['float'].unpack(STRUCTS['float'].pack(v))[0]
+		return math.copysign(float('inf'), v)
+	v = float(v)
+	if math.isnan(v) or math.isinf(v):
+		return 0
+	bits = 8*STRUCTS[valType].size
+	v = int(v) & ((1 << bits)-1)
+	if fmt.islower() and v >= 1 << (bits-1):
+		v -= 1 << bits
+	return v
+
+
+# ---- SIGNALS ----
+
+def signal(sigType, t, frequency, offset, amplitude):
+	'''
+	Generator output at time t (s) since the generator started.
+	'''
+	phase = 2*math.pi*frequency*t
+	if sigType==swbC.SIG_TYPE_SINE:
+		return offset + amplitude*math.sin(phase)
+	if sigType==swbC.SIG_TYPE_TRIANGLE:
+		return offset + amplitude*2/math.pi*math.asin(math.sin(phase))
+	if sigType==swbC.SIG_TYPE_SQUARE:
+		return offset + amplitude*(1 if math.sin(phase) >= 0 else -1)
+	if sigType==swbC.SIG_TYPE_RAMP:
+		return offset + amplitude*(2*(frequency*t - math.floor(frequency*t + 0.5)))
+	return offset
+
+
+class Generator(object):
+	def __init__(self, point, endType, sigType, frequency, count, phase, offset, amplitude, delay, duration):
+		self.point = point
+		self.endType = endType
+		self.sigType = sigType
+		self.frequency = float(frequency)
+		self.count = count
+		self.phase = float(phase)
+		self.offset = float(offset)
+		self.amplitude = float(amplitude)
+		self.delay = float(delay)
+		self.duration = float(duration)
+		self.start = None
+
+	def valueAt(self, now):
+		'''
+		Output at wall time now, or None while the generator is not running.
+		'''
+		if self.start is None: return None
+		t = now - self.start - self.delay
+		if t < 0: return None
+		if self.endType==swbC.GEN_SIGGENEND_DURATION and t > self.duration: return None
+		if self.endType==swbC.GEN_SIGGENEND_CYCLES and self.frequency*t > self.count: return None
+		return signal(self.sigType, t + self.phase/(2*math.pi*self.frequency or 1), self.frequency, self.offset, self.amplitude)
+
+
+# ---- MESSAGES ----
+
+def parseMsgs(lines):
+	'''
+	Parses NET-IO.msgs.1 lines into a dict of message name -> field dict.
+	'''
+	msgs = {}
+	for line in lines:
+		if isinstance(line, bytes): line = line.decode()
+		line = line.strip()
+		if not line or line.startswith('#'): continue
+		fields = dict(kv.split('=', 1) for kv in line.split(','))
+		msgs[fields['name']] = fields
+	return msgs
+
+
+class RuntimePoint(object):
+	'''
+	A point of a running session: current cvt value, alt (raw) value and its place in a NET-IO message.
+	'''
+	def __init__(self, name, atts, maps):
+		self.name = name
+		self.cvtType = atts.get('cvttype', 'double')
+		self.direction = maps['type'] if maps else None
+		self.rawType = maps['rawtype'] if maps else self.cvtType
+		self.message = maps['message'] if maps else None
+		self.start = int(maps['startbyte']) if maps else 0
+		self.strLength = int(maps['stringlength']) if maps else 0
+		self.isString = self.cvtType=='string' or self.rawType=='string'
+		self.value = '' if self.isString else 0
+		self.altvalue = self.value
+
+	def set(self, v):
+		self.value = convert(self.cvtType, v)
+		self.altvalue = convert(self.rawType, self.value)
+
+	def size(self):
+		if self.isString:
+			return max(self.strLength, len(self.value))
+		return STRUCTS[self.rawType].size
+
+	def pack(self, buf):
+		if self.isString:
+			data = self.altvalue.encode('latin-1')
+			if self.strLength: data = data[:self.strLength]
+			buf[self.start:self.start+len(data)] = data
+		else:
+			STRUCTS[self.rawType].pack_into(buf, self.start, self.altvalue)
+
+	def unpack(self, buf):
+		if self.isString:
+			n = self.strLength or len(buf)-self.start
+			self.altvalue = bytes(buf[self.start:self.start+n]).decode('latin-1').rstrip('\x00')
+			self.value = self.altvalue
+		else:
+			self.altvalue = STRUCTS[self.rawType].unpack_from(buf, self.start)[0]
+			self.value = convert(self.cvtType, self.altvalue)
+
+
+class Route(object):
+	'''
+	NET-IO loopback of one OUT message into the IN message listening on its destination port.
+	'''
+	def __init__(self, out, into, outPoints, inPoints):
+		self.out = out
+		self.into = into
+		self.outPoints = outPoints
+		self.inPoints = inPoints
+		need = max([p.start+p.size() for p in outPoints+inPoints] or [0])
+		self.length = max(int(out.get('messagelength', 0)), int(into.get('messagelength', 0)), need)
+		self.protocol = out.get('protocol')
+		self.rate = float(out.get('samplingrate', 0) or 0)
+		self.buf = bytearray(self.length)
+		self.pending = []		#(delivery time, message) on the wire
+		self.backlog = []		#tcp messages waiting for loopback bandwidth
+		self.due = None			#next send time when sampling
+
+
+# ---- SESSION ----
+
+class Session(object):
+	'''
+	A test session: its RTDB snapshot while running and its data log.
+	'''
+	def __init__(self, test, name, logging):
+		self.test = test
+		self.name = name
+		self.logging = logging
+		self.points = {}
+		self.order = []
+		self.routes = []
+		self.generators = []
+		self.frames = 0
+		self.startTime = None
+		self.stopTime = None
+		self._t = np.zeros(0, dtype=np.int64)
+		self._log = np.zeros((0, 0, 3))
+
+	def build(self, rtdb):
+		self.points = {}
+		for name, atts in rtdb['points'].items():
+			self.points[name] = RuntimePoint(name, atts, rtdb['iorecs'].get(atts.get('mappingrecords')))
+		self.order = sorted(self.points)
+		self.index = dict((name, i) for i, name in enumerate(self.order))
+
+		msgs = parseMsgs(rtdb['files'].get('NET-IO.msgs.1', []))
+		byMsg = {}
+		for p in self.points.values():
+			if p.message: byMsg.setdefault(p.message, []).append(p)
+		self.routes = []
+		for out in msgs.values():
+			if out.get('type')!='OUT': continue
+			for into in msgs.values():
+				if into.get('type')=='IN' and into.get('protocol')==out.get('protocol') and \
+						into.get('messageid')==out.get('messageid') and into.get('srcport')==out.get('destport') and \
+						into.get('destport')==out.get('srcport'):
+					outPoints = [p for p in byMsg.get(out['name'], []) if p.direction=='OUT']
+					inPoints = [p for p in byMsg.get(into['name'], []) if p.direction=='IN']
+					self.routes.append(Route(out, into, outPoints, inPoints))
+		self.generators = []
+		self.frames = 0
+		self.credit = 0.0		#loopback bytes that may still be sent (see StandInServer bandwidth)
+		self.lastFrame = None
+		self._t = np.zeros(1024, dtype=np.int64)
+		self._log = np.zeros((1024, len(self.order), 3))
+
+	def log(self, now):
+		if not self.logging: return
+		if self.frames==self._t.size:
+			self._t = np.concatenate([self._t, np.zeros_like(self._t)])
+			self._log = np.concatenate([self._log, np.zeros_like(self._log)])
+		k = self.frames
+		self._t[k] = int(now*1e9)
+		row = self._log[k]
+		for i, name in enumerate(self.order):
+			p = self.points[name]
+			if p.isString:
+				row[i] = np.nan
+			else:
+				row[i, 0] = p.value
+				row[i, 1] = p.altvalue
+				row[i, 2] = p.altvalue
+
+	def records(self, point, start, count):
+		i = self.index[point]
+		end = min(self.frames, start+count)
+		t = self._t[start:end]
+		cols = self._log[start:end, i, :]
+		return {'recNum':np.arange(start, end, dtype=np.int64).tobytes(),
+				'tSec':(t // 1000000000).tobytes(), 'tNSec':(t % 1000000000).tobytes(),
+				'cvt':np.ascontiguousarray(cols[:, 0]).tobytes(), 'alt':np.ascontiguousarray(cols[:, 1]).tobytes(),
+				'raw':np.ascontiguousarray(cols[:, 2]).tobytes(), 'count':int(end-start), 'next':int(end)}
+
+
+# ---- SERVER ----
+
+class StandInServer(object):
+	'''
+	In-memory SimWB stand-in: projects, RTDBs, tests, sessions, signal generators and a NET-IO loopback.
+	Running sessions are stepped by a background thread at frameRate (by default one frame per fixed step of
+	the session's test, in microseconds), and every frame is logged at its scheduled time; a frame thread that
+	falls behind catches up, unless it is more than MAX_LAG late, which shows up as a gap in the log as an
+	overrun would. Every frame generators drive their
+	OUT points, OUT messages are packed with the raw types of their mappings, delivered to the matching IN
+	message after latency seconds (or dropped with probability dropRate) and unpacked into the IN points,
+	and all numeric points are written to the session's data log.
+	With sampling, an OUT message is only sent at its samplingrate (Hz) instead of every frame. With a bandwidth
+	(bytes/s) the loopback carries at most that many message bytes, with burst seconds of unused capacity
+	buffered; tcp messages beyond it wait for the next frames (up to backlog messages per route), udp
+	messages beyond it are dropped.
+	'''
+	def __init__(self, frameRate=None, latency=0.0, dropRate=0.0, seed=None, sampling=False, bandwidth=0.0, burst=0.01, backlog=1000):
+		self.frameRate = float(frameRate) if frameRate else None
+		self.latency = float(latency)
+		self.dropRate = float(dropRate)
+		self.sampling = bool(sampling)
+		self.bandwidth = float(bandwidth)
+		self.burst = float(burst)
+		self.backlog = int(backlog)
+		self.random = random.Random(seed)
+		self.lock = threading.RLock()
+		self.projects = {}
+		self.clients = {}
+		self.nextClient = 1
+		self.running = None
+
+	# -- clients --
+
+	def connect(self):
+		with self.lock:
+			token = self.nextClient
+			self.nextClient += 1
+			self.clients[token] = {'user':None, 'project':None, 'rtdb':None}
+			return token
+
+	def _client(self, token, project=True):
+		c = self.clients.get(token)
+		if c is None or c['user'] is None: return None, ERR_NOTLOGGEDIN
+		if project and c['project'] not in self.projects: return c, ERR_NOPROJECT
+		return c, 0
+
+	def login(self, token, login):
+		c = self.clients.get(token)
+		if c is None: return [ERR_NOTLOGGEDIN, 0, 0]
+		c['user'] = login.split('/')[0]
+		return [0, 0xffff, 0]
+
+	def projectSelect(self, token, name):
+		with self.lock:
+			c, r = self._client(token, False)
+			if r < 0: return r
+			if name not in self.projects: return ERR_NOPROJECT
+			c['project'] = name
+			return 0
+
+	def projectCreate(self, token, name):
+		with self.lock:
+			c, r = self._client(token, False)
+			if r < 0: return r
+			self.projects.setdefault(name, {'rtdbs':{}, 'tests':{}, 'files':{}})
+			c['project'] = name
+			return 0
+
+	def _project(self, token):
+		c, r = self._client(token)
+		if r < 0: return c, None, r
+		return c, self.projects[c['project']], 0
+
+	# -- RTDB --
+
+	def dbDelete(self, token, name):
+		with self.lock:
+			c, prj, r = self._project(token)
+			if r < 0: return r
+			if prj['rtdbs'].pop(name, None) is None: return ERR_NORTDB
+			if c['rtdb']==name: c['rtdb'] = None
+			return 1
+
+	def dbSave(self, token, name):
+		with self.lock:
+			c, prj, r = self._project(token)
+			if r < 0: return r
+			prj['rtdbs'].setdefault(name, {'points':{}, 'iorecs':{}, 'files':{}})
+			c['rtdb'] = name		#saving a new RTDB also makes it the one edited, as the demo suite expects
+			return 0
+
+	def dbLoad(self, token, name):
+		with self.lock:
+			c, prj, r = self._project(token)
+			if r < 0: return r
+			if name not in prj['rtdbs']: return ERR_NORTDB
+			c['rtdb'] = name
+			return 0
+
+	def _loaded(self, token):
+		c, prj, r = self._project(token)
+		if r < 0: return None, r
+		if c['rtdb'] not in prj['rtdbs']: return None, ERR_NORTDB
+		return prj['rtdbs'][c['rtdb']], 0
+
+	def dbItemPut(self, token, points, save):
+		with self.lock:
+			rtdb, r = self._loaded(token)
+			if r < 0: return r
+			for name, atts in points.items():
+				rtdb['points'].setdefault(name, {}).update(atts)
+			return len(points)
+
+	def putIOMappingRecords(self, token, iorecs):
+		with self.lock:
+			rtdb, r = self._loaded(token)
+			if r < 0: return r
+			rtdb['iorecs'].update(iorecs)
+			return len(iorecs)
+
+	def putFileLines(self, token, lines, remoteDir, remoteFile):
+		with self.lock:
+			c, prj, r = self._project(token)
+			if r < 0: return r
+			if remoteDir.startswith('RTDB/'):
+				name = remoteDir[5:]
+				if name not in prj['rtdbs']: return ERR_NORTDB
+				prj['rtdbs'][name]['files'][remoteFile] = list(lines)
+			else:
+				prj['files'][remoteDir+'/'+remoteFile] = list(lines)
+			return 0
+
+	def getFileLines(self, token, remoteDir, remoteFile):
+		with self.lock:
+			c, prj, r = self._project(token)
+			if r < 0: return r, []
+			if remoteDir.startswith('RTDB/'):
+				name = remoteDir[5:]
+				if name not in prj['rtdbs']: return ERR_NORTDB, []
+				lines = prj['rtdbs'][name]['files'].get(remoteFile)
+			else:
+				lines = prj['files'].get(remoteDir+'/'+remoteFile)
+			if lines is None: return ERR_NOFILE, []
+			return 0, list(lines)
+
+	# -- tests and sessions --
+
+	def testDelete(self, token, test):
+		with self.lock:
+			c, prj, r = self._project(token)
+			if r < 0: return r
+			t = prj['tests'].pop(test, None)
+			if t is None: return ERR_NOTEST
+			if self.running is not None and self.running.test is t: self._stop()
+			return 1
+
+	def testCreate(self, token, test, rtdb, desc, fixedstep):
+		with self.lock:
+			c, prj, r = self._project(token)
+			if r < 0: return r
+			if rtdb not in prj['rtdbs']: return ERR_NORTDB
+			prj['tests'][test] = {'name':test, 'rtdb':rtdb, 'desc':desc, 'fixedstep':fixedstep, 'sessions':{}}
+			return 0
+
+	def sessionCreate(self, token, test, session, desc, schedType, noDataLogging):
+		with self.lock:
+			c, prj, r = self._project(token)
+			if r < 0: return r
+			t = prj['tests'].get(test)
+			if t is None: return ERR_NOTEST
+			s = Session(t, session, not noDataLogging)
+			s.project = c['project']
+			t['sessions'][session] = s
+			return 0
+
+	def sessionStart(self, token, test, session):
+		with self.lock:
+			c, prj, r = self._project(token)
+			if r < 0: return r
+			t = prj['tests'].get(test)
+			if t is None: return ERR_NOTEST
+			s = t['sessions'].get(session)
+			if s is None: return ERR_NOSESSION
+			if self.running is not None: return ERR_RUNNING
+			rtdb = prj['rtdbs'].get(t['rtdb'])
+			if rtdb is None: return ERR_NORTDB
+			s.build(rtdb)
+			s.period = 1.0/self.frameRate if self.frameRate else (t['fixedstep'] or DEFAULT_STEP)/1e6
+			s.startTime = time.time()
+			s.stopTime = None
+			s.stopEvent = threading.Event()
+			self.running = s
+			thread = threading.Thread(target=self._run, args=(s,))
+			thread.daemon = True
+			thread.start()
+			return 0
+
+	def _stop(self):
+		# the frame thread notices on its next frame that its session is no longer the running one
+		s = self.running
+		if s is None: return ERR_NOTRUNNING
+		self.running = None
+		s.stopTime = time.time()
+		s.stopEvent.set()
+		return 0
+
+	def sessionStop(self, token, reason):
+		with self.lock:
+			c, r = self._client(token)
+			if r < 0: return r
+			return self._stop()
+
+	def sessionDelete(self, token, test, session):
+		with self.lock:
+			c, prj, r = self._project(token)
+			if r < 0: return r
+			t = prj['tests'].get(test)
+			if t is None: return ERR_NOTEST
+			s = t['sessions'].pop(session, None)
+			if s is None: return ERR_NOSESSION
+			if self.running is s: self._stop()
+			return 1
+
+	# -- items --
+
+	def _running(self, token):
+		c, r = self._client(token)
+		if r < 0: return None, r
+		if self.running is None or self.running.project!=c['project']: return None, ERR_NOTRUNNING
+		return self.running, 0
+
+	def getItemValues(self, token, points):
+		with self.lock:
+			s, r = self._running(token)
+			if r < 0: return [r, {}]
+			info = {}
+			for name in points:
+				p = s.points.get(name)
+				if p is None: return [ERR_NOITEM, {}]
+				info[name] = {'value':p.value, 'altvalue':p.altvalue, 'cvttype':p.cvtType}
+			return [0, info]
+
+	def setItemValues(self, token, values):
+		with self.lock:
+			s, r = self._running(token)
+			if r < 0: return r
+			for name in values:
+				if name not in s.points: return ERR_NOITEM
+			for name, v in values.items():
+				s.points[name].set(v)
+			return 0
+
+	def addGenerator(self, token, point, endType, sigType, frequency, count, phase, offset, amplitude, delay, duration):
+		with self.lock:
+			s, r = self._running(token)
+			if r < 0: return r
+			if point not in s.points: return ERR_NOITEM
+			s.generators.append(Generator(point, endType, sigType, frequency, count, phase, offset, amplitude, delay, duration))
+			return len(s.generators)-1
+
+	def startAllGenerators(self, token):
+		with self.lock:
+			s, r = self._running(token)
+			if r < 0: return r
+			now = time.time()
+			for g in s.generators:
+				if g.start is None: g.start = now
+			return 0
+
+	# -- data log --
+
+	def _logged(self, project, session):
+		prj = self.projects.get(project)
+		if prj is None: return None, ERR_NOPROJECT
+		test, _, name = session.partition('/')
+		t = prj['tests'].get(test)
+		if t is None: return None, ERR_NOTEST
+		s = t['sessions'].get(name)
+		if s is None: return None, ERR_NOSESSION
+		return s, 0
+
+	def dlQueryTest(self, project, session):
+		with self.lock:
+			s, r = self._logged(project, session)
+			if r < 0: return [r, {}]
+			return [0, {'test':s.test['name'], 'session':s.name, 'rtdb':s.test['rtdb'], 'frames':s.frames,
+						'start':s.startTime, 'stop':s.stopTime, 'logging':s.logging}]
+
+	def dlGetMetaTable(self, project, session):
+		with self.lock:
+			s, r = self._logged(project, session)
+			if r < 0: return [r, {}]
+			table = dict((name, {'index':i, 'cvttype':s.points[name].cvtType, 'rawtype':s.points[name].rawType})
+						 for i, name in enumerate(s.order))
+			return [len(table), table]
+
+	def dlRecords(self, project, session, point, start, count):
+		with self.lock:
+			s, r = self._logged(project, session)
+			if r < 0: return [r, {}]
+			if point not in getattr(s, 'index', {}) or not s.logging: return [ERR_NORECORDS, {}]
+			return [0, s.records(point, start, count)]
+
+	# -- simulation --
+
+	def _run(self, s):
+		period = s.period
+		next = time.time()
+		while not s.stopEvent.is_set():
+			with self.lock:
+				if self.running is not s: break
+				self._frame(s, next)
+			next += period
+			delay = next - time.time()
+			if delay > 0:
+				s.stopEvent.wait(delay)
+			elif delay < -MAX_LAG:
+				next = time.time()
+
+	def _frame(self, s, now):
+		for g in s.generators:
+			v = g.valueAt(now)
+			if v is not None: s.points[g.point].set(v)
+
+		if self.bandwidth:
+			burst = max([self.bandwidth*max(self.burst, s.period)] + [r.length for r in s.routes])
+			s.credit = min(s.credit + self.bandwidth*(now - (s.lastFrame or now - s.period)), burst)
+			s.lastFrame = now
+		for route in s.routes:
+			if self.sampling and route.rate > 0:
+				if route.due is not None and now < route.due: continue
+				route.due = now + 1.0/route.rate if route.due is None else max(route.due + 1.0/route.rate, now)
+			if self.dropRate and self.random.random() < self.dropRate: continue
+			buf = bytearray(route.length)
+			for p in route.outPoints: p.pack(buf)
+			if not self.bandwidth:
+				route.pending.append((now+self.latency, buf))
+			elif route.protocol=='udp':
+				if s.credit >= route.length:
+					s.credit -= route.length
+					route.pending.append((now+self.latency, buf))
+			else:
+				route.backlog.append(buf)
+				del route.backlog[:-self.backlog]
+		if self.bandwidth:
+			waiting = [r for r in s.routes if r.backlog]
+			while waiting:
+				for route in list(waiting):
+					if s.credit < route.length:
+						waiting.remove(route)
+						continue
+					s.credit -= route.length
+					route.pending.append((now+self.latency, route.backlog.pop(0)))
+					if not route.backlog: waiting.remove(route)
+		for route in s.routes:
+			while route.pending and route.pending[0][0] <= now:
+				route.buf = route.pending.pop(0)[1]
+				for p in route.inPoints: p.unpack(route.buf)
+
+		s.log(now)
+		s.frames += 1
+
+
+# ---- XML-RPC FRONT END ----
+
+class _ThreadedServer(ThreadingMixIn, SimpleXMLRPCServer):
+	daemon_threads = True
+	allow_reuse_address = True
+
+
+def startServer(port=0, host='localhost', **options):
+	'''
+	Starts a stand-in server in a background thread.
+	Input:
+		port			TCP port to listen on (0 picks a free port)
+		host			interface to listen on
+		options			StandInServer options (frameRate, latency, dropRate, seed, sampling, bandwidth, burst, backlog)
+	Return:
+		server			StandInServer holding the simulated state
+		address			'host:port' to pass to simwbClient.connect / simwbDLClient.dlConnect
+		rpc				XML-RPC server; call rpc.shutdown() to stop it
+	'''
+	server = StandInServer(**options)
+	rpc = _ThreadedServer((host, port), logRequests=False, allow_none=True, use_builtin_types=True)
+	rpc.register_instance(server)
+	thread = threading.Thread(target=rpc.serve_forever)
+	thread.daemon = True
+	thread.start()
+	return server, '%s:%d' %(host, rpc.server_address[1]), rpc
+
+
+if __name__=='__main__':
+	parser = argparse.ArgumentParser(description='Offline SimWB stand-in server')
+	parser.add_argument('--host', default='localhost')
+	parser.add_argument('--port', type=int, default=standInWire.DEFAULT_PORT)
+	parser.add_argument('--frame-rate', type=float, default=None, help='session frames per second (default: one per fixed step of the test)')
+	parser.add_argument('--latency', type=float, default=0.0, help='NET-IO loopback latency in seconds')
+	parser.add_argument('--drop-rate', type=float, default=0.0, help='probability that a message is dropped')
+	parser.add_argument('--seed', type=int, default=None)
+	parser.add_argument('--sampling', action='store_true', help='send OUT messages at their samplingrate instead of every frame')
+	parser.add_argument('--bandwidth', type=float, default=0.0, help='loopback capacity in message bytes per second (0 = unlimited)')
+	args = parser.parse_args()
+
+	server, address, rpc = startServer(args.port, args.host, frameRate=args.frame_rate, latency=args.latency,
+									   dropRate=args.drop_rate, seed=args.seed, sampling=args.sampling, bandwidth=args.bandwidth)
+	print('SimWB stand-in listening on %s' %address)
+	try:
+		while True: time.sleep(3600)
+	except KeyboardInterrupt:
+		rpc.shutdown()
@@ -0,0 +1,52 @@
+from __future__ import print_function
+import os
+import threading
+
+try:
+	import xmlrpc.client as xmlrpclib
+except ImportError:
+	import xmlrpclib
+
+
+DEFAULT_PORT = int(os.environ.get('SIMWB_STANDIN_PORT', '9500'))		#port used for host names without ':port'
+
+
+# ---- WIRE FORMAT ----
+
+def _dumpInt(self, value, write):
+	# XML-RPC ints are 32 bit; llong/uint values are sent as i8, which the reader already understands
+	if -2**31 <= value < 2**31:
+		write('<value><int>%d</int></value>\n' %value)
+	else:
+		write('<value><i8>%d</i8></value>\n' %value)
+
+xmlrpclib.Marshaller.dispatch[int] = _dumpInt
+
+
+def splitHost(host):
+	'''
+	Splits 'host' or 'host:port' into (host, port), using DEFAULT_PORT if no port is given.
+	'''
+	if ':' in host:
+		name, port = host.rsplit(':', 1)
+		return name, int(port)
+	return host, DEFAULT_PORT
+
+
+class Connection(object):
+	'''
+	XML-RPC connection to a stand-in server with one proxy per thread (ServerProxy is not thread safe).
+	'''
+	def __init__(self, host):
+		self.host = host
+		self.url = 'http://%s:%d/' %splitHost(host)
+		self._local = threading.local()
+
+	def proxy(self):
+		p = getattr(self._local, 'proxy', None)
+		if p is None:
+			p = self._local.proxy = xmlrpclib.ServerProxy(self.url, allow_none=True, use_builtin_types=True)
+		return p
+
+	def call(self, name, *args):
+		return getattr(self.proxy(), name)(*args)
@@ -0,0 +1,183 @@
+from __future__ import print_function
+import os
+import sys
+import math
+import json
+import time
+import atexit
+import threading
+
+
+MAX_EVENTS = 1000000		#timeline events kept per run; statistics keep counting after the limit
+BUCKETS = 32				#latency histogram buckets: [0, 1us), then powers of two from 1us upwards
+ARG_WIDTH = 60				#characters kept of each argument summary
+
+stats = {}					#function name -> {'count', 'total', 'min', 'max', 'errors', 'hist'}
+events = []					#(name, start, duration, args, rc, thread id) for the timeline
+_lock = threading.Lock()
+_origin = time.time()
+_fromEnv = False
+
+
+# ---- RECORDING ----
+
+def summarize(args, kwargs):
+	'''
+	Short text summary of call arguments: scalars as values, containers by type and length.
+	'''
+	def one(a):
+		if isinstance(a, (dict, list, tuple, set)):
+			return '%s[%d]' %(type(a).__name__, len(a))
+		if callable(a):
+			return getattr(a, '__name__', 'callable')
+		return repr(a)[:ARG_WIDTH]
+	parts = [one(a) for a in args] + ['%s=%s' %(k, one(v)) for k, v in sorted(kwargs.items())]
+	return ', '.join(parts)
+
+
+def returnCode(result):
+	'''
+	Return code of a client call: the int result itself or the first element of a result tuple.
+	'''
+	if isinstance(result, (tuple, list)) and result:
+		result = result[0]
+	if isinstance(result, int) and not isinstance(result, bool):
+		return result
+	return None
+
+
+def bucket(duration):
+	if duration < 1e-6: return 0
+	return min(BUCKETS-1, 1+int(math.log(duration/1e-6, 2)))
+
+
+def record(name, start, duration, args, rc):
+	with _lock:
+		s = stats.get(name)
+		if s is None:
+			s = stats[name] = {'count':0, 'total':0.0, 'min':duration, 'max':0.0, 'errors':0, 'hist':[0]*BUCKETS}
+		s['count'] += 1
+		s['total'] += duration
+		s['min'] = min(s['min'], duration)
+		s['max'] = max(s['max'], duration)
+		if rc is not None and rc < 0: s['errors'] += 1
+		s['hist'][bucket(duration)] += 1
+		if args is not None and len(events) < MAX_EVENTS:
+			events.append((name, start, duration, args, rc, threading.current_thread().ident))
+
+
+def _traced(name, fn, timeline):
+	def wrapper(*args, **kwargs):
+		start = time.time()
+		rc = None
+		try:
+			result = fn(*args, **kwargs)
+			rc = returnCode(result)
+			return result
+		finally:
+			record(name, start, time.time()-start, summarize(args, kwargs) if timeline else None, rc)
+	wrapper._traced = fn
+	wrapper.__name__ = getattr(fn, '__name__', name)
+	return wrapper
+
+
+def enable(*modules, **options):
+	'''
+	Wraps the public functions of the client modules (e.g. swb, dl) so every call is recorded.
+	Calls made through the module attribute (swb.dbSave(...)) are traced, including those made by the helper modules.
+	Input:
+		modules			client modules to trace
+		timeline		keep per-call events for dumpChromeTrace (default True); statistics are always kept
+	'''
+	timeline = options.get('timeline', True)
+	for module in modules:
+		prefix = module.__name__
+		for name in dir(module):
+			fn = getattr(module, name)
+			if name.startswith('_') or name=='strerror' or not callable(fn) or isinstance(fn, type) or hasattr(fn, '_traced'):
+				continue
+			setattr(module, name, _traced('%s.%s' %(prefix, name), fn, timeline))
+
+
+def disable(*modules):
+	'''
+	Restores the original functions of traced modules.
+	'''
+	for module in modules:
+		for name in dir(module):
+			fn = getattr(module, name)
+			if hasattr(fn, '_traced'):
+				setattr(module, name, fn._traced)
+
+
+def reset():
+	with _lock:
+		stats.clear()
+		del events[:]
+
+
+def counts():
+	'''
+	Number of calls per function name so far.
+	'''
+	with _lock:
+		return dict((name, s['count']) for name, s in stats.items())
+
+
+# ---- REPORTING ----
+
+def percentile(s, q):
+	'''
+	Upper bound (s) of the histogram bucket holding the q-th percentile of a function's latencies.
+	'''
+	target = q/100.0*s['count']
+	seen = 0
+	for i, n in enumerate(s['hist']):
+		seen += n
+		if seen >= target and n:
+			return min(1e-6*2**i, s['max'])
+	return s['max']
+
+
+def report(out=None):
+	'''
+	Prints per-function call counts, latency statistics and share of the total traced time, largest first.
+	'''
+	out = out or sys.stdout
+	with _lock:
+		items = sorted(stats.items(), key=lambda kv: -kv[1]['total'])
+	total = sum(s['total'] for name, s in items) or 1.0
+	print('%-36s %7s %9s %6s %9s %9s %9s %9s %6s' %('call', 'count', 'total s', 'share', 'mean ms', 'p50 ms', 'p99 ms', 'max ms', 'errors'), file=out)
+	for name, s in items:
+		print('%-36s %7d %9.3f %5.1f%% %9.3f %9.3f %9.3f %9.3f %6d' %(name, s['count'], s['total'], 100*s['total']/total,
+			  1e3*s['total']/s['count'], 1e3*percentile(s, 50), 1e3*percentile(s, 99), 1e3*s['max'], s['errors']), file=out)
+
+
+def dumpChromeTrace(path):
+	'''
+	Writes the call timeline as Chrome trace JSON (chrome://tracing, Perfetto) together with the per-function statistics.
+	'''
+	pid = os.getpid()
+	with _lock:
+		trace = [{'name':name, 'cat':name.split('.')[0], 'ph':'X', 'ts':1e6*(start-_origin), 'dur':1e6*duration,
+				  'pid':pid, 'tid':tid, 'args':{'args':args, 'rc':rc}} for name, start, duration, args, rc, tid in events]
+		summary = dict((name, dict(s)) for name, s in stats.items())
+	with open(path, 'w') as f:
+		json.dump({'traceEvents':trace, 'displayTimeUnit':'ms', 'otherData':{'stats':summary}}, f)
+
+
+def enableFromEnv(*modules):
+	'''
+	Opt-in tracing for the scripts: if SIMWB_TRACE is set, traces the modules and at exit prints the report
+	and writes the Chrome trace to the file SIMWB_TRACE names (no file if it is '1').
+	'''
+	global _fromEnv
+	path = os.environ.get('SIMWB_TRACE')
+	if not path: return
+	enable(*modules)
+	if _fromEnv: return		#several scripts imported into one process (see runSuites) report once
+	_fromEnv = True
+	def finish():
+		report()
+		if path!='1': dumpChromeTrace(path)
+	atexit.register(finish)
@@ -0,0 +1,225 @@
+from __future__ import print_function
+import time
+import threading
+import traceback
+
+try:
+	import queue
+except ImportError:
+	import Queue as queue
+
+import resultCache as rc
+
+
+# ---- MATRIX CELLS ----
+
+class Cell(object):
+	'''
+	One cvtType/rawType/protocol combination of a test matrix with its own server-side names and ports,
+	so a cell does not overwrite the RTDB, test or session of a cell whose data log is still being read
+	(see runPipeline) and cells stay apart when spread over hosts.
+	Attributes:
+		index			position of the cell in the matrix
+		cvtType			point type specified in initial point creation
+		rawType			point type specified in point mapping
+		protocol		either 'tcp' or 'udp'
+		metaFlags		RTDB meta flags for the items
+		rtdb			RTDB name of the cell
+		test			test name of the cell
+		session			session name of the cell
+		ports			(IN message srcport, OUT message srcport); each side sends to the other
+	'''
+	def __init__(self, index, cvtType, rawType, protocol, metaFlags, rtdb, test, session, ports):
+		self.index = index
+		self.cvtType = cvtType
+		self.rawType = rawType
+		self.protocol = protocol
+		self.metaFlags = metaFlags
+		self.rtdb = rtdb
+		self.test = test
+		self.session = session
+		self.ports = ports
+
+	def __repr__(self):
+		return 'Cell(%d, %s/%s, %s)' %(self.index, self.cvtType, self.rawType, self.protocol)
+
+
+def metaFlagsFor(rawType):
+	'''
+	RTDB meta flags used for a raw type.
+	'''
+	if rawType=='int':
+		return '48'
+	return '8'
+
+
+def buildCells(name, cvtTypes, rawTypes, protocols, ports=(1, 1000)):
+	'''
+	Creates the cells of a cvtType x protocol sweep.
+	Input:
+		name			base name for RTDB, test and session names
+		cvtTypes		types specified in point creation
+		rawTypes		types specified in mapping (same length as cvtTypes)
+		protocols		protocols to test every type with
+		ports			ports of the first cell; every further cell uses the next port on both sides
+	Return:
+		cells			list of Cell
+	'''
+	cells = []
+	for cvtType,rawType in zip(cvtTypes,rawTypes):
+		for protocol in protocols:
+			i = len(cells)
+			cells.append(Cell(i, cvtType, rawType, protocol, metaFlagsFor(rawType),
+							  '%s_val_%d' %(name,i), '%s_%d' %(name,i), 'test_%s_%s' %(cvtType,protocol),
+							  (ports[0]+i, ports[1]+i)))
+	return cells
+
+
+# ---- EXECUTE MATRIX ----
+
+def runCell(runner, cell):
+	'''
+	Runs one cell and captures its outcome, so a failing cell does not end the sweep.
+	Return:
+		result			dict with keys cell, result (runner return value), error (message or None), time (s)
+						and cached (False)
+	'''
+	start = time.time()
+	out = {'cell':cell, 'result':None, 'error':None, 'time':0.0, 'cached':False}
+	try:
+		out['result'] = runner(cell)
+	except SystemExit as e:
+		out['error'] = str(e)
+	except Exception:
+		out['error'] = traceback.format_exc()
+	out['time'] = time.time() - start
+	return out
+
+
+def cellPassed(out):
+	'''
+	True if a runCell result ran without error and every result dict it returned passed.
+	'''
+	if out['error']: return False
+	result = out['result']
+	if isinstance(result, list):
+		return all(r.get('passed') for r in result)
+	return bool(result)
+
+
+def runMatrix(cells, runner, keyOf=None, force=False):
+	'''
+	Runs the cells of a matrix one after another. The cells share the client's single connection and the
+	server's current session, so they are not run side by side; see runPipeline for overlapping them.
+	With keyOf, cells whose configuration passed before (see resultCache) are not run again; their cached
+	result is returned instead. New, changed and previously failing cells always run.
+	Input:
+		cells			list of Cell
+		runner			function called with a Cell that provisions, runs and validates it
+		keyOf			function returning the result cache key of a Cell (see resultCache.cellKey), or None
+		force			run every cell, ignoring cached results (outcomes are still recorded)
+	Return:
+		results			list of runCell results in cell order; skipped cells have cached set to True and time 0
+	'''
+	results = []
+	for cell in cells:
+		key = keyOf(cell) if keyOf is not None else None
+		if key is not None and not force:
+			entry = rc.lookup(key)
+			if entry is not None:
+				results.append({'cell':cell, 'result':entry['result'], 'error':None, 'time':0.0, 'cached':True})
+				continue
+		out = runCell(runner, cell)
+		if key is not None:
+			passed = cellPassed(out)
+			rc.record(key, passed, out['result'] if passed else None)
+		results.append(out)
+	return results
+
+
+def runPipeline(cells, start, finish, depth=1, keyOf=None, force=False):
+	'''
+	Runs the cells of a matrix one after another with the two halves of every cell overlapped: while a
+	background worker finishes cell N (e.g. fetches and validates its data log), the caller's thread already
+	runs the start of cell N+1 (provisions it and runs its session).
+	With keyOf, cells are skipped and recorded as in runMatrix.
+	Input:
+		cells			list of Cell
+		start			function called with a Cell in the caller's thread; returns what finish needs
+		finish			function called with the return value of start in the worker; returns the cell's result
+		depth			largest number of started cells queued for finish while the worker finishes another one,
+						so up to depth+1 cells are started but not finished; the next start waits until one finishes
+		keyOf			function returning the result cache key of a Cell (see resultCache.cellKey), or None
+		force			run every cell, ignoring cached results (outcomes are still recorded)
+	Return:
+		results			list of runCell results in cell order; time is the time of both halves
+	'''
+	results = [None]*len(cells)
+	started = queue.Queue()
+	slots = threading.Semaphore(max(1, depth)+1)		#cells started but not finished
+
+	def done(i, key, out):
+		if key is not None:
+			passed = cellPassed(out)
+			rc.record(key, passed, out['result'] if passed else None)
+		results[i] = out
+
+	def work():
+		while True:
+			item = started.get()
+			if item is None: break
+			i, key, first = item
+			out = runCell(lambda cell: finish(first['result']), first['cell'])
+			out['time'] += first['time']
+			done(i, key, out)
+			slots.release()
+
+	worker = threading.Thread(target=work)
+	worker.daemon = True
+	worker.start()
+	try:
+		for i, cell in enumerate(cells):
+			key = keyOf(cell) if keyOf is not None else None
+			if key is not None and not force:
+				entry = rc.lookup(key)
+				if entry is not None:
+					results[i] = {'cell':cell, 'result':entry['result'], 'error':None, 'time':0.0, 'cached':True}
+					continue
+			slots.acquire()
+			first = runCell(start, cell)
+			if first['error']:
+				done(i, key, first)
+				slots.release()
+			else:
+				started.put((i, key, first))
+	finally:
+		started.put(None)
+		worker.join()
+	return results
+
+
+def printSummary(results, label):
+	'''
+	Prints the cells that failed to run and the total run time.
+	'''
+	failed = [r for r in results if r['error']]
+	for r in failed:
+		print('%s %s failed: %s' %(label, r['cell'], r['error']))
+	cached = sum(1 for r in results if r.get('cached'))
+	print('%s: %d of %d cells ran, %d skipped as unchanged and passing, %0.1f s cell time\n'
+		  %(label, len(results)-len(failed)-cached, len(results), cached, sum(r['time'] for r in results)))
+
+
+def printLatency(results, label):
+	'''
+	Prints the propagation delay and jitter measured per cell (mean over the pairs whose results carry a delay).
+	'''
+	print('%s propagation delay:' %label)
+	print('  %-8s %-8s %-4s %10s %10s' %('cvtType', 'rawType', 'prot', 'delay ms', 'jitter ms'))
+	for r in results:
+		delays = [(p['delay'], p['jitter']) for p in (r['result'] or []) if p.get('delay') is not None and p['delay']==p['delay']]
+		if not delays: continue
+		cell = r['cell']
+		print('  %-8s %-8s %-4s %10.2f %10.2f' %(cell.cvtType, cell.rawType, cell.protocol,
+			  1e3*sum(d for d, j in delays)/len(delays), 1e3*max(j for d, j in delays)))
+	print('')
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the suites run against the stand-in server, without the caches kept in the home directory
+sys.path.insert(0, os.path.join(ROOT, 'standin'))
+sys.path.insert(0, ROOT)
+os.environ['SIMWB_TRACE'] = ''
+
+import jsonCache
+jsonCache.disableLocalCaches()
+
+
+@pytest.fixture
+def localCaches(monkeypatch):
+	'''
+	Lets a test use cache files again; it must point the cache at its own tmp_path.
+	'''
+	monkeypatch.setattr(jsonCache, '_disabled', False)
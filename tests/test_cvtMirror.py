@@ -0,0 +1,106 @@
+import time
+
+import numpy as np
+
+import cvtMirror as cm
+import waits
+
+
+class FakeClient(object):
+	'''
+	Current value table stand-in: OUT writes show up on the matching IN point (Out.x -> In.x).
+	'''
+	def __init__(self):
+		self.table = {}
+		self.reads = 0
+		self.writes = 0
+		self.fail = False
+
+	def getItemValues(self, points):
+		self.reads += 1
+		if self.fail: return -1, {}
+		return 0, dict((p, {'value':self.table.get(p, 0), 'altvalue':self.table.get(p, 0)}) for p in points)
+
+	def setItemValue(self, point, value):
+		self.writes += 1
+		self.table[point.replace('Out.', 'In.')] = value
+		return 0
+
+	def strerror(self, r):
+		return 'error %d' %r
+
+
+class BulkClient(FakeClient):
+	def setItemValues(self, values):
+		self.writes += 1
+		for point, value in values.items():
+			self.table[point.replace('Out.', 'In.')] = value
+		return 0
+
+
+def install(monkeypatch, bulk=True):
+	client = BulkClient() if bulk else FakeClient()
+	monkeypatch.setattr(cm, 'swb', client)
+	return client
+
+
+def test_refresh_reads_all_points_in_one_call(monkeypatch):
+	client = install(monkeypatch)
+	client.table.update({'In.a':1.5, 'In.b':-2, 'In.c':2**60+1})
+	mirror = cm.CVTMirror(['In.a', 'In.b'])
+	mirror.register(['In.c', 'In.a'])
+	assert mirror.get('In.a') is None		#not read yet
+	assert mirror.refresh() == 0
+	assert client.reads == 1
+	assert mirror.get('In.a') == 1.5 and mirror.get('In.b') == -2
+	assert mirror.get('In.c') == 2**60+1		#kept exact beyond float64
+	assert list(mirror.values(['In.b', 'In.a'])) == [-2, 1.5]
+	assert client.reads == 1		#reads are local
+
+
+def test_refresh_tracks_changes_and_keeps_values_on_failure(monkeypatch):
+	client = install(monkeypatch)
+	mirror = cm.CVTMirror(['In.a', 'In.b'])
+	mirror.refresh()
+	client.table['In.b'] = 3.0
+	mirror.refresh()
+	assert list(mirror.changed) == [False, True]
+	assert mirror.values().dtype == np.float64
+	client.fail = True
+	assert mirror.refresh() < 0
+	assert mirror.errors == 1 and mirror.frame == 2
+	assert mirror.get('In.b') == 3.0
+
+
+def test_writeValues_is_one_bulk_call(monkeypatch):
+	client = install(monkeypatch)
+	cm.writeValues(['Out.a', 'Out.b'], [1, 2])
+	assert client.writes == 1
+	assert client.table == {'In.a':1, 'In.b':2}
+	client = install(monkeypatch, bulk=False)
+	cm.writeValues(['Out.a', 'Out.b'], [1, 2])
+	assert client.writes == 2
+
+
+def test_waitForValues_with_a_background_refresh(monkeypatch):
+	install(monkeypatch)
+	mirror = cm.CVTMirror(['In.a', 'In.b'])
+	mirror.start(0.005)
+	try:
+		cm.writeValues(['Out.a', 'Out.b'], [1.0, 2.0+1e-12])
+		assert mirror.waitForValues(['In.a', 'In.b'], [1.0, 2.0], tol=1e-9, timeout=1.0, label='loopback')
+		start = time.time()
+		assert not mirror.waitForValues(['In.a'], [5.0], timeout=0.05, label='never')
+		assert time.time() - start < 0.5
+	finally:
+		mirror.stop()
+	assert waits.history[-2][0] == 'loopback' and waits.history[-2][2]
+	assert waits.history[-1][0] == 'never' and not waits.history[-1][2]
+
+
+def test_waitForChange_polls_without_a_background_refresh(monkeypatch):
+	client = install(monkeypatch)
+	mirror = cm.CVTMirror(['In.a'])
+	assert not mirror.waitForChange(timeout=0.05)
+	client.table['In.a'] = 7
+	assert mirror.waitForChange(timeout=0.5)
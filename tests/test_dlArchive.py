@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pytest
+
+import dlArchive
+import dlReader as dlr
+
+pytestmark = pytest.mark.usefixtures('localCaches')
+
+
+class Clock(object):
+	def __init__(self, now):
+		self.now = now
+
+	def time(self):
+		return self.now
+
+
+def records(start, count=100):
+	buf = dlr.RecordBuffer()
+	for k in range(count):
+		buf.append(k, start+k, 0, float(k), float(k), float(k))
+	return {'In.a':buf}
+
+
+def archive(monkeypatch, tmp_path, now=1000.0):
+	clock = Clock(now)
+	monkeypatch.setattr(dlArchive, 'ARCHIVE_DIR', str(tmp_path))
+	monkeypatch.setattr(dlArchive, 'time', clock)
+	return clock
+
+
+def test_store_and_load_round_trip(monkeypatch, tmp_path):
+	archive(monkeypatch, tmp_path)
+	run = dlArchive.store('host', 'proj', 'test/s1', records(10))
+	loaded = dlArchive.load(run)['In.a']
+	assert len(loaded) == 100
+	assert np.array_equal(loaded.t, (10+np.arange(100))*1000000000)
+	assert np.array_equal(loaded.cvt, np.arange(100.0))
+	assert dlArchive.latest('host', 'proj', 'test/s1')['id'] == run
+
+
+def test_runs_older_than_max_age_are_evicted(monkeypatch, tmp_path):
+	clock = archive(monkeypatch, tmp_path)
+	old = dlArchive.store('host', 'proj', 'test/s1', records(10))
+	oldDir = os.path.join(str(tmp_path), dlArchive.latest('host', 'proj', 'test/s1')['dir'])
+	clock.now += dlArchive.MAX_AGE + 1
+	new = dlArchive.store('host', 'proj', 'test/s2', records(20))
+	assert [e['id'] for e in dlArchive.runs()] == [new]
+	assert old != new and not os.path.exists(oldDir)
+
+
+def test_oldest_runs_are_evicted_over_max_bytes(monkeypatch, tmp_path):
+	clock = archive(monkeypatch, tmp_path)
+	first = dlArchive.store('host', 'proj', 'test/s1', records(10))
+	size = dlArchive.runs()[0]['bytes']
+	monkeypatch.setattr(dlArchive, 'MAX_BYTES', 2*size)
+	clock.now += 1
+	second = dlArchive.store('host', 'proj', 'test/s2', records(20))
+	assert [e['id'] for e in dlArchive.runs()] == [first, second]
+	clock.now += 1
+	third = dlArchive.store('host', 'proj', 'test/s3', records(30))
+	assert [e['id'] for e in dlArchive.runs()] == [second, third]		#the oldest run made room
+
+
+def test_the_run_being_stored_is_never_evicted(monkeypatch, tmp_path):
+	archive(monkeypatch, tmp_path)
+	monkeypatch.setattr(dlArchive, 'MAX_BYTES', 1)
+	run = dlArchive.store('host', 'proj', 'test/s1', records(10))
+	assert [e['id'] for e in dlArchive.runs()] == [run]
+
+
+class FakeDL(object):
+	dlAllSamples = 0
+
+	def dlGetRecords(self, point, maxRecords, mode, cb):
+		for k in range(50):
+			cb(k, 5+k, 0, float(k), float(k), float(k), 0, 0)
+		return 0
+
+
+def test_spooled_records_are_archived(monkeypatch, tmp_path):
+	archive(monkeypatch, tmp_path/'archive')
+	session = dlr.DLSession('host', 'proj', 'test/s1')
+	monkeypatch.setattr(dlr, 'dl', FakeDL())
+	monkeypatch.setattr(dlr, '_active', {'host':'host', 'project':'proj', 'session':session.key})
+	spooled = dlr.spoolPoints(['In.a', 'Out.a'], str(tmp_path/'spool'), chunkSize=16, session=session)
+	run = dlArchive.latest('host', 'proj', 'test/s1')
+	assert run['points'] == {'In.a':50, 'Out.a':50}
+	loaded = dlArchive.load(run)
+	assert np.array_equal(loaded['Out.a'].cvt, spooled['Out.a'].cvt)
@@ -0,0 +1,73 @@
+import time
+import threading
+
+import numpy as np
+
+import dlReader as dlr
+
+
+class FakeDL(object):
+	'''
+	dlGetRecords stand-in: every point has count records, delivered one per pause seconds.
+	'''
+	dlAllSamples = 0
+
+	def __init__(self, count=200, pause=0.0):
+		self.count = count
+		self.pause = pause
+		self.scans = []
+		self.busy = threading.Lock()
+
+	def dlGetRecords(self, point, maxRecords, mode, cb):
+		assert self.busy.acquire(False), 'scans overlap'		#the DL client runs one scan at a time
+		try:
+			self.scans.append(point)
+			for k in range(min(self.count, maxRecords)):
+				if self.pause: time.sleep(self.pause)
+				cb(k, k, 1000*k, float(k), -float(k), 2.0*k, 0, 0)
+		finally:
+			self.busy.release()
+		return 0
+
+
+def test_iterRecords_yields_every_record_in_chunks(monkeypatch):
+	monkeypatch.setattr(dlr, 'dl', FakeDL(count=100))
+	chunks = list(dlr.iterRecords('In.a', chunkSize=32))
+	assert [len(c) for c in chunks] == [32, 32, 32, 4]
+	assert np.array_equal(np.concatenate([c.recNum for c in chunks]), np.arange(100))
+	assert np.array_equal(np.concatenate([c.t for c in chunks]), np.arange(100)*1000000000 + np.arange(100)*1000)
+
+
+def test_closing_iterRecords_early_returns_and_the_next_read_waits(monkeypatch):
+	fake = FakeDL(count=200, pause=0.002)
+	monkeypatch.setattr(dlr, 'dl', fake)
+	scans = dlr.iterRecords('In.a', chunkSize=10)
+	next(scans)
+	start = time.time()
+	scans.close()
+	assert time.time() - start < 0.1		#the rest of the 0.4 s scan drains in the background
+	buf = dlr.readRecords('Out.a')		#fails in FakeDL if it overlaps the draining scan
+	assert len(buf) == 200
+	assert np.array_equal(buf.cvt, np.arange(200.0))
+	assert fake.scans == ['In.a', 'Out.a']
+	assert dlr._scans == []
+
+
+def test_readPoints_reads_each_point_once_per_session(monkeypatch):
+	fake = FakeDL(count=10)
+	session = dlr.DLSession('host', 'proj', 'test/s1')
+	monkeypatch.setattr(dlr, 'dl', fake)
+	monkeypatch.setattr(dlr, '_active', {'host':'host', 'project':'proj', 'session':session.key})
+	records = dlr.readPoints(['In.a', 'Out.a', 'In.a'], session=session)
+	assert sorted(records) == ['In.a', 'Out.a']
+	dlr.readPoints(['Out.a', 'In.b'], session=session)
+	assert fake.scans == ['In.a', 'Out.a', 'In.b']
+
+
+def test_spoolPoints_matches_readRecords(monkeypatch, tmp_path):
+	monkeypatch.setattr(dlr, 'dl', FakeDL(count=100))
+	spooled = dlr.spoolPoints(['In.a'], str(tmp_path), chunkSize=16)['In.a']
+	whole = dlr.readRecords('In.a')
+	assert len(spooled) == 100
+	for name in ('recNum', 't', 'cvt', 'alt', 'raw'):
+		assert np.array_equal(getattr(spooled, name), getattr(whole, name)), name
@@ -0,0 +1,85 @@
+import os
+import multiprocessing
+
+import pytest
+
+import jsonCache
+
+pytestmark = pytest.mark.usefixtures('localCaches')
+
+
+def increment(path, count):
+	cache = jsonCache.JSONCache(lambda: path)
+	for k in range(count):
+		with cache.update() as data:
+			data['n'] = data.get('n', 0) + 1
+
+
+def test_update_merges_changes_of_another_writer(tmp_path):
+	path = str(tmp_path/'cache.json')
+	a = jsonCache.JSONCache(lambda: path)
+	b = jsonCache.JSONCache(lambda: path)
+	with a.update() as data:
+		data['x'] = 1
+	assert b.read() == {'x':1}
+	with b.update() as data:
+		data['y'] = 2
+	with a.update() as data:		#a's copy is stale; the update starts from the file
+		data['z'] = 3
+	assert b.read() == {'x':1, 'y':2, 'z':3}
+
+
+def test_failed_update_is_not_written(tmp_path):
+	path = str(tmp_path/'cache.json')
+	cache = jsonCache.JSONCache(lambda: path)
+	with cache.update() as data:
+		data['x'] = 1
+	with pytest.raises(RuntimeError):
+		with cache.update() as data:
+			data['x'] = 2
+			raise RuntimeError('interrupted')
+	assert jsonCache.JSONCache(lambda: path).read() == {'x':1}
+
+
+def test_concurrent_processes_keep_every_update(tmp_path):
+	path = str(tmp_path/'cache.json')
+	ctx = multiprocessing.get_context('spawn')
+	procs = [ctx.Process(target=increment, args=(path, 25)) for k in range(4)]
+	for p in procs: p.start()
+	for p in procs: p.join()
+	assert [p.exitcode for p in procs] == [0]*4
+	assert jsonCache.JSONCache(lambda: path).read() == {'n':100}
+
+
+def test_forget_drops_matching_scoped_keys(tmp_path):
+	cache = jsonCache.JSONCache(lambda: str(tmp_path/'cache.json'))
+	with cache.update() as data:
+		for scope in ('h1/p', 'h2/p'):
+			for name in ('a', 'b'):
+				data[jsonCache.scopedKey(scope, name)] = 0
+	cache.forget('h1/p', 'a')
+	assert sorted(cache.read()) == ['h1/p|b', 'h2/p|a', 'h2/p|b']
+	cache.forget('h2/p')
+	assert sorted(cache.read()) == ['h1/p|b']
+
+
+def test_cachePath_default_override_and_off(monkeypatch):
+	monkeypatch.delenv('SIMWB_TEST_CACHE', raising=False)
+	assert jsonCache.cachePath('SIMWB_TEST_CACHE', '.c.json') == os.path.join(os.path.expanduser('~'), '.c.json')
+	monkeypatch.setenv('SIMWB_TEST_CACHE', '/tmp/other.json')
+	assert jsonCache.cachePath('SIMWB_TEST_CACHE', '.c.json') == '/tmp/other.json'
+	monkeypatch.setenv('SIMWB_TEST_CACHE', '')
+	assert jsonCache.cachePath('SIMWB_TEST_CACHE', '.c.json') is None
+
+
+def test_disableLocalCaches_keeps_caches_in_memory(monkeypatch, tmp_path):
+	for var in jsonCache.CACHE_VARS:
+		monkeypatch.setenv(var, str(tmp_path/var))
+	path = str(tmp_path/'cache.json')
+	cache = jsonCache.JSONCache(lambda: path)
+	jsonCache.disableLocalCaches()
+	with cache.update() as data:
+		data['x'] = 1
+	assert cache.read() == {'x':1}
+	assert not os.path.exists(path)
+	assert all(os.environ[var]=='' for var in jsonCache.CACHE_VARS)		#inherited by the processes it starts
@@ -0,0 +1,59 @@
+import time
+
+import liveValidate as lv
+
+
+class FakeClient(object):
+	'''
+	getItemValues stand-in: OUT counts up by one per read and IN shows it delay reads later, plus offset
+	for the points in broken.
+	'''
+	def __init__(self, delay=0, offset=0.0, broken=()):
+		self.reads = 0
+		self.delay = delay
+		self.offset = offset
+		self.broken = broken
+
+	def getItemValues(self, points):
+		self.reads += 1
+		out = float(self.reads)
+		values = {}
+		for p in points:
+			inVal = max(out - self.delay, 0.0) + (self.offset if p in self.broken else 0.0)
+			values[p] = {'value':inVal, 'altvalue':out}
+		return 0, values
+
+
+def test_liveValidate_passes_a_delayed_loopback(monkeypatch):
+	monkeypatch.setattr(lv, 'swb', FakeClient(delay=3))
+	aborted = []
+	live = lv.liveValidate([('In.a', 'Out.a'), ('In.b', 'Out.b')], 0.5, 0.1, interval=0.005, abort=lambda: aborted.append(1))
+	assert not live['aborted'] and not aborted
+	assert live['failed'] == []
+	assert all(r['passed'] and r['live'] for r in live['results'])
+	assert live['ticks'] > 5
+
+
+def test_liveValidate_aborts_on_persistent_violation(monkeypatch):
+	client = FakeClient(offset=10.0, broken=('In.b',))
+	monkeypatch.setattr(lv, 'swb', client)
+	aborted = []
+	start = time.time()
+	live = lv.liveValidate([('In.a', 'Out.a'), ('In.b', 'Out.b')], 0.5, 10.0, interval=0.001, persist=4,
+						   abort=lambda: aborted.append(1))
+	assert time.time() - start < 1.0		#ends long before the 10 s capture
+	assert live['aborted']
+	assert aborted == [1]
+	assert live['failed'] == [('In.b', 'Out.b')]
+	assert live['ticks'] == 4
+	good, bad = live['results']
+	assert good['passed'] and good['violations'] == 0
+	assert not bad['passed'] and bad['violations'] == 4 and bad['max'] == 10.0
+
+
+def test_liveValidate_reads_groups_in_sequence(monkeypatch):
+	client = FakeClient()
+	monkeypatch.setattr(lv, 'swb', client)
+	pairs = [('In.%d' %k, 'Out.%d' %k) for k in range(5)]
+	live = lv.liveValidate(pairs, 0.5, 0.02, interval=0.005, batch=2)
+	assert client.reads == 3*live['ticks']		#three groups of at most two pairs per tick
@@ -0,0 +1,53 @@
+import pointGen as pg
+
+
+def test_layoutOffsets_schemes():
+	sizes = [1, 8, 2, 4]
+	assert pg.layoutOffsets(sizes) == ([0, 1, 9, 11], 15)
+	assert pg.layoutOffsets(sizes, 'aligned') == ([0, 8, 16, 20], 24)
+	assert pg.layoutOffsets(sizes, 16) == ([0, 16, 32, 48], 52)
+	assert pg.layoutOffsets([]) == ([], 0)
+
+
+def test_generatePoints_names_and_messages():
+	layout = pg.generatePoints(5, types=[('double', 'double'), ('int', 'short')], pointsPerMsg=2, ports=(7, 700))
+	assert layout['pairs'] == [('In.point1', 'Out.point2', 'double'), ('In.point3', 'Out.point4', 'int'),
+							   ('In.point5', 'Out.point6', 'double'), ('In.point7', 'Out.point8', 'int'),
+							   ('In.point9', 'Out.point10', 'double')]
+	assert len(layout['points']) == 10 and len(layout['iorecs']) == 10
+	msgs = [m.decode() for m in layout['msgs']]
+	assert [m.split(',')[0] for m in msgs] == ['name=in1', 'name=out1', 'name=in2', 'name=out2', 'name=in3', 'name=out3']
+	assert 'messagelength=20,srcport=7,destip=127.0.0.1,destport=700' in msgs[0]		#8+2 bytes of payload + MSG_PAD
+	assert 'srcport=700,destip=127.0.0.1,destport=7' in msgs[1]
+	assert 'messagelength=18' in msgs[4]		#the last message holds one pair
+
+
+def test_generatePoints_maps_pairs_into_their_message():
+	layout = pg.generatePoints(3, types=[('double', 'double'), ('int', 'short'), ('float', 'float')], pointsPerMsg=3)
+	maps = dict((layout['points'][p]['mappingrecords'], p) for p in layout['points'])
+	starts = dict((maps[name], (m['message'], int(m['startbyte']), m['rawtype'])) for name, m in layout['iorecs'].items())
+	assert starts['In.point1'] == ('in1', 0, 'double')
+	assert starts['In.point3'] == ('in1', 8, 'short')
+	assert starts['In.point5'] == ('in1', 10, 'float')
+	assert starts['Out.point6'] == ('out1', 10, 'float')
+	assert layout['points']['In.point3']['metaflags'] == '0x8' and layout['points']['In.point3']['pointtype'] == 'AI'
+	assert layout['points']['Out.point6']['pointtype'] == 'AO'
+
+
+def test_generatePoints_string_length_on_the_in_side_only():
+	layout = pg.generatePoints(1, types=[('string', 'string')], strLength=5)
+	byPoint = dict((layout['points'][p]['mappingrecords'], p) for p in layout['points'])
+	lengths = dict((byPoint[name], m['stringlength']) for name, m in layout['iorecs'].items())
+	assert lengths == {'In.point1':'5', 'Out.point2':'0'}
+	assert layout['points']['In.point1']['pointtype'] == 'STRI'
+	assert b'messagelength=15' in layout['msgs'][0]
+
+
+def test_generatePoints_matches_the_hand_written_analog_layout():
+	import ValidateAnalog as va
+	import simwbConstants as swbC
+	layout = pg.generatePoints(2)
+	points, iorecs, msgs = va.analogConfig('double', 'double', swbC.RAWTYPE_double, 'tcp', '8')
+	assert layout['points'] == points
+	assert layout['iorecs'] == iorecs
+	assert layout['msgs'] == msgs
@@ -0,0 +1,93 @@
+import pytest
+
+import standInServer
+import connection
+import provision as pv
+import ValidateAnalog as va
+
+RTDB = 'prov_test'
+
+
+@pytest.fixture(scope='module')
+def host():
+	server, address, rpc = standInServer.startServer()
+	yield address
+	rpc.shutdown()
+
+
+@pytest.fixture
+def calls(host, monkeypatch):
+	'''
+	Connects to the stand-in and records the provisioning calls made to it.
+	'''
+	connection.connect(host, 'admin/nimda', 'Hardware-Tests')
+	pv.forget()
+	made = []
+	def recorder(name, fn):
+		def record(*args, **kwargs):
+			made.append((name, args, kwargs))
+			return fn(*args, **kwargs)
+		return record
+	for name in ('dbDelete', 'dbItemPut', 'putIOMappingRecords', 'putFileLines'):
+		monkeypatch.setattr(pv.swb, name, recorder(name, getattr(pv.swb, name)))
+	return made
+
+
+def config():
+	return va.analogConfig('double', 'double', 4, 'tcp', 0)
+
+
+def names(made):
+	return [name for name, args, kwargs in made]
+
+
+def test_second_provision_is_skipped_by_the_server_stamp(calls):
+	points, iorecs, msgs = config()
+	assert pv.provisionRTDB(RTDB, points, iorecs, msgs, scope='s', force=True) == 'created'
+	assert pv.serverStamp(RTDB) == '%s %s' %(pv.configHash(points, iorecs, msgs), pv.MSG_FILE)
+	del calls[:]
+	assert pv.provisionRTDB(RTDB, points, iorecs, msgs, scope='s') == 'unchanged'
+	assert calls == []
+	pv.forget()		#the client cache is not needed for the skip
+	assert pv.provisionRTDB(RTDB, points, iorecs, msgs, scope='s') == 'unchanged'
+
+
+def test_changed_points_are_updated_incrementally(calls):
+	points, iorecs, msgs = config()
+	pv.provisionRTDB(RTDB, points, iorecs, msgs, scope='s', force=True)
+	changed = dict(points)
+	name = sorted(changed)[0]
+	changed[name] = dict(changed[name], description='changed')
+	del calls[:]
+	assert pv.provisionRTDB(RTDB, changed, iorecs, msgs, scope='s') == 'updated'
+	assert 'dbDelete' not in names(calls)
+	puts = [args[0] for n, args, kwargs in calls if n=='dbItemPut']
+	assert puts == [{name:changed[name]}]		#only the changed point is uploaded
+	assert 'putIOMappingRecords' not in names(calls)
+
+
+def test_changed_messages_are_uploaded_alone(calls):
+	points, iorecs, msgs = config()
+	pv.provisionRTDB(RTDB, points, iorecs, msgs, scope='s', force=True)
+	del calls[:]
+	assert pv.provisionRTDB(RTDB, points, iorecs, msgs + [msgs[-1]], scope='s') == 'updated'
+	assert names(calls) == ['putFileLines', 'putFileLines', 'putFileLines']		#clear stamp, messages, new stamp
+
+
+def test_removed_points_rebuild(calls):
+	points, iorecs, msgs = config()
+	pv.provisionRTDB(RTDB, points, iorecs, msgs, scope='s', force=True)
+	fewer = dict(points)
+	fewer.pop(sorted(fewer)[0])
+	del calls[:]
+	assert pv.provisionRTDB(RTDB, fewer, iorecs, msgs, scope='s') == 'created'
+	assert 'dbDelete' in names(calls)
+
+
+def test_cached_configuration_is_not_trusted_without_the_stamp(calls):
+	points, iorecs, msgs = config()
+	pv.provisionRTDB(RTDB, points, iorecs, msgs, scope='s', force=True)
+	pv._putStamp(RTDB, '')		#e.g. the RTDB was reset on the server
+	del calls[:]
+	assert pv.provisionRTDB(RTDB, points, iorecs, msgs, scope='s') == 'created'
+	assert 'dbDelete' in names(calls)
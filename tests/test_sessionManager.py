@@ -0,0 +1,112 @@
+import time
+
+import sessionManager as sm
+
+
+class FakeClient(object):
+	'''
+	Test and session calls of the client, logged in order; sessionDelete takes pause seconds.
+	'''
+	def __init__(self, pause=0.0):
+		self.pause = pause
+		self.calls = []
+		self.tests = set()
+		self.sessions = set()
+		self.failDelete = set()
+
+	def testDelete(self, test):
+		self.calls.append(('testDelete', test))
+		self.tests.discard(test)
+		return 0
+
+	def testCreate(self, test, rtdb, desc, fixedstep=1000):
+		self.calls.append(('testCreate', test))
+		self.tests.add(test)
+		return 0
+
+	def sessionCreate(self, test, session, desc, schedType=3, noDataLogging=0):
+		self.calls.append(('sessionCreate', test, session))
+		if test not in self.tests or (test, session) in self.sessions: return -1
+		self.sessions.add((test, session))
+		return 0
+
+	def sessionStart(self, test, session):
+		self.calls.append(('sessionStart', test, session))
+		return 0
+
+	def sessionDelete(self, test, session):
+		time.sleep(self.pause)
+		self.calls.append(('sessionDelete', test, session))
+		if session in self.failDelete: raise RuntimeError('server went away')
+		self.sessions.discard((test, session))
+		return 0
+
+	def strerror(self, r):
+		return 'error %d' %r
+
+
+def install(monkeypatch, pause=0.0):
+	client = FakeClient(pause)
+	monkeypatch.setattr(sm, 'swb', client)
+	sm.forget()
+	return client
+
+
+def test_ensureTest_creates_a_test_once_per_definition(monkeypatch):
+	client = install(monkeypatch)
+	assert sm.ensureTest('t', 'db', scope='h/p') == 'created'
+	assert sm.ensureTest('t', 'db', scope='h/p') == 'unchanged'
+	assert sm.ensureTest('t', 'db', scope='h2/p') == 'created'		#another server
+	assert sm.ensureTest('t', 'db', fixedstep=500, scope='h/p') == 'created'
+	assert [c for c in client.calls if c[0]=='testCreate'] == [('testCreate', 't')]*3
+
+
+def test_sessions_reuse_the_test(monkeypatch):
+	client = install(monkeypatch)
+	sm.startSession('t', 's1', 'db', scope='h/p')
+	sm.startSession('t', 's2', 'db', scope='h/p')
+	assert client.calls == [('testDelete', 't'), ('testCreate', 't'),
+							('sessionCreate', 't', 's1'), ('sessionStart', 't', 's1'),
+							('sessionCreate', 't', 's2'), ('sessionStart', 't', 's2')]
+
+
+def test_startSession_repairs_a_test_deleted_on_the_server(monkeypatch):
+	client = install(monkeypatch)
+	sm.startSession('t', 's1', 'db', scope='h/p')
+	client.tests.clear()		#deleted behind the cache's back
+	del client.calls[:]
+	sm.startSession('t', 's2', 'db', scope='h/p')
+	assert ('testCreate', 't') in client.calls
+	assert client.calls[-1] == ('sessionStart', 't', 's2')
+
+
+def test_retire_deletes_in_the_background(monkeypatch):
+	client = install(monkeypatch, pause=0.1)
+	sm.startSession('t', 's1', 'db', scope='h/p')
+	start = time.time()
+	sm.retire('t', 's1')
+	assert time.time() - start < 0.05
+	sm.flush()
+	assert ('sessionDelete', 't', 's1') in client.calls
+	assert client.sessions == set()
+
+
+def test_rerun_of_a_retiring_session_waits_for_its_deletion(monkeypatch):
+	client = install(monkeypatch, pause=0.1)
+	sm.startSession('t', 's1', 'db', scope='h/p')
+	sm.retire('t', 's1')
+	sm.startSession('t', 's1', 'db', scope='h/p')
+	sessionCalls = [c for c in client.calls if c[0] in ('sessionDelete', 'sessionCreate')]
+	assert sessionCalls == [('sessionCreate', 't', 's1'), ('sessionDelete', 't', 's1'), ('sessionCreate', 't', 's1')]
+	sm.flush()
+
+
+def test_failed_deletion_does_not_stop_later_ones(monkeypatch):
+	client = install(monkeypatch)
+	for s in ('s1', 's2'):
+		sm.startSession('t', s, 'db', scope='h/p')
+	client.failDelete.add('s1')
+	sm.retire('t', 's1')
+	sm.retire('t', 's2')
+	sm.flush()
+	assert client.sessions == {('t', 's1')}
@@ -0,0 +1,51 @@
+import os
+import time
+
+import shardRunner as sr
+
+
+def fakeWorker(entry, tasks, results, force=False):
+	# speaks the worker protocol without a server; a 'dies' host exits holding its first task
+	host = entry['host']
+	if entry.get('down'):
+		time.sleep(0.3)		#reported after the other hosts are done
+		results.put(('down', host, 'connection refused'))
+		return
+	results.put(('ready', host))
+	while True:
+		task = tasks.get()
+		if task is None: break
+		index, work = task
+		if entry.get('dies'):
+			time.sleep(0.2)		#the others are busy or done by now
+			os._exit(3)
+		time.sleep(entry.get('delay', 0.0))
+		results.put(('done', host, index, {'item':work, 'time':entry.get('delay', 0.0)}))
+
+
+def entries(*hosts):
+	return [dict({'host':h, 'dl':h, 'login':'admin/nimda', 'project':'p'}, **options) for h, options in hosts]
+
+
+def test_task_of_a_dead_host_is_requeued(monkeypatch):
+	monkeypatch.setattr(sr, 'POLL', 0.05)
+	work = [('suite', 'w%d' %k) for k in range(6)]
+	results, hosts = sr.runSharded(entries(('a', {'dies':True}), ('b', {'delay':0.1})), work, target=fakeWorker)
+	assert [out['item'] for host, out in results] == work
+	assert all(host=='b' for host, out in results)
+	assert hosts['a']['error'] == 'worker exited with code 3' and hosts['a']['tasks'] == 0
+	assert hosts['b']['tasks'] == 6 and hosts['b']['error'] is None
+
+
+def test_hosts_that_cannot_connect_leave_work_to_the_others(monkeypatch):
+	monkeypatch.setattr(sr, 'POLL', 0.05)
+	work = [('suite', 'w%d' %k) for k in range(3)]
+	results, hosts = sr.runSharded(entries(('a', {'down':True}), ('b', {})), work, target=fakeWorker)
+	assert [host for host, out in results] == ['b']*3
+	assert hosts['a']['error'] == 'connection refused'
+
+
+def test_items_fail_when_every_host_is_gone(monkeypatch):
+	monkeypatch.setattr(sr, 'POLL', 0.05)
+	results, hosts = sr.runSharded(entries(('a', {'dies':True})), [('suite', 'w0'), ('suite', 'w1')], target=fakeWorker)
+	assert results == [(None, {'error':'no host left to run it'})]*2
@@ -0,0 +1,57 @@
+import pytest
+
+import standInServer
+
+
+@pytest.fixture(scope='module')
+def host():
+	'''
+	Stand-in server shared by the end-to-end tests of this module.
+	'''
+	server, address, rpc = standInServer.startServer()
+	yield address
+	rpc.shutdown()
+
+
+def test_analogCell(host, monkeypatch):
+	import ValidateAnalog as va
+	import testMatrix as tm
+	import connection
+	monkeypatch.setattr(va, 'HOST', host)
+	monkeypatch.setattr(va, 'CAPTURE', 1)
+	connection.connect(host, va.LOGIN, va.PROJECT)
+	cell = tm.buildCells('e2e_analog', ['double'], ['double'], ['tcp'])[0]
+	out = tm.runCell(va.runAnalogCell, cell)
+	assert out['error'] is None
+	assert tm.cellPassed(out)
+	for result in out['result']:
+		assert result['samples'] > 500
+		assert result['reference']['in']['passed'] and result['reference']['out']['passed']
+		assert result['timing']['in']['passed'] and result['timing']['out']['passed']
+
+
+def test_analogCellChunked(host, monkeypatch):
+	import ValidateAnalog as va
+	import testMatrix as tm
+	import connection
+	monkeypatch.setattr(va, 'HOST', host)
+	monkeypatch.setattr(va, 'CAPTURE', 1)
+	monkeypatch.setattr(va, 'CHUNK', 256)
+	connection.connect(host, va.LOGIN, va.PROJECT)
+	cell = tm.buildCells('e2e_chunked', ['int'], ['int'], ['udp'])[0]
+	out = tm.runCell(va.runAnalogCell, cell)
+	assert out['error'] is None
+	assert tm.cellPassed(out)
+	assert all(result['samples'] > 500 for result in out['result'])
+
+
+def test_stringSuite(host):
+	import ValidateString as vs
+	assert vs.run(host)
+
+
+def test_runSuites_reads_the_data_log_of_the_given_host(host):
+	import runSuites
+	results = runSuites.runSuites(['demo'], host, 'admin/nimda', 'Hardware-Tests')
+	assert results[0]['error'] is None
+	assert results[0]['passed']
@@ -0,0 +1,82 @@
+import io
+import json
+import types
+
+import pytest
+
+import swbTrace
+
+
+@pytest.fixture
+def client():
+	'''
+	Client module stand-in with a succeeding, a failing and an untraced function; tracing is undone afterwards.
+	'''
+	module = types.ModuleType('fakeClient')
+	module.getItemValues = lambda points: (0, dict((p, {'value':0}) for p in points))
+	module.sessionStart = lambda test, session: -3
+	module.strerror = lambda r: 'error %d' %r
+	swbTrace.reset()
+	yield module
+	swbTrace.disable(module)
+	swbTrace.reset()
+
+
+def test_counts_and_errors_per_function(client):
+	swbTrace.enable(client)
+	for k in range(3):
+		client.getItemValues(['In.a', 'In.b'])
+	client.sessionStart('t', 's')
+	client.strerror(-3)
+	assert swbTrace.counts() == {'fakeClient.getItemValues':3, 'fakeClient.sessionStart':1}
+	assert swbTrace.stats['fakeClient.sessionStart']['errors'] == 1
+	assert swbTrace.stats['fakeClient.getItemValues']['errors'] == 0
+	assert sum(swbTrace.stats['fakeClient.getItemValues']['hist']) == 3
+
+
+def test_enable_twice_traces_once_and_disable_restores(client):
+	original = client.getItemValues
+	swbTrace.enable(client)
+	swbTrace.enable(client)
+	client.getItemValues(['In.a'])
+	assert swbTrace.counts() == {'fakeClient.getItemValues':1}
+	swbTrace.disable(client)
+	assert client.getItemValues is original
+	client.getItemValues(['In.a'])
+	assert swbTrace.counts() == {'fakeClient.getItemValues':1}
+
+
+def test_statistics_without_timeline(client):
+	swbTrace.enable(client, timeline=False)
+	client.getItemValues(['In.a'])
+	assert swbTrace.counts() == {'fakeClient.getItemValues':1}
+	assert swbTrace.events == []
+
+
+def test_chrome_trace_dump(client, tmp_path):
+	swbTrace.enable(client)
+	client.getItemValues(['In.a', 'In.b'])
+	client.sessionStart('t', 's')
+	path = str(tmp_path/'trace.json')
+	swbTrace.dumpChromeTrace(path)
+	with open(path) as f:
+		trace = json.load(f)
+	names = [e['name'] for e in trace['traceEvents']]
+	assert names == ['fakeClient.getItemValues', 'fakeClient.sessionStart']
+	first, second = trace['traceEvents']
+	assert first['ph'] == 'X' and first['cat'] == 'fakeClient'
+	assert first['args'] == {'args':'list[2]', 'rc':0}
+	assert second['args'] == {'args':"'t', 's'", 'rc':-3}
+	assert second['ts'] >= first['ts'] + first['dur']
+	assert trace['otherData']['stats']['fakeClient.sessionStart']['errors'] == 1
+
+
+def test_report_lists_every_function(client):
+	swbTrace.enable(client)
+	client.getItemValues(['In.a'])
+	client.sessionStart('t', 's')
+	out = io.StringIO()
+	swbTrace.report(out)
+	lines = out.getvalue().splitlines()
+	assert len(lines) == 3
+	assert sorted(line.split()[0] for line in lines[1:]) == ['fakeClient.getItemValues', 'fakeClient.sessionStart']
@@ -0,0 +1,76 @@
+import time
+import threading
+
+import pytest
+
+import testMatrix as tm
+import resultCache as rc
+
+
+def cells(name):
+	return tm.buildCells(name, ['int', 'float', 'double'], ['int', 'float', 'double'], ['tcp', 'udp'])
+
+
+class Pipeline(object):
+	'''
+	start/finish pair that records the order of the halves and how many cells are started but not finished.
+	'''
+	def __init__(self, pause=0.0, failStart=(), failFinish=()):
+		self.pause = pause
+		self.failStart = failStart
+		self.failFinish = failFinish
+		self.lock = threading.Lock()
+		self.events = []
+		self.open = 0
+		self.most = 0
+
+	def start(self, cell):
+		if cell.index in self.failStart: raise SystemExit('start of %d failed' %cell.index)
+		with self.lock:
+			self.events.append(('start', cell.index, threading.current_thread().name))
+			self.open += 1
+			self.most = max(self.most, self.open)
+		return cell.index
+
+	def finish(self, index):
+		time.sleep(self.pause)
+		with self.lock:
+			self.events.append(('finish', index, threading.current_thread().name))
+			self.open -= 1
+		if index in self.failFinish: raise SystemExit('finish of %d failed' %index)
+		return [{'passed':True, 'index':index}]
+
+
+def test_runPipeline_keeps_cell_order_and_overlaps_the_halves():
+	p = Pipeline(pause=0.01)
+	results = tm.runPipeline(cells('pipe_order'), p.start, p.finish)
+	assert [out['result'][0]['index'] for out in results] == list(range(6))
+	assert all(tm.cellPassed(out) and not out['cached'] for out in results)
+	assert [i for kind, i, thread in p.events if kind=='finish'] == list(range(6))		#finished in start order
+	main = threading.current_thread().name
+	assert all((thread==main) == (kind=='start') for kind, i, thread in p.events)
+
+
+@pytest.mark.parametrize('depth', [1, 2, 3])
+def test_runPipeline_bounds_cells_in_flight(depth):
+	p = Pipeline(pause=0.02)
+	tm.runPipeline(cells('pipe_depth_%d' %depth), p.start, p.finish, depth)
+	assert p.most == depth + 1		#depth queued plus the one being finished
+
+
+def test_runPipeline_records_failures_and_goes_on():
+	p = Pipeline(failStart=(1,), failFinish=(3,))
+	results = tm.runPipeline(cells('pipe_fail'), p.start, p.finish)
+	assert [tm.cellPassed(out) for out in results] == [True, False, True, False, True, True]
+	assert results[1]['error'] == 'start of 1 failed'
+	assert results[3]['error'] == 'finish of 3 failed'
+
+
+def test_runPipeline_skips_cells_that_passed_before():
+	keyOf = lambda cell: rc.cellKey('pipe_cache', {'cvtType':cell.cvtType, 'protocol':cell.protocol})
+	p = Pipeline(failFinish=(2,))
+	tm.runPipeline(cells('pipe_cache'), p.start, p.finish, keyOf=keyOf)
+	p = Pipeline()
+	results = tm.runPipeline(cells('pipe_cache'), p.start, p.finish, keyOf=keyOf)
+	assert [out['cached'] for out in results] == [True, True, False, True, True, True]		#only the failed cell runs again
+	assert [i for kind, i, thread in p.events if kind=='start'] == [2]
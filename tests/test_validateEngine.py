@@ -0,0 +1,242 @@
+import numpy as np
+import pytest
+
+import validateEngine as ve
+
+
+STEP = 1000000		#1 ms in ns
+
+
+def ramp(n, step=STEP, start=0):
+	return start + step*np.arange(n, dtype=np.int64)
+
+
+# ---- ALIGNMENT ----
+
+def test_alignRecords_pairs_by_timestamp_not_position():
+	tIn = ramp(5)
+	tOut = tIn[::-1].copy()
+	iIn, iOut = ve.alignRecords(tIn, tOut)
+	assert list(iIn) == [0, 1, 2, 3, 4]
+	assert list(tOut[iOut]) == list(tIn)
+
+
+def test_alignRecords_drops_pairs_beyond_skew():
+	tIn = ramp(3)
+	tOut = tIn + np.array([0, 400, 2000])
+	iIn, iOut = ve.alignRecords(tIn, tOut, maxSkew=500)
+	assert list(iIn) == [0, 1]
+	assert list(iOut) == [0, 1]
+
+
+def test_alignRecords_uses_every_out_sample_once():
+	tIn = np.array([0, 90, 100], dtype=np.int64)
+	tOut = np.array([100], dtype=np.int64)
+	iIn, iOut = ve.alignRecords(tIn, tOut, maxSkew=100)
+	assert list(iIn) == [2]		#the closest IN sample wins
+	assert list(iOut) == [0]
+
+
+def test_alignRecords_empty():
+	iIn, iOut = ve.alignRecords([], ramp(3))
+	assert iIn.size == 0 and iOut.size == 0
+
+
+# ---- COMPARISON ----
+
+def test_compareRecords_identical():
+	t = ramp(100)
+	vals = np.sin(np.arange(100)/10.)
+	r = ve.compareRecords(t, vals, t, vals, 0.1)
+	assert r['passed']
+	assert r['samples'] == 100
+	assert r['unmatchedIn'] == 0 and r['unmatchedOut'] == 0
+	assert r['max'] == 0.0 and r['violations'] == 0
+	assert sorted(r['percentiles']) == ['p50', 'p95', 'p99']
+
+
+def test_compareRecords_reports_worst_violation():
+	t = ramp(10)
+	vals = np.zeros(10)
+	out = vals.copy()
+	out[3] = 5.0
+	out[7] = 2.0
+	r = ve.compareRecords(t, vals, t, out, 3)
+	assert not r['passed']
+	assert r['violations'] == 1
+	assert r['max'] == 5.0
+	assert r['worstIndex'] == 3
+	assert r['worstTime'] == pytest.approx(t[3]/1e9)
+	assert r['mean'] == pytest.approx(0.7)
+
+
+def test_compareRecords_lag_removes_delay():
+	t = ramp(200)
+	out = np.arange(200, dtype=np.float64)
+	vals = np.concatenate([[0, 0, 0], out[:-3]])		#IN shows OUT three samples later
+	assert not ve.compareRecords(t, vals, t, out, 0.5)['passed']
+	r = ve.compareRecords(t, vals, t, out, 0.5, lag=3)
+	assert r['passed']
+	assert r['samples'] == 197
+
+
+def test_compareRecords_without_overlap():
+	r = ve.compareRecords(ramp(5), np.zeros(5), ramp(5, start=10**12), np.zeros(5), 1)
+	assert r['samples'] == 0
+	assert not r['passed']
+	assert 'no time-aligned samples' in ve.formatResult(r)
+
+
+@pytest.mark.parametrize('lag, maxSkew', [(0, 0), (2, 0), (-2, 0), (0, 500)])
+def test_compareChunked_matches_compareRecords(lag, maxSkew):
+	rng = np.random.RandomState(1)
+	tOut = ramp(5000)
+	tIn = tOut + rng.randint(-200, 200, tOut.size)
+	vals = 100*np.sin(tOut/1e8)
+	out = vals + rng.normal(0, 1, vals.size)
+	whole = ve.compareRecords(tIn, vals, tOut, out, 3, maxSkew=maxSkew, lag=lag)
+	chunked = ve.compareChunked(tIn, vals, tOut, out, 3, chunk=700, maxSkew=maxSkew, lag=lag)
+	for key in ('samples', 'unmatchedIn', 'unmatchedOut', 'violations', 'worstIndex', 'worstTime', 'passed'):
+		assert chunked[key] == whole[key], key
+	assert chunked['max'] == pytest.approx(whole['max'])
+	assert chunked['mean'] == pytest.approx(whole['mean'])
+
+
+# ---- PROPAGATION DELAY ----
+
+def test_estimateDelay_finds_shift():
+	t = ramp(4000)
+	out = np.sin(2*np.pi*t/1e9)
+	vals = np.sin(2*np.pi*(t - 5*STEP)/1e9)		#IN lags OUT by 5 ms
+	est = ve.estimateDelay(t, vals, t, out)
+	assert est['delay'] == pytest.approx(0.005, abs=1e-6)
+	assert est['lag'] == 5
+	assert est['step'] == pytest.approx(0.001)
+	assert est['jitter'] == pytest.approx(0.0, abs=1e-6)
+	assert est['correlation'] > 0.99
+
+
+def test_estimateDelay_too_few_samples():
+	est = ve.estimateDelay(ramp(3), np.zeros(3), ramp(3), np.zeros(3))
+	assert np.isnan(est['delay'])
+	assert est['lag'] == 0
+
+
+# ---- GENERATOR REFERENCE ----
+
+SPEC = ve.generatorSpec('sine', 1, 30, 0, 0, 100, 0, 30)
+
+
+def logged(spec, latency, n=3000, start=0.05):
+	'''
+	Timestamps (ns) and values of a series logged once per STEP, showing spec latency seconds late.
+	'''
+	t = ramp(n)
+	s = t/1e9 - start - latency
+	vals = np.where(s > 0, ve.synthesize(spec, np.maximum(s, 0)), spec['offset'])
+	return t, vals
+
+
+def test_timeTolerance_is_step_plus_jitter():
+	assert ve.timeTolerance(0.001) == 0.001
+	assert ve.timeTolerance(0.001, 0.0005) == pytest.approx(0.0015)
+	assert ve.timeTolerance(0.001, float('nan')) == 0.001
+
+
+def test_typeTolerance():
+	assert ve.typeTolerance('int') == 1.0
+	assert ve.typeTolerance('double') == ve.FLOAT_EPS['double']
+	spec = ve.generatorSpec('sine', 1, 30, 0, 100, 100, 0, 30)
+	scale = 200.0
+	slope = 2*np.pi*100
+	assert ve.signalSlope(spec) == pytest.approx(slope)
+	assert ve.typeTolerance('float', 'double', spec) == pytest.approx(ve.FLOAT_EPS['float']*scale)
+	assert ve.typeTolerance('float', 'double', spec, 0.001) == pytest.approx(ve.FLOAT_EPS['float']*scale + slope*0.001)
+	assert ve.typeTolerance('double', 'short', spec) == 1.0		#the integer cvt type dominates
+
+
+@pytest.mark.parametrize('latency', [0.0, 0.02, 0.1])
+def test_compareReference_fits_the_delay(latency):
+	t, vals = logged(SPEC, latency)
+	tol = ve.typeTolerance('double', 'double', SPEC, ve.timeTolerance(0.001))
+	assert tol < 1		#one step of a 1 Hz sine of amplitude 100, independent of the latency
+	r = ve.compareReference(t, vals, SPEC, tol, 'double')
+	assert r['passed']
+	assert r['max'] < 1e-6
+	assert r['start'] == pytest.approx(1e9*(0.05 + latency), abs=1e3)
+
+
+@pytest.mark.parametrize('latency', [0.02, 0.1])
+@pytest.mark.parametrize('wrong', [{'amplitude':110}, {'amplitude':95}, {'frequency':1.05}])
+def test_compareReference_fails_distorted_waveform(latency, wrong):
+	actual = dict(SPEC, **wrong)
+	t, vals = logged(actual, latency)
+	tol = ve.typeTolerance('double', 'double', SPEC, ve.timeTolerance(0.001))
+	r = ve.compareReference(t, vals, SPEC, tol, 'double')
+	assert not r['passed']
+	assert r['violations'] > 0
+
+
+def test_compareReference_integer_truncation():
+	t, vals = logged(SPEC, 0.02)
+	vals = np.trunc(vals)
+	tol = ve.typeTolerance('int', 'int', SPEC, ve.timeTolerance(0.001))
+	assert ve.compareReference(t, vals, SPEC, tol, 'int')['passed']
+
+
+# ---- TIMING INTEGRITY ----
+
+def test_timingStats_clean_log():
+	stats = ve.timingStats(np.arange(1000), ramp(1000), STEP)
+	assert stats['passed']
+	assert stats['records'] == 1000
+	assert stats['missing'] == 0 and stats['gaps'] == 0 and stats['reordered'] == 0
+	assert stats['drift'] == pytest.approx(0.0)
+	assert stats['jitter']['max'] == pytest.approx(0.0)
+	assert sorted(stats['jitter']) == ['max', 'p50', 'p99', 'p99.9']
+
+
+def test_timingStats_missing_record_and_gap():
+	recNum = np.delete(np.arange(100), 40)
+	t = np.delete(ramp(100), 40)
+	stats = ve.timingStats(recNum, t, STEP)
+	assert not stats['passed']
+	assert stats['missing'] == 1
+	assert stats['gaps'] == 1
+	assert stats['longestGap'] == pytest.approx(0.002)
+	assert stats['drift'] == pytest.approx(0.0)
+
+
+def test_timingStats_drift_and_reorder():
+	slow = ve.timingStats(np.arange(1000), ramp(1000, step=STEP+1000), STEP)
+	assert slow['drift'] == pytest.approx(1e-3)
+	assert slow['gaps'] == 0 and not slow['passed']
+	t = ramp(10)
+	t[5] = t[4]
+	assert ve.timingStats(np.arange(10), t, STEP)['reordered'] == 1
+
+
+# ---- DELIVERY ----
+
+def test_deliveryStats_counts_drops_and_latency():
+	tOut = ramp(100)
+	valsOut = np.arange(100, dtype=np.float64)		#a ramp never repeats a value
+	tIn = ramp(100)
+	valsIn = np.zeros(100)
+	for k in range(0, 96, 2):		#every second OUT update arrives, 3 ms later
+		valsIn[k+3:] = valsOut[k]
+	stats = ve.deliveryStats(tIn, valsIn, tOut, valsOut)
+	assert stats['offered'] == 99		#the first OUT value is not an update
+	assert stats['delivered'] == 47
+	assert stats['unmatched'] == 0
+	assert stats['latency']['p50'] == pytest.approx(0.003)
+	assert stats['latency']['max'] == pytest.approx(0.003)
+	assert stats['dropRate'] == pytest.approx(1 - 47/99.)
+
+
+def test_deliveryStats_rate_caps_offered():
+	tOut = ramp(100)
+	vals = np.arange(100, dtype=np.float64)
+	stats = ve.deliveryStats(tOut, vals, tOut, vals, rate=100)
+	assert stats['offered'] == int(100*stats['span'])
+	assert stats['latency']['max'] == 0.0
@@ -0,0 +1,258 @@
+from __future__ import print_function
+import sys
+import os
+import time
+import json
+import argparse
+
+if __name__=='__main__' and '--standin' in sys.argv:
+	sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'standin'))
+
+import validateEngine as ve
+import dlReader as dlr
+import pointGen as pg
+import waits
+import sessionManager as sm
+import swbTrace
+import connection
+import jsonCache
+
+try:
+	import simwbClient as swb
+	import simwbConstants as swbC
+	import simwbDLClient as dl
+except:
+    sys.exit('Import failed')
+
+swbTrace.enableFromEnv(swb, dl)	#set SIMWB_TRACE=<file.json> to trace every client call
+
+
+# ---- DEFINE INPUT ----
+
+PROJECT = 'Hardware-Tests'
+HOST = 'localhost'
+DL_HOST = None		#data log server of HOST (HOST if None)
+LOGIN = 'admin/nimda'
+TEST = 'throughput'
+RTDB = 'throughput_val'
+
+PROTOCOLS = ['tcp', 'udp']
+COUNTS = [1, 4, 16, 64]			#NET-IO messages per setting, one double IN/OUT pair each
+LENGTHS = [18, 256, 1024]		#messagelength in bytes
+RATES = [10, 100, 1000]			#samplingrate of every message
+CAPTURE = 2.0		#seconds of ramp data logged per setting
+MAX_DROP = 0.01		#a setting saturates the loopback when it loses more than this fraction of offered samples ...
+MAX_LATENCY = 0.05	#... or when its p99 latency exceeds this many seconds
+RAMP = 1e6			#ramp amplitude; large enough that every frame carries a new value
+
+
+# ---- SETTINGS ----
+
+class Setting(object):
+	'''
+	One point of the throughput sweep.
+	Attributes:
+		protocol		either 'tcp' or 'udp'
+		count			number of OUT messages, each looped back into its own IN message
+		length			messagelength in bytes
+		rate			samplingrate of every message
+	'''
+	def __init__(self, protocol, count, length, rate):
+		self.protocol = protocol
+		self.count = count
+		self.length = length
+		self.rate = rate
+
+	@property
+	def session(self):
+		return 'tput_%s_%dx%d_%g' %(self.protocol, self.count, self.length, self.rate)
+
+	@property
+	def offeredLoad(self):
+		'''
+		Bytes per second the OUT messages are sent at.
+		'''
+		return self.count*self.length*self.rate
+
+	def __repr__(self):
+		return 'Setting(%s, %d x %d B at %g Hz)' %(self.protocol, self.count, self.length, self.rate)
+
+
+def buildSettings(protocols=PROTOCOLS, counts=COUNTS, lengths=LENGTHS, rates=RATES):
+	'''
+	Settings of the sweep grouped into series: per protocol, rate and length, the message count rises.
+	Return:
+		series			list of lists of Setting, every list in ascending message count
+	'''
+	return [[Setting(protocol, count, length, rate) for count in sorted(counts)]
+			for protocol in protocols for rate in rates for length in lengths]
+
+
+# ---- RUN ONE SETTING ----
+
+def rampFrequency(capture):
+	'''
+	Ramp frequency whose rising half-period outlasts the capture, so OUT never repeats a value.
+	'''
+	return 1.0/(2*(capture+2))
+
+
+def runSetting(setting, capture=CAPTURE):
+	'''
+	Provisions the messages of a setting, drives every OUT point with a slow ramp and measures from the
+	data log how many samples reach the IN points and how late.
+	Input:
+		setting			Setting to run
+		capture			seconds of data logged
+	Return:
+		result			dict with keys setting (dict), offeredLoad (bytes/s), offered and delivered (samples),
+						deliveredRate (samples/s), deliveredLoad (bytes/s), dropRate, unmatched, latency (dict, s),
+						pairs (deliveryStats of every pair) and time (s)
+	'''
+	begin = time.time()
+	layout = pg.createBulkPoints(RTDB, setting.count, scope=HOST+'/'+PROJECT, types=[('double','double')], pointsPerMsg=1,
+								 protocol=setting.protocol, samplingRate=setting.rate, msgLength=setting.length)
+	pairs = [(point_in, point_out) for point_in, point_out, cvtType in layout['pairs']]
+
+	sm.startSession(TEST, setting.session, RTDB, 'Throughput session', schedType=3, scope=HOST+'/'+PROJECT)
+	if not waits.waitForItems(list(layout['points']), label='session start'):
+		swb.sessionStop(swbC.SCHED_USERABORT)
+		sys.exit('Session start failed: points not readable after %0.1f s' %waits.TIMEOUT)
+
+	start = time.time()
+	for point_in, point_out in pairs:
+		gen = swb.addGenerator(point_out, swbC.GEN_SIGGENEND_DURATION, swbC.SIG_TYPE_RAMP, rampFrequency(capture), 1, 0, 0, RAMP, 0, capture+1)
+		if gen < 0: sys.exit('Signal generator failed: %s' %swb.strerror(gen))
+	r = swb.startAllGenerators()
+	if r < 0: sys.exit('Signal generator failed: %s' %swb.strerror(r))
+	waits.hold(capture, start)
+	swb.sessionStop()
+
+	with dlr.lock:
+		s = dlr.getSession(DL_HOST or HOST, PROJECT, TEST+'/'+setting.session)
+		records = dlr.readPoints([p for pair in pairs for p in pair], session=s)
+	stats = [ve.deliveryStats(records[point_in].t, records[point_in].cvt, records[point_out].t, records[point_out].alt, setting.rate)
+			 for point_in, point_out in pairs]
+	sm.retire(TEST, setting.session)
+	dlr.invalidate(TEST+'/'+setting.session)
+
+	offered = sum(st['offered'] for st in stats)
+	delivered = sum(st['delivered'] for st in stats)
+	deliveredRate = sum(st['deliveredRate'] for st in stats)
+	return {'setting':dict(vars(setting)), 'offeredLoad':setting.offeredLoad, 'offered':offered, 'delivered':delivered,
+			'deliveredRate':deliveredRate, 'deliveredLoad':deliveredRate*setting.length,
+			'dropRate':max(0.0, 1.0 - float(delivered)/offered) if offered else 1.0,
+			'unmatched':sum(st['unmatched'] for st in stats),
+			'latency':{'p50':max(st['latency']['p50'] for st in stats), 'p99':max(st['latency']['p99'] for st in stats),
+					   'max':max(st['latency']['max'] for st in stats)},
+			'pairs':stats, 'time':time.time()-begin}
+
+
+def saturated(result, maxDrop=MAX_DROP, maxLatency=MAX_LATENCY):
+	'''
+	True if a setting lost more than maxDrop of its samples, was late by more than maxLatency (p99)
+	or delivered nothing at all.
+	'''
+	p99 = result['latency']['p99']
+	return result['delivered']==0 or result['dropRate'] > maxDrop or not p99 <= maxLatency
+
+
+# ---- SWEEP ----
+
+def runSweep(series, capture=CAPTURE, maxDrop=MAX_DROP, maxLatency=MAX_LATENCY, full=False):
+	'''
+	Runs every series of settings. Within a series the message count rises, and the larger counts are
+	skipped once one setting saturates the loopback unless full is set.
+	Input:
+		series			list of lists of Setting (see buildSettings)
+		capture			seconds of data logged per setting
+		maxDrop			drop rate above which a setting saturates
+		maxLatency		p99 latency (s) above which a setting saturates
+		full			run every setting, even beyond the saturation point
+	Return:
+		sweep			list of dicts, one per series, with keys protocol, length, rate, results (runSetting results
+						with saturated added), held (last Setting that did not saturate, as a dict, or None)
+						and saturation (first Setting that saturated, as a dict, or None)
+	'''
+	sweep = []
+	for settings in series:
+		first = settings[0]
+		entry = {'protocol':first.protocol, 'length':first.length, 'rate':first.rate, 'results':[], 'held':None, 'saturation':None}
+		for setting in settings:
+			result = runSetting(setting, capture)
+			result['saturated'] = saturated(result, maxDrop, maxLatency)
+			entry['results'].append(result)
+			if result['saturated']:
+				if entry['saturation'] is None: entry['saturation'] = result['setting']
+				if not full: break
+			elif entry['saturation'] is None:
+				entry['held'] = result['setting']
+		sweep.append(entry)
+	return sweep
+
+
+def printSweep(sweep):
+	print('%-5s %6s %6s %5s %12s %12s %12s %7s %9s %9s' %('proto', 'msgs', 'bytes', 'Hz', 'offered B/s', 'deliv. B/s',
+														  'samples/s', 'drop', 'p50 ms', 'p99 ms'))
+	for entry in sweep:
+		for r in entry['results']:
+			st = r['setting']
+			print('%-5s %6d %6d %5g %12.0f %12.0f %12.1f %6.1f%% %9.2f %9.2f%s' %(st['protocol'], st['count'], st['length'], st['rate'],
+				  r['offeredLoad'], r['deliveredLoad'], r['deliveredRate'], 100*r['dropRate'], 1e3*r['latency']['p50'],
+				  1e3*r['latency']['p99'], '  SATURATED' if r['saturated'] else ''))
+	print('')
+	for entry in sweep:
+		held, sat = entry['held'], entry['saturation']
+		label = '%s %d B at %g Hz:' %(entry['protocol'], entry['length'], entry['rate'])
+		if sat is None:
+			print('%-24s no saturation up to %d messages' %(label, held['count']))
+		elif held is None:
+			print('%-24s saturated already at %d messages' %(label, sat['count']))
+		else:
+			print('%-24s holds %d messages (%0.0f B/s), saturates at %d messages (%0.0f B/s offered)' %(label, held['count'],
+				  held['count']*held['length']*held['rate'], sat['count'], sat['count']*sat['length']*sat['rate']))
+
+
+def intList(text):
+	return [int(v) for v in text.split(',')]
+
+
+def main(argv=None):
+	global HOST, DL_HOST, LOGIN, PROJECT
+	parser = argparse.ArgumentParser(description='NET-IO loopback throughput sweep over message count, length and sampling rate')
+	parser.add_argument('--host', default=HOST)
+	parser.add_argument('--dl-host', dest='dlHost', default=DL_HOST, help='data log server (default: the --host)')
+	parser.add_argument('--login', default=LOGIN)
+	parser.add_argument('--project', default=PROJECT)
+	parser.add_argument('--protocols', default=','.join(PROTOCOLS))
+	parser.add_argument('--counts', type=intList, default=COUNTS, help='comma separated message counts')
+	parser.add_argument('--lengths', type=intList, default=LENGTHS, help='comma separated message lengths in bytes')
+	parser.add_argument('--rates', type=intList, default=RATES, help='comma separated sampling rates')
+	parser.add_argument('--capture', type=float, default=CAPTURE, help='seconds of data logged per setting')
+	parser.add_argument('--max-drop', dest='maxDrop', type=float, default=MAX_DROP, help='drop rate that saturates a setting')
+	parser.add_argument('--max-latency', dest='maxLatency', type=float, default=MAX_LATENCY, help='p99 latency (s) that saturates a setting')
+	parser.add_argument('--full', action='store_true', help='keep raising the message count after a setting saturated')
+	parser.add_argument('--output', default=None, help='write JSON results to this file')
+	parser.add_argument('--standin', action='store_true', help='run against an in-process stand-in server')
+	parser.add_argument('--frame-rate', dest='frameRate', type=float, default=1000.0, help='stand-in frames per second')
+	parser.add_argument('--latency', type=float, default=0.0, help='stand-in loopback latency in seconds')
+	parser.add_argument('--bandwidth', type=float, default=1e6, help='stand-in loopback capacity in bytes per second')
+	cfg = parser.parse_args(argv)
+
+	if cfg.standin:
+		import standInServer
+		jsonCache.disableLocalCaches()
+		server, cfg.host, rpc = standInServer.startServer(frameRate=cfg.frameRate, latency=cfg.latency, sampling=True, bandwidth=cfg.bandwidth)
+
+	HOST, DL_HOST, LOGIN, PROJECT = cfg.host, cfg.dlHost, cfg.login, cfg.project
+	connection.connect(HOST, LOGIN, PROJECT)
+	sweep = runSweep(buildSettings(cfg.protocols.split(','), cfg.counts, cfg.lengths, cfg.rates), cfg.capture,
+					 cfg.maxDrop, cfg.maxLatency, cfg.full)
+	printSweep(sweep)
+	if cfg.output:
+		with open(cfg.output, 'w') as f:
+			json.dump({'config':dict(vars(cfg)), 'time':time.time(), 'sweep':sweep}, f, indent=1, sort_keys=True)
+
+
+if __name__=='__main__':
+	main()
@@ -0,0 +1,602 @@
+from __future__ import print_function
+import numpy as np
+
+
+# ---- TIMESTAMP HELPERS ----
+
+def toNanoseconds(tSec, tNSec):
+	'''
+	Combines DL timestamp fields into a single integer time base.
+	Input:
+		tSec			seconds part of the DL record timestamp(s)
+		tNSec			nanoseconds part of the DL record timestamp(s)
+	Return:
+		t				int64 array of nanoseconds since the epoch
+	'''
+	return np.asarray(tSec, dtype=np.int64)*1000000000 + np.asarray(tNSec, dtype=np.int64)
+
+
+def alignRecords(tIn, tOut, maxSkew=0):
+	'''
+	Pairs IN and OUT samples by DL timestamp instead of by list position.
+	Each IN sample is matched with the nearest OUT sample; pairs further apart than maxSkew are dropped
+	and every OUT sample is used at most once (closest IN sample wins).
+	Input:
+		tIn				IN timestamps in nanoseconds
+		tOut			OUT timestamps in nanoseconds
+		maxSkew			largest timestamp difference (ns) still treated as the same sample
+	Return:
+		iIn				indices into the IN arrays of matched samples (ascending)
+		iOut			indices into the OUT arrays of the matching samples
+	'''
+	tIn = np.asarray(tIn, dtype=np.int64)
+	tOut = np.asarray(tOut, dtype=np.int64)
+	empty = np.zeros(0, dtype=np.intp)
+	if tIn.size==0 or tOut.size==0:
+		return empty, empty
+
+	outOrder = np.argsort(tOut, kind='mergesort')
+	tOutSorted = tOut[outOrder]
+
+	pos = np.searchsorted(tOutSorted, tIn)
+	left = np.clip(pos-1, 0, tOutSorted.size-1)
+	right = np.clip(pos, 0, tOutSorted.size-1)
+	dLeft = np.abs(tIn - tOutSorted[left])
+	dRight = np.abs(tOutSorted[right] - tIn)
+	nearest = np.where(dRight < dLeft, right, left)
+	dist = np.minimum(dLeft, dRight)
+
+	iIn = np.nonzero(dist <= maxSkew)[0]
+	if iIn.size==0:
+		return empty, empty
+	nearest = nearest[iIn]
+	dist = dist[iIn]
+
+	# keep only the closest IN sample for each OUT sample
+	order = np.lexsort((dist, nearest))
+	first = np.ones(order.size, dtype=bool)
+	first[1:] = nearest[order][1:] != nearest[order][:-1]
+	keep = np.sort(order[first])
+
+	return iIn[keep], outOrder[nearest[keep]]
+
+
+# ---- COMPARISON ----
+
+def compareRecords(tIn, valsIn, tOut, valsOut, tol, maxSkew=0, percentiles=(50, 95, 99), lag=0):
+	'''
+	Compares time-aligned IN and OUT samples in one vectorized pass.
+	Input:
+		tIn				IN timestamps in nanoseconds (see toNanoseconds)
+		valsIn			IN values (cvt value of the IN point)
+		tOut			OUT timestamps in nanoseconds
+		valsOut			OUT values (alt value of the OUT point)
+		tol				largest accepted absolute difference
+		maxSkew			largest timestamp difference (ns) still treated as the same sample
+		percentiles		percentiles of the absolute error to report
+		lag				propagation delay in OUT samples: every OUT value takes the timestamp of the OUT sample
+						lag positions later before alignment (see estimateDelay)
+	Return:
+		result			dict with keys
+							samples			number of matched IN/OUT pairs
+							unmatchedIn		IN samples without an OUT partner
+							unmatchedOut	OUT samples without an IN partner
+							max, mean		maximum and mean absolute error
+							percentiles		{'p50': absolute error, ...}
+							violations		number of pairs exceeding tol
+							worstIndex		IN record index of the largest error (-1 if no samples)
+							worstTime		timestamp (s) of the largest error (None if no samples)
+							passed			True if samples were compared and none exceeded tol
+	'''
+	tIn = np.asarray(tIn, dtype=np.int64)
+	tOut = np.asarray(tOut, dtype=np.int64)
+	valsIn = np.asarray(valsIn, dtype=np.float64)
+	valsOut = np.asarray(valsOut, dtype=np.float64)
+	if lag:
+		order = np.argsort(tOut, kind='mergesort')
+		tOut, valsOut = tOut[order], valsOut[order]
+		tOut, valsOut = (tOut[lag:], valsOut[:-lag]) if lag > 0 else (tOut[:lag], valsOut[-lag:])
+
+	iIn, iOut = alignRecords(tIn, tOut, maxSkew)
+	result = {'samples':int(iIn.size), 'unmatchedIn':int(tIn.size-iIn.size), 'unmatchedOut':int(tOut.size-iOut.size),
+			  'max':float('nan'), 'mean':float('nan'), 'percentiles':dict(('p%g' %p, float('nan')) for p in percentiles),
+			  'violations':0, 'worstIndex':-1, 'worstTime':None, 'passed':False}
+	if iIn.size==0:
+		return result
+
+	err = np.abs(valsIn[iIn] - valsOut[iOut])
+	worst = int(np.argmax(err))
+	result['max'] = float(err[worst])
+	result['mean'] = float(err.mean())
+	if len(percentiles):
+		result['percentiles'] = dict(('p%g' %p, float(v)) for p, v in zip(percentiles, np.percentile(err, percentiles)))
+	result['violations'] = int(np.count_nonzero(err > tol))
+	result['worstIndex'] = int(iIn[worst])
+	result['worstTime'] = float(tIn[iIn[worst]])/1e9
+	result['passed'] = result['violations']==0
+	return result
+
+
+def compareChunked(tIn, valsIn, tOut, valsOut, tol, chunk=65536, maxSkew=0, lag=0):
+	'''
+	compareRecords over consecutive chunks of IN samples, for series too long to compare in one pass
+	(e.g. the memory-mapped columns of dlReader.spoolPoints). Only one chunk of each series is converted
+	at a time. Both series must be in time order, as the data log returns them; every chunk is compared
+	with the OUT samples up to its last timestamp plus maxSkew that no earlier chunk was compared with,
+	so pairs can differ from compareRecords only across chunk boundaries, and only if maxSkew is non-zero.
+	Input:
+		tIn, valsIn		IN timestamps (ns) and values
+		tOut, valsOut	OUT timestamps (ns) and values
+		tol				largest accepted absolute difference
+		chunk			IN samples compared per pass
+		maxSkew			largest timestamp difference (ns) still treated as the same sample
+		lag				propagation delay in OUT samples (see compareRecords)
+	Return:
+		result			dict with the keys of compareRecords; percentiles is empty, they need all errors at once
+	'''
+	if lag:
+		tOut, valsOut = (tOut[lag:], valsOut[:-lag]) if lag > 0 else (tOut[:lag], valsOut[-lag:])
+	result = {'samples':0, 'unmatchedIn':0, 'unmatchedOut':0, 'max':float('nan'), 'mean':float('nan'), 'percentiles':{},
+			  'violations':0, 'worstIndex':-1, 'worstTime':None, 'passed':False}
+	total = 0.0
+	hi = 0
+	for start in range(0, len(tIn), chunk):
+		tInC = np.asarray(tIn[start:start+chunk], dtype=np.int64)
+		lo, hi = hi, max(hi, int(np.searchsorted(tOut, tInC[-1]+maxSkew, side='right')))
+		part = compareRecords(tInC, valsIn[start:start+chunk], tOut[lo:hi], valsOut[lo:hi], tol, maxSkew, percentiles=())
+		result['samples'] += part['samples']
+		result['unmatchedIn'] += part['unmatchedIn']
+		result['violations'] += part['violations']
+		if part['samples']:
+			total += part['mean']*part['samples']
+			if not part['max'] <= result['max']:
+				result['max'] = part['max']
+				result['worstIndex'] = start + part['worstIndex']
+				result['worstTime'] = part['worstTime']
+	result['unmatchedOut'] = int(len(tOut) - result['samples'])
+	if result['samples']:
+		result['mean'] = total/result['samples']
+		result['passed'] = result['violations']==0
+	return result
+
+
+def formatResult(result):
+	'''
+	One-line summary of a compareRecords result for test output.
+	'''
+	if result['samples']==0:
+		return 'no time-aligned samples (%d IN, %d OUT unmatched)' %(result['unmatchedIn'], result['unmatchedOut'])
+	pcts = ', '.join('%s %0.2e' %(p, result['percentiles'][p]) for p in sorted(result['percentiles'], key=lambda p: float(p[1:])))
+	if result.get('delay') is not None:
+		pcts += '%sdelay %0.2f ms, jitter %0.2f ms' %(', ' if pcts else '', 1e3*result['delay'], 1e3*result['jitter'])
+	return '%d samples, %d violations, max %0.2e (sample %d, t=%0.3f), mean %0.2e%s' \
+		%(result['samples'], result['violations'], result['max'], result['worstIndex'], result['worstTime'],
+		  result['mean'], ', '+pcts if pcts else '')
+
+
+# ---- PROPAGATION DELAY ----
+
+def _lagPeak(x, y, maxLag):
+	'''
+	Lag (in samples, sub-sample by parabolic interpolation) at which y best matches x delayed, and the
+	normalized correlation at that lag. The cross-correlation comes from an FFT; the squared difference of
+	the overlapping parts is then averaged over the overlap length, so short overlaps at large lags are not penalized.
+	'''
+	n = x.size
+	size = 1 << int(np.ceil(np.log2(2*n)))
+	c = np.fft.irfft(np.fft.rfft(y, size)*np.conj(np.fft.rfft(x, size)), size)
+	lags = np.arange(-maxLag, maxLag+1)
+	c = np.concatenate((c[size-maxLag:], c[:maxLag+1]))		#lags -maxLag..maxLag
+	cx = np.concatenate(([0.0], np.cumsum(x*x)))
+	cy = np.concatenate(([0.0], np.cumsum(y*y)))
+	pos = lags >= 0
+	sx = np.where(pos, cx[n-np.abs(lags)], cx[n]-cx[np.abs(lags)])		#energy of the overlapping part of x
+	sy = np.where(pos, cy[n]-cy[np.abs(lags)], cy[n-np.abs(lags)])		#and of y
+	d = (sx + sy - 2*c)/(n - np.abs(lags))
+	k = int(np.argmin(d))
+	lag = float(lags[k])
+	if 0 < k < d.size-1:
+		den = d[k-1] - 2*d[k] + d[k+1]
+		if den > 0: lag += 0.5*(d[k-1] - d[k+1])/den
+	norm = np.sqrt(sx[k]*sy[k])
+	return lag, float(c[k]/norm) if norm else 0.0
+
+
+def estimateDelay(tIn, valsIn, tOut, valsOut, step=None, maxDelay=0.25, windows=4):
+	'''
+	Estimates how long a value written to the OUT point takes to show up on the IN point.
+	Both series are resampled onto a common uniform grid and cross-correlated with an FFT; the delay
+	is estimated over the whole capture and separately over consecutive windows, whose spread is the jitter.
+	maxDelay must stay below half the period of a periodic stimulus, or the estimate can jump by a period.
+	Input:
+		tIn				IN timestamps in nanoseconds (see toNanoseconds)
+		valsIn			IN values (cvt value of the IN point)
+		tOut			OUT timestamps in nanoseconds
+		valsOut			OUT values (alt value of the OUT point)
+		step			grid spacing (ns); median OUT sample spacing if None, so a grid step is one OUT sample
+		maxDelay		largest delay (s) searched in either direction
+		windows			number of windows the jitter is estimated from
+	Return:
+		estimate		dict with keys
+							delay			IN minus OUT delay (s); nan if the series cannot be correlated
+							jitter			standard deviation of the window delays (s)
+							correlation		normalized correlation at the delay (1 for a perfect copy)
+							windowDelays	delay (s) of every window that could be correlated
+							lag				delay rounded to whole OUT samples, for compareRecords(lag=...)
+							step			grid spacing (s)
+	'''
+	tIn = np.asarray(tIn, dtype=np.int64)
+	tOut = np.asarray(tOut, dtype=np.int64)
+	valsIn = np.asarray(valsIn, dtype=np.float64)
+	valsOut = np.asarray(valsOut, dtype=np.float64)
+	estimate = {'delay':float('nan'), 'jitter':float('nan'), 'correlation':0.0, 'windowDelays':[], 'lag':0, 'step':float('nan')}
+	if tIn.size < 4 or tOut.size < 4:
+		return estimate
+
+	inOrder = np.argsort(tIn, kind='mergesort')
+	outOrder = np.argsort(tOut, kind='mergesort')
+	tIn, valsIn = tIn[inOrder], valsIn[inOrder]
+	tOut, valsOut = tOut[outOrder], valsOut[outOrder]
+	if step is None:
+		step = int(np.median(np.diff(tOut)))
+	start, end = max(tIn[0], tOut[0]), min(tIn[-1], tOut[-1])
+	if step <= 0 or end - start < 4*step:
+		return estimate
+
+	grid = np.arange(0, end-start, step, dtype=np.float64)
+	x = np.interp(grid, (tOut-start).astype(np.float64), valsOut)
+	y = np.interp(grid, (tIn-start).astype(np.float64), valsIn)
+	x -= x.mean()
+	y -= y.mean()
+	maxLag = max(1, min(grid.size-1, int(maxDelay*1e9/step)))
+
+	lag, corr = _lagPeak(x, y, maxLag)
+	estimate['delay'] = lag*step/1e9
+	estimate['correlation'] = corr
+	estimate['lag'] = int(round(lag))
+	estimate['step'] = step/1e9
+
+	size = grid.size // max(1, windows)
+	delays = []
+	for w in range(max(1, windows)):
+		xw, yw = x[w*size:(w+1)*size], y[w*size:(w+1)*size]
+		if size < 4 or not xw.any() or not yw.any():
+			continue
+		wLag, wCorr = _lagPeak(xw-xw.mean(), yw-yw.mean(), min(maxLag, size//2))
+		delays.append(wLag*step/1e9)
+	estimate['windowDelays'] = delays
+	estimate['jitter'] = float(np.std(delays)) if delays else float('nan')
+	return estimate
+
+
+# ---- GENERATOR REFERENCE ----
+
+RAW_RANGES = {'char':(-2**7, 2**7-1), 'uchar':(0, 2**8-1), 'short':(-2**15, 2**15-1), 'ushort':(0, 2**16-1),
+			  'int':(-2**31, 2**31-1), 'uint':(0, 2**32-1), 'llong':(-2**63, 2**63-1), 'ullong':(0, 2**64-1),
+			  'float':(-3.4028234663852886e38, 3.4028234663852886e38), 'double':(-1.7976931348623157e308, 1.7976931348623157e308)}
+FLOAT_EPS = {'float':2.0**-23, 'double':2.0**-52}		#relative spacing of representable values; integer types truncate by less than 1
+
+
+def generatorSpec(sigType, frequency, count, phase, offset, amplitude, delay, duration):
+	'''
+	Description of a signal generator, with the fields in the order swb.addGenerator takes them.
+	Input:
+		sigType			'sine', 'triangle', 'square' or 'ramp' (SIG_TYPE_<upper case> in SimWB Constants)
+		frequency		Hz
+		count			cycles (for GEN_SIGGENEND_CYCLES)
+		phase			radians
+		offset			value the signal oscillates around
+		amplitude		peak deviation from offset
+		delay			seconds from generator start to first output
+		duration		seconds of output (for GEN_SIGGENEND_DURATION)
+	'''
+	return {'sigType':sigType, 'frequency':float(frequency), 'count':count, 'phase':float(phase), 'offset':float(offset),
+			'amplitude':float(amplitude), 'delay':float(delay), 'duration':float(duration)}
+
+
+def synthesize(spec, t):
+	'''
+	Expected generator output.
+	Input:
+		spec			generator description (see generatorSpec)
+		t				seconds since the generator started (array)
+	Return:
+		vals			float64 array of expected values
+	'''
+	t = np.asarray(t, dtype=np.float64) - spec['delay']
+	theta = 2*np.pi*spec['frequency']*t + spec['phase']
+	if spec['sigType']=='sine':
+		wave = np.sin(theta)
+	elif spec['sigType']=='triangle':
+		wave = 2/np.pi*np.arcsin(np.sin(theta))
+	elif spec['sigType']=='square':
+		wave = np.where(np.sin(theta) >= 0, 1.0, -1.0)
+	elif spec['sigType']=='ramp':
+		cycles = theta/(2*np.pi)
+		wave = 2*(cycles - np.floor(cycles + 0.5))
+	else:
+		raise ValueError('unknown signal type %r' %spec['sigType'])
+	return spec['offset'] + spec['amplitude']*wave
+
+
+def timeTolerance(step, jitter=None):
+	'''
+	Timestamp uncertainty of logged values against the generator reference: one fixed step, since values
+	are sampled once per frame and NET-IO delivers them on a frame boundary, plus the jitter of the
+	propagation delay where known (see estimateDelay). The delay itself is not included: compareReference
+	fits the generator start of every series (see fitStart), which absorbs a constant delay.
+	Input:
+		step			fixed step of the test (s)
+		jitter			spread of the measured delay (s), or None
+	Return:
+		timeTol			seconds
+	'''
+	timeTol = float(step)
+	if jitter is not None and jitter==jitter:
+		timeTol += abs(jitter)
+	return timeTol
+
+
+def signalSlope(spec):
+	'''
+	Largest rate of change of the generator output (units per second); 0 for signals that only jump.
+	'''
+	if spec['sigType'] in ('sine', 'triangle', 'ramp'):
+		return 2*np.pi*spec['frequency']*abs(spec['amplitude'])
+	return 0.0
+
+
+def typeTolerance(rawType, cvtType=None, spec=None, timeTol=0.0):
+	'''
+	Largest difference from the generator reference a value can show after passing through the raw
+	(and cvt) type: 1 for integer types, which truncate, the relative float spacing times the signal
+	magnitude for float and double, plus the signal change over timeTol seconds.
+	Input:
+		rawType			type specified in point mapping
+		cvtType			type specified in point creation (None to use the raw type only)
+		spec			generator description the magnitude and slope are taken from (None for a magnitude of 1)
+		timeTol			seconds of timestamp uncertainty (see timeTolerance)
+	Return:
+		tol				absolute tolerance
+	'''
+	scale = abs(spec['offset']) + abs(spec['amplitude']) if spec else 1.0
+	slope = signalSlope(spec) if spec else 0.0
+	quantum = max(FLOAT_EPS[t]*scale if t in FLOAT_EPS else 1.0 for t in (rawType, cvtType or rawType))
+	return float(quantum + slope*timeTol)
+
+
+def fitStart(t, vals, spec, start=None, iterations=10, truncated=False):
+	'''
+	Estimates when the generator started from the logged values by a Gauss-Newton least-squares fit of the
+	generator reference. The first guess is the first timestamp at which the value leaves its initial value.
+	Input:
+		t				timestamps in nanoseconds
+		vals			logged values
+		spec			generator description (see generatorSpec)
+		start			first guess (ns); None to guess from the data
+		iterations		largest number of Gauss-Newton steps
+		truncated		values were truncated to integers; the fit then uses the middle of each truncation interval
+	Return:
+		start			generator start (ns, float); None if the values never change
+	'''
+	t = np.asarray(t, dtype=np.int64)
+	vals = np.asarray(vals, dtype=np.float64)
+	if start is None:
+		moved = np.nonzero(vals != vals[0])[0] if vals.size else []
+		if len(moved)==0:
+			return None
+		prev = t[moved[0]-1] if moved[0] > 0 else t[moved[0]]
+		start = 0.5*(prev + t[moved[0]])
+	if truncated:
+		vals = vals + 0.5*np.sign(vals)
+	origin = t[0]
+	tRel = (t - origin)/1e9
+	s0 = (start - origin)/1e9
+	h = 1e-6/max(spec['frequency'], 1e-9)
+	for i in range(iterations):
+		s = tRel - s0
+		active = (s > spec['delay']) & (s < spec['delay'] + spec['duration'])
+		if not active.any(): break
+		s = s[active]
+		r = vals[active] - synthesize(spec, s)
+		slope = (synthesize(spec, s+h) - synthesize(spec, s-h))/(2*h)		#d(reference)/ds; the residual moves by +slope per second of start
+		den = np.dot(slope, slope)
+		if den==0: break
+		step = -np.dot(r, slope)/den
+		s0 += step
+		if abs(step) < 1e-9: break
+	return origin + s0*1e9
+
+
+def compareReference(t, vals, spec, tol, valueType=None, start=None, percentiles=(50, 95, 99)):
+	'''
+	Compares logged values against the generator reference synthesized for every logged timestamp.
+	The reference is first passed through valueType the way a C cast would (truncated for integer types,
+	rounded to single precision for float), and reference values outside the type's range are counted as outOfRange.
+	Input:
+		t				timestamps in nanoseconds
+		vals			logged values (IN cvt value or OUT alt value)
+		spec			generator description (see generatorSpec)
+		tol				largest accepted absolute difference (see typeTolerance)
+		valueType		raw type the values passed through (key of RAW_RANGES); None to compare against the exact reference
+		start			generator start (ns); fitted with fitStart if None
+		percentiles		percentiles of the absolute error to report
+	Return:
+		result			dict with the keys of compareRecords (unmatchedIn counts samples outside the generator's
+						active window, unmatchedOut is 0) plus start (ns), tol and outOfRange
+	'''
+	t = np.asarray(t, dtype=np.int64)
+	vals = np.asarray(vals, dtype=np.float64)
+	integer = valueType is not None and valueType not in FLOAT_EPS
+	if start is None:
+		start = fitStart(t, vals, spec, truncated=integer)
+	result = {'samples':0, 'unmatchedIn':int(t.size), 'unmatchedOut':0, 'max':float('nan'), 'mean':float('nan'),
+			  'percentiles':dict(('p%g' %p, float('nan')) for p in percentiles), 'violations':0, 'worstIndex':-1,
+			  'worstTime':None, 'passed':False, 'start':start, 'tol':tol, 'outOfRange':0}
+	if start is None:
+		return result
+
+	s = (t - t[0])/1e9 - (start - t[0])/1e9
+	iActive = np.nonzero((s > spec['delay']) & (s < spec['delay'] + spec['duration']))[0]
+	if iActive.size==0:
+		return result
+	ref = synthesize(spec, s[iActive])
+	if valueType is not None:
+		low, high = RAW_RANGES[valueType]
+		result['outOfRange'] = int(np.count_nonzero((ref < low) | (ref > high)))
+	if integer:
+		ref = np.trunc(ref)
+	elif valueType=='float':
+		ref = ref.astype(np.float32).astype(np.float64)
+	err = np.abs(vals[iActive] - ref)
+	worst = int(np.argmax(err))
+	result['samples'] = int(iActive.size)
+	result['unmatchedIn'] = int(t.size - iActive.size)
+	result['max'] = float(err[worst])
+	result['mean'] = float(err.mean())
+	if len(percentiles):
+		result['percentiles'] = dict(('p%g' %p, float(v)) for p, v in zip(percentiles, np.percentile(err, percentiles)))
+	result['violations'] = int(np.count_nonzero(err > tol))
+	result['worstIndex'] = int(iActive[worst])
+	result['worstTime'] = float(t[iActive[worst]])/1e9
+	result['passed'] = result['violations']==0 and result['outOfRange']==0
+	return result
+
+
+# ---- MESSAGE DELIVERY ----
+
+def _changes(vals):
+	return np.flatnonzero(vals[1:] != vals[:-1]) + 1
+
+
+def deliveryStats(tIn, valsIn, tOut, valsOut, rate=None, percentiles=(50, 99)):
+	'''
+	Measures how many OUT updates arrive on the IN point and how late. The OUT point must be driven with
+	values that do not repeat during the capture (e.g. a slow ramp), so every IN update can be traced back
+	to the OUT update it carries; an IN update is a logged sample whose value differs from the one before.
+	Input:
+		tIn				IN timestamps in nanoseconds (see toNanoseconds)
+		valsIn			IN values (cvt value of the IN point)
+		tOut			OUT timestamps in nanoseconds
+		valsOut			OUT values (alt value of the OUT point)
+		rate			messages per second the OUT message is sent at (its samplingrate); every OUT update is offered if None
+		percentiles		latency percentiles to report
+	Return:
+		stats			dict with keys
+							offered			OUT updates the message could carry (at most rate per second)
+							delivered		IN updates carrying an OUT value
+							unmatched		IN updates whose value never was on OUT
+							span			seconds from the first OUT update to the end of the IN log
+							deliveredRate	delivered updates per second
+							dropRate		fraction of offered updates that did not arrive
+							latency			dict with keys mean, max and p<percentile> (s) from OUT update to IN update
+	'''
+	tIn = np.asarray(tIn, dtype=np.int64)
+	tOut = np.asarray(tOut, dtype=np.int64)
+	valsIn = np.asarray(valsIn, dtype=np.float64)
+	valsOut = np.asarray(valsOut, dtype=np.float64)
+	inOrder = np.argsort(tIn, kind='mergesort')
+	outOrder = np.argsort(tOut, kind='mergesort')
+	tIn, valsIn = tIn[inOrder], valsIn[inOrder]
+	tOut, valsOut = tOut[outOrder], valsOut[outOrder]
+
+	nan = float('nan')
+	stats = {'offered':0, 'delivered':0, 'unmatched':0, 'span':0.0, 'deliveredRate':0.0, 'dropRate':0.0,
+			 'latency':dict([('mean', nan), ('max', nan)] + [('p%g' %p, nan) for p in percentiles])}
+	iOut = _changes(valsOut)
+	if iOut.size==0 or tIn.size==0:
+		return stats
+	iIn = _changes(valsIn)
+
+	values, first = np.unique(valsOut[iOut], return_index=True)		#first time each OUT value was set
+	tFirst = tOut[iOut][first]
+	pos = np.minimum(np.searchsorted(values, valsIn[iIn]), values.size-1)
+	match = values[pos]==valsIn[iIn]
+	latency = (tIn[iIn][match] - tFirst[pos[match]])/1e9
+
+	span = (tIn[-1] - tOut[iOut[0]])/1e9
+	offered = iOut.size if rate is None else min(iOut.size, int(rate*span))
+	stats['offered'] = int(offered)
+	stats['delivered'] = int(np.count_nonzero(match))
+	stats['unmatched'] = int(match.size - stats['delivered'])
+	stats['span'] = float(span)
+	stats['deliveredRate'] = float(stats['delivered']/span) if span > 0 else 0.0
+	stats['dropRate'] = max(0.0, 1.0 - float(stats['delivered'])/offered) if offered else 0.0
+	if latency.size:
+		stats['latency'] = dict([('mean', float(latency.mean())), ('max', float(latency.max()))] +
+								[('p%g' %p, float(v)) for p, v in zip(percentiles, np.percentile(latency, percentiles))])
+	return stats
+
+
+# ---- TIMING INTEGRITY ----
+
+MAX_DRIFT = 1e-4		#largest relative deviation of the logged frame period from the fixed step (100 ppm)
+
+
+def timingStats(recNum, t, step, gapFactor=1.5, maxDrift=MAX_DRIFT, percentiles=(50, 99, 99.9)):
+	'''
+	Checks the data log timestamps of one point for dropped or stalled frames in one vectorized pass.
+	A missing record is a record number skipped in the log, a gap is an interval longer than gapFactor
+	steps, jitter is the deviation of every interval from the step and drift is the relative deviation
+	of the mean frame period outside gaps from the step, so a slow clock and a stall are told apart.
+	Input:
+		recNum			record numbers (see dlReader.RecordBuffer)
+		t				timestamps in nanoseconds (see toNanoseconds)
+		step			fixed step of the test (ns); one record is expected per step
+		gapFactor		intervals longer than this many steps count as gaps
+		maxDrift		largest allowed drift
+		percentiles		jitter percentiles to report
+	Return:
+		stats			dict with keys
+							records			logged records
+							missing			record numbers skipped
+							reordered		records whose number or timestamp does not increase
+							gaps			intervals longer than gapFactor steps
+							longestGap		longest interval (s)
+							gapTime			time of the longest interval's first record (s since the epoch)
+							jitter			dict with keys max and p<percentile> of |interval - step| (s)
+							drift			relative deviation of the frame period from the step
+							driftTotal		logged span minus the span expected from the record numbers (s)
+							passed			True if nothing is missing or reordered, there are no gaps and drift is within maxDrift
+	'''
+	recNum = np.asarray(recNum, dtype=np.int64)
+	t = np.asarray(t, dtype=np.int64)
+	nan = float('nan')
+	stats = {'records':int(t.size), 'missing':0, 'reordered':0, 'gaps':0, 'longestGap':0.0, 'gapTime':None,
+			 'jitter':dict([('max', nan)] + [('p%g' %p, nan) for p in percentiles]), 'drift':0.0, 'driftTotal':0.0,
+			 'passed':t.size > 0}
+	if t.size < 2:
+		return stats
+
+	dn = np.diff(recNum)
+	dt = np.diff(t)
+	stats['missing'] = int(np.sum(dn[dn > 1] - 1))
+	stats['reordered'] = int(np.count_nonzero((dn < 1) | (dt <= 0)))
+	gap = dt > gapFactor*step
+	stats['gaps'] = int(np.count_nonzero(gap))
+	worst = int(np.argmax(dt))
+	stats['longestGap'] = float(dt[worst])/1e9
+	stats['gapTime'] = float(t[worst])/1e9
+
+	per = dt/np.maximum(dn, 1).astype(np.float64)		#interval per step, so a skipped record is not counted twice
+	dev = np.abs(per - step)/1e9
+	stats['jitter'] = dict([('max', float(dev.max()))] + [('p%g' %p, float(v)) for p, v in zip(percentiles, np.percentile(dev, percentiles))])
+
+	steps = np.sum(dn[~gap & (dn > 0)])
+	period = float(np.sum(dt[~gap & (dn > 0)]))/steps if steps else float(step)
+	stats['drift'] = float((period - step)/step)
+	stats['driftTotal'] = float((t[-1] - t[0]) - (recNum[-1] - recNum[0])*step)/1e9
+	stats['passed'] = stats['missing']==0 and stats['reordered']==0 and stats['gaps']==0 and abs(stats['drift']) <= maxDrift
+	return stats
+
+
+def formatTiming(stats):
+	'''
+	One-line summary of a timingStats result for test output.
+	'''
+	if stats['records'] < 2:
+		return '%d records, timing not checked' %stats['records']
+	pcts = ', '.join('%s %0.3f ms' %(k, 1e3*v) for k, v in sorted(stats['jitter'].items()) if k!='max')
+	return '%d records, %d missing, %d reordered, %d gaps (longest %0.2f ms at t=%0.3f), jitter %s, max %0.3f ms, drift %0.1f ppm' \
+		%(stats['records'], stats['missing'], stats['reordered'], stats['gaps'], 1e3*stats['longestGap'], stats['gapTime'],
+		  pcts, 1e3*stats['jitter']['max'], 1e6*stats['drift'])
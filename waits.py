@@ -0,0 +1,151 @@
+from __future__ import print_function
+import sys
+import time
+import numpy as np
+
+try:
+	import simwbClient as swb
+except:
+    sys.exit('Import failed')
+
+
+TIMEOUT = 5.0			#default time (s) to wait for a condition before giving up
+INTERVAL = 0.005		#first poll interval (s)
+MAX_INTERVAL = 0.25		#poll interval (s) is doubled after every miss up to this value
+
+history = []			#(label, seconds waited, condition met) for every wait
+
+
+# ---- GENERIC WAIT ----
+
+def waitFor(condition, timeout=None, label='wait', interval=None, maxInterval=None):
+	'''
+	Polls a condition with exponential backoff and returns as soon as it holds.
+	Input:
+		condition		function without arguments, polled until it returns a true value
+		timeout			seconds to wait before giving up (TIMEOUT if None)
+		label			name the wait is recorded under in history
+		interval		first poll interval (INTERVAL if None)
+		maxInterval		largest poll interval (MAX_INTERVAL if None)
+	Return:
+		value			last value returned by condition (false if the wait timed out)
+	'''
+	if timeout is None: timeout = TIMEOUT
+	if interval is None: interval = INTERVAL
+	if maxInterval is None: maxInterval = MAX_INTERVAL
+
+	start = time.time()
+	deadline = start + timeout
+	while True:
+		value = condition()
+		now = time.time()
+		if value or now >= deadline:
+			break
+		time.sleep(min(interval, deadline-now))
+		interval = min(2*interval, maxInterval)
+	history.append((label, now-start, bool(value)))
+	return value
+
+
+def summary():
+	'''
+	Wait statistics per label.
+	Return:
+		stats			dict of label -> {'count', 'total', 'max', 'timeouts'} (times in seconds)
+	'''
+	stats = {}
+	for label, seconds, ok in history:
+		s = stats.setdefault(label, {'count':0, 'total':0.0, 'max':0.0, 'timeouts':0})
+		s['count'] += 1
+		s['total'] += seconds
+		s['max'] = max(s['max'], seconds)
+		if not ok: s['timeouts'] += 1
+	return stats
+
+
+def printSummary():
+	for label, s in sorted(summary().items()):
+		print('%-24s %4d waits, %7.3f s total, %6.3f s max, %d timeouts' %(label, s['count'], s['total'], s['max'], s['timeouts']))
+
+
+# ---- ITEM VALUE WAITS ----
+
+def itemValue(point, field='value'):
+	'''
+	Current value of a point field, or None if the point cannot be read (e.g. no session is running).
+	'''
+	r, info = swb.getItemValues(point)
+	if r < 0: return None
+	return info[point][field]
+
+
+def waitForItems(points, timeout=None, label='items readable'):
+	'''
+	Waits until all points can be read from the running session.
+	'''
+	def ready():
+		r, info = swb.getItemValues(points)
+		return r >= 0
+	return waitFor(ready, timeout, label)
+
+
+def waitForItem(point, match, field='value', timeout=None, label='item value'):
+	'''
+	Waits until the value of a point field satisfies match.
+	Input:
+		point			point to poll
+		match			function called with the current value, returns True when the wait is over
+		field			item field to poll ('value' or 'altvalue')
+	Return:
+		ok				True if the condition held before the timeout
+	'''
+	def ready():
+		v = itemValue(point, field)
+		return v is not None and match(v)
+	return bool(waitFor(ready, timeout, label))
+
+
+def near(current, expected, tol=0.0, rel=0.0):
+	'''
+	True if current equals expected, or both are numbers at most tol + rel*|expected| apart, e.g. rel=2**-23
+	for a value that went through a float point.
+	'''
+	if current==expected: return True
+	try:
+		with np.errstate(over='ignore', invalid='ignore'):		#values near the float64 limits differ by inf
+			return bool(abs(current-expected) <= tol + rel*abs(expected))
+	except TypeError:
+		return False
+
+
+def waitForValue(point, value, field='value', timeout=None, label='item value', match=None, tol=0.0, rel=0.0):
+	'''
+	Waits until a point field matches value, e.g. until a written OUT value has looped back to its IN point.
+	Input:
+		point			point to poll
+		value			expected value
+		field			item field to poll ('value' or 'altvalue')
+		match			function(current, expected) -> True if they match (near with tol and rel if None)
+		tol, rel		absolute and relative difference accepted by the default match
+	Return:
+		ok				True if the value matched before the timeout; callers should fail or report the check otherwise
+	'''
+	if match is None: match = lambda a, b: near(a, b, tol, rel)
+	return waitForItem(point, lambda v: match(v, value), field, timeout, label)
+
+
+def waitForChange(point, field='value', timeout=None, label='item change'):
+	'''
+	Waits until a point field differs from its value at the time of the call, e.g. until a generator drives the loopback.
+	'''
+	initial = itemValue(point, field)
+	return waitForItem(point, lambda v: v!=initial, field, timeout, label)
+
+
+def hold(seconds, since, label='capture'):
+	'''
+	Sleeps until seconds have passed since the time.time() value since; used for fixed capture windows.
+	'''
+	remaining = seconds - (time.time()-since)
+	if remaining > 0: time.sleep(remaining)
+	history.append((label, max(remaining, 0.0), True))